@@ -0,0 +1,101 @@
+"""Benchmark DocumentationCrawler.crawl against a local synthetic documentation site.
+
+Reports pages/sec, p50/p99 page fetch latency, peak RSS and retries. Site shape
+options are those of mock_site.py.
+
+Usage: python benchmarks/bench_crawl.py --pages 2000 --page-kb 16 [--json out.json] [--baseline base.json]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_site  # noqa: E402
+from console import set_log_level  # noqa: E402
+from crawler import DocumentationCrawler  # noqa: E402
+from harness import background_server, peak_rss_mb, percentile, report  # noqa: E402
+from metrics import FETCH_RETRIES, PAGES_SKIPPED  # noqa: E402
+
+
+class TimedCrawler(DocumentationCrawler):
+    """Crawler that records how long each page fetch (including parsing) takes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetch_times: List[float] = []
+
+    async def _fetch_page(self, url: str) -> Optional[Dict]:
+        start = time.perf_counter()
+        try:
+            return await super()._fetch_page(url)
+        finally:
+            self.fetch_times.append(time.perf_counter() - start)
+
+
+async def run(args: argparse.Namespace, base_url: str) -> Dict:
+    crawler = TimedCrawler(
+        max_workers=args.workers,
+        max_concurrency=args.concurrency,
+        per_host_concurrency=args.per_host,
+        requests_per_second=args.rps,
+        parser=args.parser,
+        parse_pool=args.parse_pool,
+        discovery="hybrid" if args.sitemap else "crawl",
+        respect_robots=False,
+    )
+    start = time.perf_counter()
+    try:
+        # A crawl that stops making progress (e.g. leaked host slots) fails instead of hanging
+        tree = await asyncio.wait_for(crawler.crawl(f"{base_url}/docs"), args.timeout)
+    finally:
+        await crawler.close()
+    elapsed = time.perf_counter() - start
+    if not tree:
+        raise Exception("Crawl returned no pages")
+
+    pages, stack = 0, [tree]
+    while stack:
+        node = stack.pop()
+        pages += 1
+        stack.extend(node["children"])
+    return {
+        "pages": pages,
+        "seconds": elapsed,
+        "pages_per_sec": pages / elapsed,
+        "p50_ms": percentile(crawler.fetch_times, 50) * 1000,
+        "p99_ms": percentile(crawler.fetch_times, 99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+        "retries": int(sum(FETCH_RETRIES.values.values())),
+        "duplicates": int(sum(PAGES_SKIPPED.values.values())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    mock_site.add_arguments(parser)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=None, help="Per-host request rate (default: unpaced)")
+    parser.add_argument("--parser", default="auto")
+    parser.add_argument("--parse-pool", default="auto")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Fail if the crawl takes longer (seconds)")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    args = parser.parse_args()
+    set_log_level("warning")
+
+    site = mock_site.from_args(args)
+    with background_server(site.app) as base_url:
+        results = asyncio.run(run(args, base_url))
+    sys.exit(report(f"Crawl of {len(site.paths)} synthetic pages", results, args.json, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark DocumentationProcessor.process_pages against a local mock LLM API.
+
+Pages are synthetic documentation (the same generator as mock_site.py, run
+through the real parser); the mock API's latency and rate limit are those of
+mock_llm.py. Reports pages/sec, p50/p99 page latency, peak RSS, LLM requests
+and tokens sent.
+
+Usage: python benchmarks/bench_generate.py --pages 200 --latency 0.5 --rpm 600 [--json out.json]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_llm  # noqa: E402
+import mock_site  # noqa: E402
+from console import set_log_level  # noqa: E402
+from harness import background_server, peak_rss_mb, percentile, report  # noqa: E402
+from metrics import LLM_REQUESTS, LLM_TOKENS  # noqa: E402
+from parsing import parse_page  # noqa: E402
+from processor import DocumentationProcessor  # noqa: E402
+
+BASE_URL = "https://docs.example.com"
+
+
+class TimedProcessor(DocumentationProcessor):
+    """Processor that records how long each page (or packed request of pages) takes, including queueing for the rate budget."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_times: List[float] = []
+
+    async def _process_single_page(self, page: Dict, page_content: Optional[str] = None) -> str:
+        start = time.perf_counter()
+        try:
+            return await super()._process_single_page(page, page_content)
+        finally:
+            self.page_times.append(time.perf_counter() - start)
+
+    async def _process_batch(self, pages: List[Dict], contents: List[str]) -> List[Optional[str]]:
+        start = time.perf_counter()
+        results = await super()._process_batch(pages, contents)
+        # Pages missing from the reply are retried (and timed) on their own
+        self.page_times.extend([time.perf_counter() - start] * sum(result is not None for result in results))
+        return results
+
+
+def synthetic_tree(args: argparse.Namespace) -> Dict:
+    """Parse every page of a synthetic site into the page tree the crawler would return."""
+    site = mock_site.MockSite(mock_site.SiteConfig(pages=args.pages, fan_out=args.fan_out, page_kb=args.page_kb))
+    nodes = []
+    for index, path in enumerate(site.paths):
+        url = f"{BASE_URL}{path}"
+        page = parse_page(site.render(index), url)
+        nodes.append({"url": url, "title": page["title"], "content": page["content"], "children": []})
+    for index, parent in enumerate(site.parents):
+        if parent is not None:
+            nodes[parent]["children"].append(nodes[index])
+    return nodes[0]
+
+
+async def run(args: argparse.Namespace, base_url: str, pages: Dict) -> Dict:
+    processor = TimedProcessor(
+        "benchmark-key",
+        use_groq=args.groq,
+        max_concurrency=args.concurrency,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        mode=args.mode,
+        batch_tokens=args.batch_tokens,
+        base_url=base_url,
+    )
+    start = time.perf_counter()
+    try:
+        await processor.process_pages(pages)
+    finally:
+        await processor.close()
+    elapsed = time.perf_counter() - start
+
+    count = len(processor.page_times)
+    return {
+        "pages": count,
+        "seconds": elapsed,
+        "pages_per_sec": count / elapsed,
+        "p50_ms": percentile(processor.page_times, 50) * 1000,
+        "p99_ms": percentile(processor.page_times, 99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+        "llm_requests": int(sum(LLM_REQUESTS.values.values())),
+        "tokens_sent": int(sum(value for (_, direction), value in LLM_TOKENS.values.items() if direction == "in")),
+        "tokens_received": int(sum(value for (_, direction), value in LLM_TOKENS.values.items() if direction == "out")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    mock_llm.add_arguments(parser)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--fan-out", type=int, default=10)
+    parser.add_argument("--page-kb", type=float, default=8.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    # The processor's own budgets default to the real provider limits (Groq's are low)
+    parser.add_argument("--requests-per-minute", type=int, default=None, help="Processor's own request budget")
+    parser.add_argument("--tokens-per-minute", type=int, default=None, help="Processor's own token budget")
+    parser.add_argument("--mode", default="llm")
+    parser.add_argument("--batch-tokens", type=int, default=4000, help="Pack small pages into one request (0 disables)")
+    parser.add_argument("--groq", action="store_true", help="Use the Groq client instead of DeepSeek")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    args = parser.parse_args()
+    set_log_level("warning")
+
+    pages = synthetic_tree(args)
+    with background_server(mock_llm.from_args(args).app) as base_url:
+        # The Groq SDK appends /openai/v1 itself; DeepSeek requests go to {base_url}/v1
+        results = asyncio.run(run(args, base_url, pages))
+    sys.exit(report(f"Generation of {args.pages} synthetic pages", results, args.json, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark the page tree builder on a large synthetic documentation site.
+
+Usage: python benchmarks/bench_tree.py [number_of_urls]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_tree import build_page_tree  # noqa: E402
+
+BASE_URL = "https://docs.example.com/docs"
+
+
+def synthetic_pages(count: int, seed: int = 0):
+    """Generate pages shaped like real docs: a few deep guides and very wide API references."""
+    rng = random.Random(seed)
+    pages = [{"url": BASE_URL, "title": "Home"}]
+    sections = ["guides", "tutorials", "concepts", "api/reference", "api/classes"]
+    for i in range(count - 1):
+        section = rng.choice(sections)
+        if section.startswith("api"):
+            path = f"{section}/item-{i}"  # thousands of siblings under one parent
+        else:
+            depth = rng.randint(1, 4)
+            path = "/".join([section] + [f"topic-{rng.randint(0, 20)}" for _ in range(depth)] + [f"page-{i}"])
+        pages.append({"url": f"{BASE_URL}/{path}", "title": f"Page {i}"})
+    rng.shuffle(pages)
+    return pages
+
+
+def count_nodes(tree) -> int:
+    total, stack = 0, [tree]
+    while stack:
+        node = stack.pop()
+        total += 1
+        stack.extend(node["children"])
+    return total
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    pages = synthetic_pages(count)
+    start = time.perf_counter()
+    tree = build_page_tree(pages, BASE_URL)
+    elapsed = time.perf_counter() - start
+    print(f"Built tree for {len(pages)} URLs ({count_nodes(tree)} nodes) in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Shared helpers for the offline benchmarks: background mock servers and reporting."""
+import json
+import multiprocessing
+import resource
+import socket
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from aiohttp import web
+
+# Reported metrics compared against a baseline, and whether higher values are better
+COMPARED_METRICS = {
+    "pages_per_sec": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+    "tokens_sent": False,
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(app_factory: Callable[[], web.Application], port: int) -> None:
+    web.run_app(app_factory(), host="127.0.0.1", port=port, print=None)
+
+
+@contextmanager
+def background_server(app_factory: Callable[[], web.Application], timeout: float = 30.0) -> Iterator[str]:
+    """Run an aiohttp app in a separate process so it does not compete with the measured event loop."""
+    port = _free_port()
+    process = multiprocessing.Process(target=_serve, args=(app_factory, port), daemon=True)
+    process.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                process.terminate()
+                raise Exception("Mock server did not start")
+            time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.join()
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process (parse pool workers are not included)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def report(name: str, results: Dict, json_path: Optional[str] = None,
+           baseline_path: Optional[str] = None, tolerance: float = 0.1) -> int:
+    """Print results, optionally save them, and return 1 if they regressed against a baseline."""
+    print(f"\n{name}")
+    for key, value in results.items():
+        print(f"  {key:<16} {value:.2f}" if isinstance(value, float) else f"  {key:<16} {value}")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    if not baseline_path:
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for key, higher_is_better in COMPARED_METRICS.items():
+        if not baseline.get(key) or key not in results:
+            continue
+        change = (results[key] - baseline[key]) / baseline[key]
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{key}: {baseline[key]:.2f} -> {results[key]:.2f} ({change:+.0%})")
+    if regressions:
+        print(f"\nRegressions beyond {tolerance:.0%} against {baseline_path}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions beyond {tolerance:.0%} against {baseline_path}")
+    return 0
@@ -0,0 +1,120 @@
+"""Serve a mock OpenAI-compatible chat completions API for offline generation benchmarks.
+
+Answers the DeepSeek (/v1/chat/completions) and Groq (/openai/v1/chat/completions)
+paths with a markdown echo of the prompt, after a configurable latency. With a
+requests-per-minute limit, excess requests get 429 with a Retry-After header.
+
+Usage: python benchmarks/mock_llm.py --latency 0.5 --rpm 120 --port 8801
+"""
+import argparse
+import asyncio
+import time
+from collections import deque
+
+from aiohttp import web
+
+
+def count_tokens(text: str) -> int:
+    """Same rough estimate as the processor: about four characters per token."""
+    return max(1, len(text) // 4)
+
+
+class MockLLM:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        seconds_per_token: float = 0.0,
+        requests_per_minute: int = 0,
+        max_output_tokens: int = 2000,
+    ):
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.requests_per_minute = requests_per_minute
+        self.max_output_tokens = max_output_tokens
+        self.recent = deque()
+        self.requests = 0
+        self.rejected = 0
+
+    def _over_limit(self) -> bool:
+        if not self.requests_per_minute:
+            return False
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] >= 60:
+            self.recent.popleft()
+        if len(self.recent) >= self.requests_per_minute:
+            return True
+        self.recent.append(now)
+        return False
+
+    async def completions(self, request: web.Request) -> web.Response:
+        if self._over_limit():
+            self.rejected += 1
+            retry_after = max(1, int(60 - (time.monotonic() - self.recent[0])) + 1)
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                status=429,
+                headers={"Retry-After": str(retry_after)},
+            )
+        self.requests += 1
+        body = await request.json()
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        user = body["messages"][-1].get("content", "") if body.get("messages") else ""
+        # Echo the prompt back as markdown, capped like a real completion would be
+        content = "## Converted\n\n" + user[: self.max_output_tokens * 4]
+        prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(content)
+        await asyncio.sleep(self.latency + completion_tokens * self.seconds_per_token)
+        return web.json_response({
+            "id": f"mock-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"requests": self.requests, "rejected": self.rejected})
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self.completions)
+        app.router.add_post("/openai/v1/chat/completions", self.completions)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=float, default=0.2, help="Base response time in seconds")
+    parser.add_argument("--seconds-per-token", type=float, default=0.0, help="Extra time per completion token")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute before returning 429 (0 = unlimited)")
+    parser.add_argument("--max-output-tokens", type=int, default=2000)
+
+
+def from_args(args: argparse.Namespace) -> MockLLM:
+    return MockLLM(
+        latency=args.latency,
+        seconds_per_token=args.seconds_per_token,
+        requests_per_minute=args.rpm,
+        max_output_tokens=args.max_output_tokens,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--port", type=int, default=8801)
+    args = parser.parse_args()
+    print(f"Mock LLM listening on http://127.0.0.1:{args.port}", flush=True)
+    web.run_app(from_args(args).app(), host="127.0.0.1", port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
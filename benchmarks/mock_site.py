@@ -0,0 +1,201 @@
+"""Serve a synthetic documentation site for offline crawler benchmarks.
+
+Pages form a tree with a configurable fan-out and depth. Each page links to its
+parent, its children and a few random pages, and carries a configurable amount
+of content. A share of pages can duplicate another page's content, respond
+slowly, fail once with 503 before succeeding, or redirect to themselves forever.
+
+Usage: python benchmarks/mock_site.py --pages 1000 --fan-out 10 --port 8800
+"""
+import argparse
+import asyncio
+import random
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+WORDS = (
+    "request response client server token stream cache index query schema field value "
+    "config option default return error retry limit page batch async worker handler route "
+    "session header payload parse build deploy install upgrade version module function"
+).split()
+
+
+class SiteConfig:
+    """Shape of the synthetic site."""
+
+    def __init__(
+        self,
+        pages: int = 1000,
+        fan_out: int = 10,
+        max_depth: Optional[int] = None,
+        page_kb: float = 8.0,
+        links_per_page: int = 5,
+        duplicate_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_delay: float = 0.5,
+        error_rate: float = 0.0,
+        redirect_loop_rate: float = 0.0,
+        latency: float = 0.0,
+        sitemap: bool = False,
+        seed: int = 0,
+    ):
+        self.pages = pages
+        self.fan_out = max(1, fan_out)
+        self.max_depth = max_depth
+        self.page_kb = page_kb
+        self.links_per_page = links_per_page
+        self.duplicate_rate = duplicate_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.error_rate = error_rate
+        self.redirect_loop_rate = redirect_loop_rate
+        self.latency = latency
+        self.sitemap = sitemap
+        self.seed = seed
+
+
+class MockSite:
+    """The synthetic site, with pages numbered breadth-first from the root at /docs."""
+
+    def __init__(self, config: SiteConfig):
+        self.config = config
+        rng = random.Random(config.seed)
+        self.paths: List[str] = ["/docs"]
+        self.children: List[List[int]] = [[]]
+        self.parents: List[Optional[int]] = [None]
+        depths = [0]
+        parent = 0
+        while len(self.paths) < config.pages and parent < len(self.paths):
+            if config.max_depth is None or depths[parent] < config.max_depth:
+                for _ in range(config.fan_out):
+                    if len(self.paths) >= config.pages:
+                        break
+                    index = len(self.paths)
+                    self.paths.append(f"{self.paths[parent]}/page-{index}")
+                    self.children.append([])
+                    self.children[parent].append(index)
+                    self.parents.append(parent)
+                    depths.append(depths[parent] + 1)
+            parent += 1
+        self.index: Dict[str, int] = {path: i for i, path in enumerate(self.paths)}
+        count = len(self.paths)
+        # Which page's text each page shows: its own, or an earlier page's when duplicated
+        self.content_of = [
+            rng.randrange(i) if i > 1 and rng.random() < config.duplicate_rate else i
+            for i in range(count)
+        ]
+        self.slow = {i for i in range(1, count) if rng.random() < config.slow_rate}
+        self.failing = {i for i in range(1, count) if rng.random() < config.error_rate}
+        self.looping = {i for i in range(1, count) if rng.random() < config.redirect_loop_rate}
+        self.extra_links = [
+            [rng.randrange(count) for _ in range(config.links_per_page)] for _ in range(count)
+        ]
+
+    def _content(self, index: int) -> str:
+        rng = random.Random(self.config.seed * 1_000_003 + index)
+        target = int(self.config.page_kb * 1024)
+        parts, size, section = [], 0, 1
+        while size < target:
+            if section % 4 == 1:
+                block = f"<h2>Section {section}</h2>"
+            elif section % 4 == 3:
+                block = "<pre><code>" + "\n".join(
+                    f"client.{rng.choice(WORDS)}({rng.choice(WORDS)}={rng.randint(0, 99)})" for _ in range(4)
+                ) + "</code></pre>"
+            else:
+                block = "<p>" + " ".join(rng.choice(WORDS) for _ in range(60)) + ".</p>"
+            parts.append(block)
+            size += len(block)
+            section += 1
+        return "\n".join(parts)
+
+    def render(self, index: int) -> str:
+        links = [self.parents[index], *self.children[index], *self.extra_links[index]]
+        nav = "".join(
+            f'<li><a href="{self.paths[link]}">Page {link}</a></li>' for link in links if link is not None
+        )
+        return f"""<!DOCTYPE html>
+<html><head><title>Page {index}</title></head>
+<body>
+<nav class="sidebar"><ul>{nav}</ul></nav>
+<main><h1>Page {index}</h1>
+{self._content(self.content_of[index])}
+</main>
+<footer>Synthetic documentation</footer>
+</body></html>"""
+
+    def sitemap(self, origin: str) -> str:
+        urls = "".join(f"<url><loc>{origin}{path}</loc></url>" for path in self.paths)
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+        path = request.path.rstrip("/") or "/"
+        if path == "/sitemap.xml" and self.config.sitemap:
+            return web.Response(text=self.sitemap(f"{request.scheme}://{request.host}"), content_type="application/xml")
+        index = self.index.get(path)
+        if index is None:
+            return web.Response(status=404, text="Not found")
+        if index in self.looping:
+            raise web.HTTPFound(request.path)
+        if index in self.failing:
+            self.failing.discard(index)
+            return web.Response(status=503, text="Try again")
+        if index in self.slow:
+            await asyncio.sleep(self.config.slow_delay)
+        return web.Response(text=self.render(index), content_type="text/html")
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+        return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--pages", type=int, default=1000, help="Number of pages")
+    parser.add_argument("--fan-out", type=int, default=10, help="Children per page")
+    parser.add_argument("--max-depth", type=int, default=None, help="Deepest level of the tree")
+    parser.add_argument("--page-kb", type=float, default=8.0, help="Content size per page in KB")
+    parser.add_argument("--links-per-page", type=int, default=5, help="Extra links to random pages")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="Share of pages duplicating another page")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of pages that respond slowly")
+    parser.add_argument("--slow-delay", type=float, default=0.5, help="Delay of slow pages in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of pages failing once with 503")
+    parser.add_argument("--redirect-loop-rate", type=float, default=0.0, help="Share of pages redirecting to themselves")
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay added to every response in seconds")
+    parser.add_argument("--sitemap", action="store_true", help="Serve /sitemap.xml listing every page")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def from_args(args: argparse.Namespace) -> MockSite:
+    return MockSite(SiteConfig(
+        pages=args.pages,
+        fan_out=args.fan_out,
+        max_depth=args.max_depth,
+        page_kb=args.page_kb,
+        links_per_page=args.links_per_page,
+        duplicate_rate=args.duplicate_rate,
+        slow_rate=args.slow_rate,
+        slow_delay=args.slow_delay,
+        error_rate=args.error_rate,
+        redirect_loop_rate=args.redirect_loop_rate,
+        latency=args.latency,
+        sitemap=args.sitemap,
+        seed=args.seed,
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--port", type=int, default=8800)
+    args = parser.parse_args()
+    site = from_args(args)
+    print(f"Serving {len(site.paths)} pages at http://127.0.0.1:{args.port}/docs", flush=True)
+    web.run_app(site.app(), host="127.0.0.1", port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Crawl and generate documentation for one or many sites without the web server.
+
+Sites are given as URLs and/or a file with one URL per line (blank lines and
+lines starting with # are ignored). Each site gets its own directory under
+--output-dir with crawl.json (the page tree) and the generated output, and a
+summary.json of the whole run is written next to them. Provider SDKs and the
+web stack are only imported when a command needs them.
+
+Usage:
+    python -m cli crawl https://docs.example.com [--sites sites.txt] [--parallel 4]
+    python -m cli generate --sites sites.txt --format llms-full --api-key KEY
+    python -m cli run --sites sites.txt --mode local --format jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from console import log, set_log_level
+
+# Constants
+DEFAULT_OUTPUT_DIR = "output"
+DEFAULT_PARALLEL_SITES = 4
+CRAWL_FILE = "crawl.json"
+SUMMARY_FILE = "summary.json"
+PLAN_FILE = "plan.json"
+UNSAFE_NAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def read_sites(urls: List[str], sites_file: Optional[str]) -> List[str]:
+    """URLs from the command line followed by those in the sites file, without duplicates."""
+    sites = list(urls)
+    if sites_file:
+        with open(sites_file, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    sites.append(line)
+    return list(dict.fromkeys(sites))
+
+
+def site_directory(url: str) -> str:
+    """Directory name for a site, e.g. docs.example.com_guide for https://docs.example.com/guide/."""
+    parsed = urlparse(url)
+    name = parsed.netloc + parsed.path.rstrip("/").replace("/", "_")
+    return UNSAFE_NAME_CHARS.sub("-", name) or "site"
+
+
+def count_pages(tree: Dict) -> int:
+    pages, stack = 0, [tree]
+    while stack:
+        node = stack.pop()
+        pages += 1
+        stack.extend(node.get("children", []))
+    return pages
+
+
+def _write_json(path: str, data) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class BatchRunner:
+    """Runs a command for many sites, at most `parallel` sites at a time.
+
+    All sites share one pool of HTTP connections, the HTTP cache and the
+    generation store, so the whole batch stays within one connection limit and
+    per-host politeness budget however many sites run at once.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.semaphore = asyncio.Semaphore(max(1, args.parallel))
+        self._clients = None
+        self._http_cache = None
+        self._generation_store = None
+        self._crawled = False
+
+    @property
+    def clients(self):
+        if self._clients is None:
+            from clients import ClientPool
+
+            self._clients = ClientPool(max_connections=self.args.max_connections)
+        return self._clients
+
+    async def close(self) -> None:
+        if self._clients is not None:
+            await self._clients.close()
+        if self._http_cache is not None:
+            self._http_cache.close()
+        if self._generation_store is not None:
+            self._generation_store.close()
+        if self._crawled:
+            from parsing import shutdown_parse_executors
+
+            shutdown_parse_executors()
+
+    async def crawl(self, url: str, directory: str) -> Dict:
+        from crawler import DocumentationCrawler
+        from http_cache import HttpCache, DEFAULT_CACHE_PATH
+
+        args = self.args
+        if args.cache and self._http_cache is None:
+            self._http_cache = HttpCache(os.getenv("CRAWL_CACHE_PATH", DEFAULT_CACHE_PATH))
+        crawler = DocumentationCrawler(
+            max_workers=args.workers,
+            max_concurrency=args.concurrency,
+            requests_per_second=args.rps,
+            max_depth=args.max_depth,
+            max_pages=args.max_pages,
+            parse_pool=args.parse_pool,
+            cache=self._http_cache,
+            include=args.include,
+            exclude=args.exclude,
+            respect_robots=not args.ignore_robots,
+            discovery=args.discovery,
+            client=self.clients.crawl_client,
+        )
+        self._crawled = True
+        try:
+            tree = await crawler.crawl(url)
+        finally:
+            await crawler.close()
+        if not tree:
+            raise Exception("Failed to crawl documentation. The URL might be invalid or the site might be blocking access.")
+        _write_json(os.path.join(directory, CRAWL_FILE), tree)
+        return tree
+
+    async def generate(self, tree: Dict, directory: str) -> Dict:
+        from generation_store import GenerationStore, DEFAULT_STORE_PATH
+        from outputs import DEFAULT_PART_TOKENS, create_writer
+        from processor import DocumentationProcessor
+
+        args = self.args
+        if self._generation_store is None:
+            self._generation_store = GenerationStore(os.getenv("GENERATION_STORE_PATH", DEFAULT_STORE_PATH))
+        base_url = os.getenv("LLM_BASE_URL")
+        needs_llm = args.mode != "local" and not args.dry_run
+        processor = DocumentationProcessor(
+            args.api_key or "",
+            use_groq=args.groq,
+            store=self._generation_store,
+            max_concurrency=args.llm_concurrency,
+            mode=args.mode,
+            batch_tokens=args.batch_tokens,
+            session=self.clients.llm_session if needs_llm and not args.groq else None,
+            groq_client=self.clients.groq_client(args.api_key, base_url) if needs_llm and args.groq else None,
+            base_url=base_url,
+        )
+        try:
+            if args.dry_run:
+                plan = processor.plan(tree)
+                _write_json(os.path.join(directory, PLAN_FILE), plan)
+                return {"pages": plan["pages"], "files": [PLAN_FILE], "plan": {
+                    name: value for name, value in plan.items() if name != "page_estimates"
+                }}
+            writer = create_writer(args.format, directory, args.part_tokens or DEFAULT_PART_TOKENS)
+            return await processor.write_output(tree, writer)
+        finally:
+            await processor.close()
+
+    async def run_site(self, url: str, command: str) -> Dict:
+        directory = os.path.join(self.args.output_dir, site_directory(url))
+        summary = {"url": url, "directory": directory}
+        async with self.semaphore:
+            start = time.perf_counter()
+            log(f"Starting {command} of {url}", "blue", "info")
+            try:
+                os.makedirs(directory, exist_ok=True)
+                if command == "generate":
+                    with open(os.path.join(directory, CRAWL_FILE), encoding="utf-8") as f:
+                        tree = json.load(f)
+                else:
+                    tree = await self.crawl(url, directory)
+                summary["pages"] = count_pages(tree)
+                if command != "crawl":
+                    result = await self.generate(tree, directory)
+                    summary["files"] = result["files"]
+                    if "plan" in result:
+                        summary["plan"] = result["plan"]
+                    else:
+                        summary["generated"] = result["pages"]
+                summary["status"] = "ok"
+                log(f"Finished {command} of {url}", "green", "info")
+            except Exception as e:
+                # One failing site does not stop the batch
+                log(f"Failed to {command} {url}: {str(e)}", "red", "error")
+                summary["status"] = "failed"
+                summary["error"] = str(e)
+            summary["seconds"] = round(time.perf_counter() - start, 2)
+        return summary
+
+    async def run(self, sites: List[str], command: str) -> List[Dict]:
+        try:
+            return await asyncio.gather(*(self.run_site(url, command) for url in sites))
+        finally:
+            await self.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m cli", description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("crawl", "generate", "run"),
+                        help="crawl sites, generate from earlier crawls, or both")
+    parser.add_argument("urls", nargs="*", help="Documentation start URLs")
+    parser.add_argument("--sites", help="File with one start URL per line")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL_SITES, help="Sites processed at once")
+    parser.add_argument("--max-connections", type=int, default=100, help="Open HTTP connections across all sites")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+
+    crawl = parser.add_argument_group("crawl options")
+    crawl.add_argument("--workers", type=int, default=8)
+    crawl.add_argument("--concurrency", type=int, default=8, help="Concurrent requests per site")
+    crawl.add_argument("--rps", type=float, default=10.0, help="Requests per second per host")
+    crawl.add_argument("--max-depth", type=int)
+    crawl.add_argument("--max-pages", type=int)
+    crawl.add_argument("--include", action="append", help="URL pattern to include (repeatable)")
+    crawl.add_argument("--exclude", action="append", help="URL pattern to exclude (repeatable)")
+    crawl.add_argument("--discovery", default="auto")
+    crawl.add_argument("--parse-pool", default="auto")
+    crawl.add_argument("--ignore-robots", action="store_true")
+    crawl.add_argument("--no-cache", dest="cache", action="store_false", help="Do not use the HTTP cache")
+
+    generate = parser.add_argument_group("generate options")
+    generate.add_argument("--api-key", default=os.getenv("LLM_API_KEY"), help="Defaults to $LLM_API_KEY")
+    generate.add_argument("--groq", action="store_true", help="Use Groq instead of DeepSeek")
+    generate.add_argument("--mode", default="llm", help="llm, local or auto")
+    generate.add_argument("--format", default="markdown", help="markdown, pages, jsonl, zip or llms-full")
+    generate.add_argument("--part-tokens", type=int, help="Token budget of each llms-full part (default 100000)")
+    generate.add_argument("--llm-concurrency", type=int, default=4, help="Pages generated at once per site")
+    generate.add_argument("--dry-run", action="store_true",
+                          help="Only estimate tokens, requests, time and cost into plan.json")
+    generate.add_argument("--batch-tokens", type=int, default=4000,
+                          help="Content tokens of small pages packed into one request (0 disables packing)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    set_log_level(args.log_level)
+
+    sites = read_sites(args.urls, args.sites)
+    if not sites:
+        parser.error("no sites given")
+    if args.command != "crawl":
+        from outputs import OUTPUT_FORMATS
+
+        if args.format not in OUTPUT_FORMATS:
+            parser.error(f"unknown format '{args.format}', expected one of {', '.join(OUTPUT_FORMATS)}")
+        if args.mode != "local" and not args.api_key and not args.dry_run:
+            parser.error("an API key is required unless --mode local is used (--api-key or $LLM_API_KEY)")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = asyncio.run(BatchRunner(args).run(sites, args.command))
+    failed = [result for result in results if result["status"] != "ok"]
+    _write_json(os.path.join(args.output_dir, SUMMARY_FILE), {
+        "command": args.command,
+        "seconds": round(time.perf_counter() - start, 2),
+        "sites": results,
+    })
+    log(f"{len(results) - len(failed)} of {len(results)} sites succeeded", "red" if failed else "green", "info")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import hashlib
+import os
+from typing import TYPE_CHECKING, Dict, Optional
+
+import httpx
+
+from console import log
+
+if TYPE_CHECKING:
+    # LLM clients are imported when first requested, so crawl-only use never loads them
+    import aiohttp
+    from groq import AsyncGroq
+
+# Constants
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection is kept open
+CRAWL_TIMEOUT = 30.0
+LLM_TIMEOUT = 600.0  # Generations of long pages can take minutes
+
+
+def http2_available() -> bool:
+    """HTTP/2 in httpx needs the optional h2 package (pip install httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ClientPool:
+    """Connection pools shared by every crawl and generation for the lifetime of the app.
+
+    Clients are created lazily inside the running event loop and reused across
+    requests and jobs, so keep-alive connections (and their TLS sessions) are not
+    rebuilt for every call. Crawlers and processors given a pooled client never
+    close it; the pool is closed once, on application shutdown.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = KEEPALIVE_EXPIRY,
+        http2: Optional[bool] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2_available() if http2 is None else http2
+        if self.http2 and not http2_available():
+            # Asking httpx for HTTP/2 without h2 fails when the client is built
+            log("Warning: HTTP/2 needs the h2 package (pip install httpx[http2]), using HTTP/1.1", "yellow", "warning")
+            self.http2 = False
+        self._crawl_client: Optional[httpx.AsyncClient] = None
+        self._llm_session: Optional["aiohttp.ClientSession"] = None
+        self._groq_http_client: Optional[httpx.AsyncClient] = None
+        self._groq_clients: Dict[str, "AsyncGroq"] = {}
+
+    @classmethod
+    def from_env(cls) -> "ClientPool":
+        http2 = os.getenv("HTTP2_ENABLED")
+        return cls(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", MAX_CONNECTIONS)),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", MAX_KEEPALIVE_CONNECTIONS)),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", KEEPALIVE_EXPIRY)),
+            http2=None if http2 is None else http2.lower() in ("1", "true", "yes"),
+        )
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def crawl_client(self) -> httpx.AsyncClient:
+        """Client used to fetch documentation pages, over HTTP/2 where servers support it."""
+        if self._crawl_client is None:
+            self._crawl_client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=CRAWL_TIMEOUT,
+                limits=self._limits(),
+                http2=self.http2,
+            )
+        return self._crawl_client
+
+    @property
+    def llm_session(self) -> "aiohttp.ClientSession":
+        """Session used for OpenAI-compatible chat completion APIs."""
+        if self._llm_session is None or self._llm_session.closed:
+            import aiohttp
+
+            self._llm_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    keepalive_timeout=self.keepalive_expiry,
+                ),
+                timeout=aiohttp.ClientTimeout(total=LLM_TIMEOUT),
+            )
+        return self._llm_session
+
+    def groq_client(self, api_key: str, base_url: Optional[str] = None) -> "AsyncGroq":
+        """Groq client for an API key and endpoint; all clients share one connection pool."""
+        from groq import AsyncGroq
+
+        if self._groq_http_client is None:
+            self._groq_http_client = httpx.AsyncClient(timeout=LLM_TIMEOUT, limits=self._limits())
+        account = hashlib.sha256(f"{base_url or ''}:{api_key}".encode("utf-8")).hexdigest()
+        if account not in self._groq_clients:
+            # Retries are handled by the processor so they respect the shared budget
+            self._groq_clients[account] = AsyncGroq(
+                api_key=api_key,
+                max_retries=0,
+                base_url=base_url,
+                http_client=self._groq_http_client,
+            )
+        return self._groq_clients[account]
+
+    async def close(self) -> None:
+        if self._crawl_client is not None:
+            await self._crawl_client.aclose()
+        if self._llm_session is not None:
+            await self._llm_session.close()
+        if self._groq_http_client is not None:
+            await self._groq_http_client.aclose()
+        self._crawl_client = self._llm_session = self._groq_http_client = None
+        self._groq_clients.clear()
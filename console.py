@@ -0,0 +1,27 @@
+import os
+from typing import Optional
+
+from termcolor import colored
+
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+# Per-page and per-request messages are logged at debug level; set LOG_LEVEL=debug to see them
+DEFAULT_LOG_LEVEL = "info"
+
+_threshold = LOG_LEVELS.get(os.getenv("LOG_LEVEL", DEFAULT_LOG_LEVEL).lower(), LOG_LEVELS[DEFAULT_LOG_LEVEL])
+
+
+def set_log_level(level: str) -> None:
+    global _threshold
+    if level.lower() not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level '{level}', expected one of {', '.join(LOG_LEVELS)}")
+    _threshold = LOG_LEVELS[level.lower()]
+
+
+def log_enabled(level: str) -> bool:
+    return LOG_LEVELS[level] >= _threshold
+
+
+def log(message: str, color: Optional[str] = None, level: str = "info") -> None:
+    """Print a colored console message if its level is enabled."""
+    if LOG_LEVELS[level] >= _threshold:
+        print(colored(message, color) if color else message)
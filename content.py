@@ -0,0 +1,142 @@
+import functools
+import re
+from typing import List
+
+from bs4 import BeautifulSoup, Tag
+
+from markdown_converter import MarkdownConverter
+
+# Elements that never contain documentation content
+BOILERPLATE_TAGS = [
+    'nav', 'footer', 'aside', 'script', 'style', 'noscript',
+    'form', 'iframe', 'svg', 'button', 'template', 'link', 'meta',
+]
+BOILERPLATE_PATTERN = re.compile(
+    r'(^|[-_\s])(nav|navbar|menu|sidebar|toc|breadcrumbs?|footer|cookie|banner|skip-link|edit-page|pagination)([-_\s]|$)',
+    re.IGNORECASE
+)
+HEADING_PATTERN = re.compile(r'^#{1,6}\s')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+@functools.lru_cache(maxsize=None)
+def _token_encoding():
+    # Optional: tiktoken counts tokens exactly, but needs the package and its encoding file
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def tokenizer_name() -> str:
+    return "cl100k_base" if _token_encoding() else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when it is installed, otherwise estimate_tokens()."""
+    encoding = _token_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def extract_main_content(soup: BeautifulSoup) -> Tag:
+    """Return the element most likely to hold the page's documentation content."""
+    return (
+        soup.find('main')
+        or soup.find(attrs={'role': 'main'})
+        or soup.find('article')
+        or soup.body
+        or soup
+    )
+
+
+def strip_boilerplate(element: Tag) -> Tag:
+    """Remove navigation, chrome, scripts and styles from an element in place."""
+    for tag in element.find_all(BOILERPLATE_TAGS):
+        tag.decompose()
+    for tag in element.find_all(True):
+        if tag.decomposed or tag.attrs is None:
+            continue
+        classes = ' '.join(tag.get('class', []))
+        if (classes and BOILERPLATE_PATTERN.search(classes)) or BOILERPLATE_PATTERN.search(tag.get('id', '') or ''):
+            tag.decompose()
+    return element
+
+
+def reduce_html(soup: BeautifulSoup, base_url: str = "") -> str:
+    """Strip boilerplate from a parsed page and return its main content as markdown.
+
+    This mutates the soup, so it must run after links have been extracted.
+    """
+    return MarkdownConverter(base_url).convert(strip_boilerplate(extract_main_content(soup)))
+
+
+def _split_sections(text: str) -> List[str]:
+    """Split markdown text at heading lines that are not inside code fences."""
+    sections: List[str] = []
+    current: List[str] = []
+    in_code = False
+    for line in text.split('\n'):
+        if line.startswith('```'):
+            in_code = not in_code
+        if not in_code and HEADING_PATTERN.match(line) and current:
+            sections.append('\n'.join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append('\n'.join(current))
+    return sections
+
+
+def _split_oversized(section: str, max_tokens: int) -> List[str]:
+    """Split a section that is larger than the budget at paragraphs, then by length."""
+    max_chars = max_tokens * 4
+    pieces: List[str] = []
+    current = ''
+    for paragraph in section.split('\n\n'):
+        while len(paragraph) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        candidate = f"{current}\n\n{paragraph}" if current else paragraph
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = paragraph
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Split text into chunks of at most max_tokens, preferring heading boundaries."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    chunks: List[str] = []
+    current = ''
+    for section in _split_sections(text):
+        if estimate_tokens(section) > max_tokens:
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.extend(_split_oversized(section, max_tokens))
+            continue
+        candidate = f"{current}\n{section}" if current else section
+        if estimate_tokens(candidate) > max_tokens:
+            chunks.append(current)
+            current = section
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
@@ -0,0 +1,170 @@
+import base64
+import hashlib
+import math
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+
+def url_hash(url: str) -> int:
+    """Stable 64-bit hash of a URL (stable across processes, unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit hashes."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: int) -> Iterator[int]:
+        # Double hashing: derive every probe from the two halves of the 64-bit hash
+        first, second = value & 0xFFFFFFFF, (value >> 32) | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, value: int) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: int) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class UrlSet:
+    """Set of URLs kept as 64-bit hashes instead of full strings.
+
+    With bloom_capacity set, membership is tracked by a fixed-size Bloom filter
+    instead: memory no longer grows with the number of URLs, at the cost of a small
+    chance (error_rate) of treating an unseen URL as already visited.
+    """
+
+    def __init__(self, bloom_capacity: Optional[int] = None, error_rate: float = 0.001):
+        self.bloom = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else None
+        self.hashes = set() if self.bloom is None else None
+
+    def add(self, url: str) -> None:
+        if self.bloom is not None:
+            self.bloom.add(url_hash(url))
+        else:
+            self.hashes.add(url_hash(url))
+
+    def update(self, urls: Iterable[str]) -> None:
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url: str) -> bool:
+        value = url_hash(url)
+        return value in self.bloom if self.bloom is not None else value in self.hashes
+
+    def __len__(self) -> int:
+        return self.bloom.count if self.bloom is not None else len(self.hashes)
+
+    def to_state(self) -> Union[List[int], Dict]:
+        """JSON-serializable form for crawl checkpoints."""
+        if self.bloom is None:
+            return list(self.hashes)
+        return {
+            "capacity": self.bloom.capacity,
+            "error_rate": self.bloom.error_rate,
+            "count": self.bloom.count,
+            "bits": base64.b64encode(self.bloom.bits).decode('ascii'),
+        }
+
+    def load_state(self, state: Union[List, Dict]) -> None:
+        """Merge a checkpointed set; plain lists of URL strings are accepted too."""
+        if isinstance(state, dict):
+            self.bloom = BloomFilter(state["capacity"], state["error_rate"])
+            self.bloom.bits = bytearray(base64.b64decode(state["bits"]))
+            self.bloom.count = state["count"]
+            self.hashes = None
+            return
+        for item in state:
+            value = url_hash(item) if isinstance(item, str) else item
+            if self.bloom is not None:
+                self.bloom.add(value)
+            else:
+                self.hashes.add(value)
+
+
+class PageRecord:
+    """A collected page. Content lives in memory or, once spilled, in the store's file."""
+
+    __slots__ = ("url", "title", "simhash", "content", "spill")
+
+    def __init__(self, url: str, title: str, content: Optional[str], simhash: Optional[int]):
+        self.url = url
+        self.title = title
+        self.content = content
+        self.simhash = simhash
+        self.spill = None  # (offset, length) in the spill file
+
+
+class PageStore:
+    """Collected pages as compact records, spilling content to disk past a memory budget.
+
+    Content is kept in memory until it adds up to max_memory_bytes; after that, page
+    content is appended to an anonymous temporary file and read back on demand.
+    """
+
+    def __init__(self, max_memory_bytes: Optional[int] = None):
+        self.max_memory_bytes = max_memory_bytes
+        self.memory_bytes = 0
+        self.records: List[PageRecord] = []
+        self._spill_file = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[PageRecord]:
+        return iter(self.records)
+
+    def __getitem__(self, index: int) -> PageRecord:
+        return self.records[index]
+
+    def append(self, url: str, title: str, content: Optional[str], simhash: Optional[int] = None) -> PageRecord:
+        record = PageRecord(url, title, content, simhash)
+        if content and self.max_memory_bytes is not None and self.memory_bytes + len(content) > self.max_memory_bytes:
+            self._spill(record)
+        elif content:
+            self.memory_bytes += len(content)
+        self.records.append(record)
+        return record
+
+    def _spill(self, record: PageRecord) -> None:
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile()
+        data = record.content.encode('utf-8')
+        self._spill_file.seek(0, 2)
+        record.spill = (self._spill_file.tell(), len(data))
+        self._spill_file.write(data)
+        record.content = None
+
+    def content(self, record: PageRecord) -> Optional[str]:
+        if record.spill is None:
+            return record.content
+        offset, length = record.spill
+        self._spill_file.seek(offset)
+        return self._spill_file.read(length).decode('utf-8')
+
+    def as_dict(self, record: PageRecord) -> Dict:
+        return {
+            "url": record.url,
+            "title": record.title,
+            "content": self.content(record),
+            "simhash": record.simhash,
+        }
+
+    def dicts(self, start: int = 0) -> List[Dict]:
+        """Pages from index start onwards as plain dicts, with spilled content read back."""
+        return [self.as_dict(record) for record in self.records[start:]]
+
+    def close(self) -> None:
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
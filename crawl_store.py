@@ -0,0 +1,280 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from url_policy import canonicalize
+
+# Constants
+DEFAULT_CRAWL_STORE_PATH = os.path.join(".cache", "crawls.sqlite3")
+DEFAULT_CRAWL_TTL = 6 * 60 * 60  # Seconds a crawl result is served before the site is crawled again
+
+
+def crawl_key(url: str, options: Dict) -> str:
+    """Identify a crawl by the canonical start URL and the options that shape its result."""
+    digest = hashlib.sha256()
+    digest.update(canonicalize(url).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def strip_content(tree: Dict) -> Dict:
+    """Copy of a page tree without page content, for clients that only need the structure."""
+    return {
+        **{name: value for name, value in tree.items() if name not in ("content", "content_ref", "children")},
+        "children": [strip_content(child) for child in tree.get("children", [])],
+    }
+
+
+def select_pages(tree: Dict, urls: Iterable[str]) -> Dict:
+    """Mark the pages whose URL is in urls as selected and every other page as not selected."""
+    urls = set(urls)
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        node["selected"] = node.get("url") in urls
+        stack.extend(node.get("children", []))
+    return tree
+
+
+class CrawlStore:
+    """Persistent store of crawl results with a time-to-live.
+
+    Trees are stored without their page content; content is stored once per distinct
+    text and referenced by hash, so repeated crawls of a site share unchanged pages.
+    A crawl can stream its content in with put_contents() before its tree is stored,
+    so the finished tree only carries content_ref hashes and never holds every page.
+    """
+
+    def __init__(self, path: str = DEFAULT_CRAWL_STORE_PATH, ttl: float = DEFAULT_CRAWL_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS crawls (
+                id TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                tree TEXT NOT NULL,
+                pages INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS crawls_key ON crawls (key, created_at);
+            CREATE TABLE IF NOT EXISTS crawl_contents (
+                crawl_id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (crawl_id, hash)
+            );
+            CREATE INDEX IF NOT EXISTS crawl_contents_hash ON crawl_contents (hash);
+            CREATE TABLE IF NOT EXISTS contents (
+                hash TEXT PRIMARY KEY,
+                content TEXT NOT NULL
+            );"""
+        )
+        self._conn.commit()
+
+    def _info(self, row) -> Dict:
+        return {"crawl_id": row[0], "url": row[1], "page_count": row[2], "created_at": row[3], "expires_at": row[4]}
+
+    def reserve(self) -> str:
+        """A new crawl_id to stream content under with put_contents() before put()."""
+        return uuid.uuid4().hex
+
+    def put_contents(self, crawl_id: str, contents: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """Store page contents for a crawl one at a time, returning each one's content_ref.
+
+        Empty contents get None. The content is kept for the crawl even before its tree
+        is stored; call discard() if the crawl is abandoned.
+        """
+        refs: List[Optional[str]] = []
+
+        def rows():
+            for content in contents:
+                digest = _content_hash(content) if content else None
+                refs.append(digest)
+                if digest:
+                    yield digest, content
+
+        with self._lock:
+            for digest, content in rows():
+                self._conn.execute("INSERT OR IGNORE INTO contents (hash, content) VALUES (?, ?)", (digest, content))
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO crawl_contents (crawl_id, hash) VALUES (?, ?)", (crawl_id, digest)
+                )
+            self._conn.commit()
+        return refs
+
+    def content(self, digest: str) -> Optional[str]:
+        """The content behind a content_ref, or None once it has expired."""
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM contents WHERE hash = ?", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def discard(self, crawl_id: str) -> None:
+        """Forget content streamed in for a crawl whose tree was never stored."""
+        with self._lock:
+            self._conn.execute("DELETE FROM crawl_contents WHERE crawl_id = ?", (crawl_id,))
+            self._conn.execute("DELETE FROM contents WHERE hash NOT IN (SELECT hash FROM crawl_contents)")
+            self._conn.commit()
+
+    def put(self, key: str, url: str, tree: Dict, crawl_id: Optional[str] = None) -> Dict:
+        """Store a crawl result and return its metadata, including the crawl_id.
+
+        Pages may carry their content, or a content_ref from put_contents() under the
+        same (reserved) crawl_id.
+        """
+        contents: Dict[str, Optional[str]] = {}
+        pages = 0
+
+        def reference(page: Dict) -> Dict:
+            nonlocal pages
+            pages += 1
+            node = {name: value for name, value in page.items() if name not in ("content", "children")}
+            if page.get("content"):
+                digest = _content_hash(page["content"])
+                contents[digest] = page["content"]
+                node["content_ref"] = digest
+            elif page.get("content_ref"):
+                contents[page["content_ref"]] = None
+            node["children"] = [reference(child) for child in page.get("children", [])]
+            return node
+
+        skeleton = reference(tree)
+        crawl_id = crawl_id or self.reserve()
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO contents (hash, content) VALUES (?, ?)",
+                ((digest, content) for digest, content in contents.items() if content is not None),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO crawl_contents (crawl_id, hash) VALUES (?, ?)",
+                ((crawl_id, digest) for digest in contents),
+            )
+            self._conn.execute(
+                "INSERT INTO crawls (id, key, url, tree, pages, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (crawl_id, key, url, json.dumps(skeleton), pages, now, now + self.ttl),
+            )
+            self._conn.commit()
+        return {"crawl_id": crawl_id, "url": url, "page_count": pages, "created_at": now, "expires_at": now + self.ttl}
+
+    def latest(self, key: str) -> Optional[Dict]:
+        """Metadata of the newest unexpired crawl for a key, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, url, pages, created_at, expires_at FROM crawls"
+                " WHERE key = ? AND expires_at > ? ORDER BY created_at DESC LIMIT 1",
+                (key, time.time()),
+            ).fetchone()
+        return self._info(row) if row else None
+
+    def info(self, crawl_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, url, pages, created_at, expires_at FROM crawls WHERE id = ? AND expires_at > ?",
+                (crawl_id, time.time()),
+            ).fetchone()
+        return self._info(row) if row else None
+
+    def get(self, crawl_id: str, include_content: bool = True, references: bool = False) -> Optional[Dict]:
+        """Return a stored page tree, or None if it does not exist or has expired.
+
+        With references, pages keep their content_ref for content() to load on demand.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tree FROM crawls WHERE id = ? AND expires_at > ?", (crawl_id, time.time())
+            ).fetchone()
+            if not row:
+                return None
+            contents = dict(self._conn.execute(
+                "SELECT contents.hash, contents.content FROM crawl_contents"
+                " JOIN contents ON contents.hash = crawl_contents.hash WHERE crawl_contents.crawl_id = ?",
+                (crawl_id,),
+            ).fetchall()) if include_content and not references else {}
+        tree = json.loads(row[0])
+
+        def resolve(node: Dict) -> None:
+            digest = node.pop("content_ref", None)
+            if include_content:
+                node["content"] = contents.get(digest, "") if digest else ""
+            for child in node["children"]:
+                resolve(child)
+
+        if not references:
+            resolve(tree)
+        return tree
+
+    def purge_expired(self) -> int:
+        """Delete expired crawls and content no remaining crawl refers to."""
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT id FROM crawls WHERE expires_at <= ?", (time.time(),)
+            )]
+            for crawl_id in expired:
+                self._conn.execute("DELETE FROM crawl_contents WHERE crawl_id = ?", (crawl_id,))
+                self._conn.execute("DELETE FROM crawls WHERE id = ?", (crawl_id,))
+            if expired:
+                self._conn.execute("DELETE FROM contents WHERE hash NOT IN (SELECT hash FROM crawl_contents)")
+            self._conn.commit()
+        return len(expired)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SingleFlight:
+    """Run at most one instance of an async operation per key at a time.
+
+    Callers asking for a key that is already running wait for that run's result
+    instead of starting their own. The run is shielded, so it keeps going for the
+    other waiters if one of them disconnects; it is cancelled only when every
+    waiter has gone.
+    """
+
+    def __init__(self):
+        self._running: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    def running(self, key: str) -> bool:
+        return key in self._running
+
+    async def run(self, key: str, operation: Callable[[], Awaitable]):
+        task = self._running.get(key)
+        if task is None:
+            task = asyncio.create_task(operation())
+            self._running[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._running.get(key) is task:
+            del self._running[key]
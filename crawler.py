@@ -1,16 +1,104 @@
 import asyncio
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-from termcolor import colored
+import functools
+import time
+from concurrent.futures import BrokenExecutor
+from urllib.parse import urlparse
+from console import log
 import httpx
-from typing import Set, List, Dict
-import re
+from typing import Callable, Iterable, List, Dict, Optional, Tuple
+
+from http_cache import HttpCache
+from rate_limit import HostThrottle, backoff_delay, parse_retry_after
+from page_tree import build_page_tree
+from sitemap import discover_urls, parse_lastmod
+from url_policy import ROBOTS_USER_AGENT, UrlPolicy, canonicalize, clean_url, parse_robots, same_page
+from dedupe import DEFAULT_MAX_DISTANCE, SimHashIndex
+from crawl_state import PageStore, UrlSet
+from parsing import get_parse_executor, parse_page, replace_parse_executor, resolve_parser
+from metrics import CACHE_RESULTS, FETCH_ERRORS, FETCH_RETRIES, PAGES_CRAWLED, PAGES_SKIPPED, STAGE_SECONDS, HttpTrace, timed
+from urllib.robotparser import RobotFileParser
+
+# Bump when the shape of parsed pages changes so cached parses are not reused
+PARSE_VERSION = 6
+# Transient failures worth retrying, and how often
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_FETCH_RETRIES = 3
+FETCH_RETRY_DELAY = 1.0  # Base delay in seconds for exponential backoff
+# How pages are discovered: sitemaps/llms.txt when available ("auto"), links only ("crawl"), or both ("hybrid")
+DISCOVERY_MODES = ("auto", "crawl", "hybrid")
 
 class DocumentationCrawler:
-    def __init__(self):
-        self.visited_urls: Set[str] = set()
+    def __init__(
+        self,
+        max_workers: int = 8,
+        max_concurrency: int = 8,
+        per_host_concurrency: int = 4,
+        requests_per_second: Optional[float] = 10.0,
+        max_depth: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        parser: str = "auto",
+        retain_content: bool = True,
+        cache: Optional[HttpCache] = None,
+        force_refresh: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        keywords: Optional[List[str]] = None,
+        respect_robots: bool = True,
+        discovery: str = "auto",
+        detect_duplicates: bool = True,
+        max_duplicate_distance: int = DEFAULT_MAX_DISTANCE,
+        client: Optional[httpx.AsyncClient] = None,
+        max_memory_mb: Optional[int] = None,
+        visited_bloom_capacity: Optional[int] = None,
+        parse_pool: str = "auto",
+        parse_workers: Optional[int] = None,
+        content_sink: Optional[Callable[[Iterable[Optional[str]]], List[Optional[str]]]] = None,
+        rate_share: float = 1.0,
+    ):
+        if discovery not in DISCOVERY_MODES:
+            raise ValueError(f"Unknown discovery mode: {discovery}")
+        # Compact crawl state: URL sets hold 64-bit hashes (or a Bloom filter), and page
+        # content beyond max_memory_mb is spilled to a temporary file
+        self.visited_bloom_capacity = visited_bloom_capacity
+        self.max_memory_mb = max_memory_mb
+        self.visited_urls = UrlSet(visited_bloom_capacity)
         self.base_url: str = ""
         self.base_domain: str = ""
+        self.base_origin: str = ""
+        # URL filtering rules, compiled into a UrlPolicy when the crawl starts
+        self.include = include
+        self.exclude = exclude
+        self.keywords = keywords
+        self.respect_robots = respect_robots
+        self.policy: Optional[UrlPolicy] = None
+        # Sitemap/llms.txt seeding; lastmod timestamps let unchanged cached pages skip the network
+        self.discovery = discovery
+        self.lastmod: Dict[str, float] = {}
+        # Near-duplicate detection on page content (e.g. /v1/ and /v2/ copies of a page)
+        self.detect_duplicates = detect_duplicates
+        self.max_duplicate_distance = max_duplicate_distance
+        # Frontier scheduling limits
+        self.max_workers = max(1, max_workers)
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.requests_per_second = requests_per_second
+        # Share of each host's rate (requests_per_second and robots.txt limits) this
+        # crawler may use, e.g. 1/N for each of N distributed workers
+        self.rate_share = rate_share
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._throttles: Dict[str, HostThrottle] = {}
+        # Page parsing options
+        self.parser = resolve_parser(parser)
+        self._parse_executor = get_parse_executor(parse_pool, parse_workers)
+        self.retain_content = retain_content
+        # Where finished page content goes instead of the returned tree, e.g.
+        # CrawlStore.put_contents; the tree then carries a content_ref per page
+        self.content_sink = content_sink
+        # Persistent response cache used for conditional revalidation
+        self.cache = cache
+        self.force_refresh = force_refresh
         # Add browser-like headers
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -25,397 +113,534 @@ class DocumentationCrawler:
             'Sec-Fetch-User': '?1',
             'DNT': '1',
         }
-        self.client = httpx.AsyncClient(
+        # A shared, pooled client may be passed in; the crawler only closes a client it created
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
             follow_redirects=True,
             headers=self.headers,
             timeout=30.0
         )
     
     async def close(self):
-        await self.client.aclose()
+        if self._owns_client:
+            await self.client.aclose()
     
-    def _is_valid_url(self, url: str) -> bool:
-        """Check if URL is valid and belongs to the same domain."""
-        try:
-            parsed = urlparse(url)
-            base_parsed = urlparse(self.base_url)
-            
-            # Check if it's a valid URL and on the same domain
-            is_valid = (
-                bool(parsed.netloc) and
-                bool(parsed.scheme) and
-                parsed.netloc == self.base_domain and
-                not any(ext in url.lower() for ext in ['.pdf', '.zip', '.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.woff', '.ttf'])
-            )
-            
-            # Check if it's a documentation page or subpage
-            is_doc_page = (
-                parsed.path.startswith(base_parsed.path) or
-                any(keyword in parsed.path.lower() for keyword in [
-                    'documentation', 'docs', 'api', 'guide', 'reference', 'getting-started',
-                    'authentication', 'web', 'youtube', 'crawl', 'map', 'scrape', 'transcript'
-                ])
-            )
-            
-            return is_valid and (is_doc_page or url == self.base_url)
+    def _throttle_for(self, host: str) -> HostThrottle:
+        throttle = self._throttles.get(host)
+        if throttle is None:
+            rate = self.requests_per_second * self.rate_share if self.requests_per_second else None
+            throttle = HostThrottle(rate, self.per_host_concurrency)
+            self._throttles[host] = throttle
+        return throttle
+    
+    async def _request(self, url: str, headers: Dict[str, str]) -> httpx.Response:
+        """GET a URL within the global and per-host limits, retrying transient failures.
+        
+        Retries 429/5xx responses and connection errors with jittered exponential
+        backoff, waiting at least as long as the server's Retry-After asks.
+        """
+        if self._global_semaphore is None:
+            self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        throttle = self._throttle_for(urlparse(url).netloc)
+        
+        for attempt in range(MAX_FETCH_RETRIES + 1):
+            retry_after = None
+            async with self._global_semaphore:
+                await throttle.acquire()
+                started = time.monotonic()
+                trace = HttpTrace()
+                try:
+                    response = await self.client.get(
+                        url,
+                        headers={**self.headers, **headers},
+                        extensions={"trace": trace},
+                    )
+                except httpx.TransportError as e:
+                    await throttle.release(None, None)
+                    if attempt == MAX_FETCH_RETRIES:
+                        raise
+                    reason = str(e) or type(e).__name__
+                except BaseException:
+                    # Redirect loops, undecodable bodies, invalid URLs and cancellation say
+                    # nothing about the server's load, but the slot must still be returned
+                    await throttle.discard()
+                    raise
+                else:
+                    trace.observe()
+                    await throttle.release(time.monotonic() - started, response.status_code)
+                    if response.status_code not in RETRY_STATUSES or attempt == MAX_FETCH_RETRIES:
+                        return response
+                    reason = f"HTTP {response.status_code}"
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if retry_after is not None:
+                        throttle.pause(retry_after)
             
-        except Exception as e:
-            print(colored(f"Error validating URL {url}: {str(e)}", "red"))
-            return False
+            delay = backoff_delay(attempt, FETCH_RETRY_DELAY, retry_after)
+            FETCH_RETRIES.inc()
+            log(f"Retrying {url} in {delay:.1f}s ({reason})", "yellow", "warning")
+            await asyncio.sleep(delay)
     
     def _clean_url(self, url: str) -> str:
-        """Clean URL by removing fragments and query parameters."""
+        """Clean URL by removing fragments and query parameters, keeping the path as linked."""
+        return clean_url(url)
+    
+    async def _load_robots(self) -> Optional[RobotFileParser]:
+        """Fetch and parse robots.txt for the start host."""
         try:
-            parsed = urlparse(url)
-            # Keep the trailing slash if it exists
-            path = parsed.path if parsed.path.endswith('/') else parsed.path.rstrip('/')
-            return f"{parsed.scheme}://{parsed.netloc}{path}"
+            response = await self._request(f"{self.base_origin}/robots.txt", {})
+            if response.status_code == 200:
+                return parse_robots(response.text)
         except Exception as e:
-            print(colored(f"Error cleaning URL {url}: {str(e)}", "red"))
-            return url
+            log(f"Warning: Could not load robots.txt: {str(e)}", "yellow", "warning")
+        return None
+    
+    def _apply_crawl_delay(self, robots: RobotFileParser) -> None:
+        """Slow the start host down to the Crawl-delay / Request-rate robots.txt asks for."""
+        rates = []
+        delay = robots.crawl_delay(ROBOTS_USER_AGENT)
+        if delay:
+            rates.append(1.0 / float(delay))
+        request_rate = robots.request_rate(ROBOTS_USER_AGENT)
+        if request_rate and request_rate.seconds:
+            rates.append(request_rate.requests / request_rate.seconds)
+        if rates:
+            log(f"Honouring robots.txt: at most {min(rates):.2f} requests per second", "yellow", "warning")
+            self._throttle_for(self.base_domain).set_rate(min(rates) * self.rate_share)
     
-    async def _fetch_page(self, url: str) -> tuple[str, str]:
-        """Fetch page content and return title and HTML."""
+    async def _discover_seeds(self, robots: Optional[RobotFileParser]) -> Tuple[List[str], bool]:
+        """List pages from sitemaps and llms.txt, remembering their lastmod dates.
+        
+        Also returns whether links still need to be followed: in auto mode only a
+        sitemap listing pages within the crawl's scope replaces link following.
+        """
+        if self.discovery == "crawl":
+            return [], True
         try:
-            print(colored(f"Fetching {url}", "cyan"))
-            response = await self.client.get(url)
-            response.raise_for_status()
-            
-            # Parse the HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Get title from meta tags or title tag
-            title = (
-                soup.find('meta', property='og:title')
-                or soup.find('meta', {'name': 'title'})
-                or soup.title
+            sitemap_pages, llms_links = await discover_urls(
+                self.client,
+                self.base_url,
+                robots.site_maps() if robots else None,
+                headers=self.headers,
             )
-            title = title.get('content', '') if hasattr(title, 'get') else title.string if title else ''
-            title = title.strip() or url.split('/')[-1]
-            
-            # If we're on the first page, try to extract documentation links from known patterns
-            if url == self.base_url:
-                # Add common documentation paths to check
-                common_paths = [
-                    '/documentation',
-                    '/docs',
-                    '/api',
-                    '/guide',
-                    '/reference',
-                ]
+        except Exception as e:
+            log(f"Warning: Sitemap discovery failed: {str(e)}", "yellow", "warning")
+            return [], True
+        seeds = {}
+        for url, lastmod in sitemap_pages.items():
+            url = self._clean_url(url)
+            timestamp = parse_lastmod(lastmod)
+            if timestamp is not None:
+                self.lastmod[canonicalize(url)] = timestamp
+            seeds[url] = True
+        listed = any(self.policy.allows(url) for url in seeds)
+        for url in llms_links:
+            seeds.setdefault(self._clean_url(url), True)
+        log(f"Found {len(seeds)} URLs in sitemaps and llms.txt", "green", "info")
+        # With a sitemap listing the pages in scope, following links only re-discovers them
+        return list(seeds), not (listed and self.discovery == "auto")
+    
+    async def _fetch_page(self, url: str) -> Optional[Dict]:
+        """Fetch a page and parse it once into its title, links and content."""
+        with timed("fetch_page", url=url):
+            try:
+                # Variants of a URL share one cache entry and lastmod date
+                key = canonicalize(url)
+                # The cache is SQLite on disk: keep its reads and writes off the event loop
+                cached = await asyncio.to_thread(self.cache.get, key) if self.cache and not self.force_refresh else None
+                if cached and key in self.lastmod and cached["fetched_at"] >= self.lastmod[key]:
+                    # The sitemap says the page has not changed since it was cached
+                    log(f"Unchanged since last crawl: {url}", "cyan", "debug")
+                    CACHE_RESULTS.inc(result="fresh")
+                    return await self._reuse_cached_page(cached, url)
+                headers = {}
+                if cached:
+                    if cached["etag"]:
+                        headers['If-None-Match'] = cached["etag"]
+                    if cached["last_modified"]:
+                        headers['If-Modified-Since'] = cached["last_modified"]
                 
-                # Inject these paths into the HTML for discovery
-                nav = soup.find('nav') or soup.new_tag('nav')
-                for path in common_paths:
-                    full_url = urljoin(self.base_url, path)
-                    if self._is_valid_url(full_url):
-                        link = soup.new_tag('a', href=path)
-                        link.string = path
-                        nav.append(link)
+                log(f"Fetching {url}", "cyan", "debug")
+                response = await self._request(url, headers)
                 
-                # Also look for documentation links in the text
-                doc_patterns = [
-                    r'href="[^"]*documentation[^"]*"',
-                    r'href="[^"]*docs[^"]*"',
-                    r'href="[^"]*api[^"]*"',
-                    r'href="/[^"]*"'  # Any internal link
-                ]
+                if response.status_code == 304 and cached:
+                    # Unchanged since the last crawl: skip download and re-parsing
+                    log(f"Not modified: {url}", "cyan", "debug")
+                    CACHE_RESULTS.inc(result="not_modified")
+                    return await self._reuse_cached_page(cached, url)
                 
-                for pattern in doc_patterns:
-                    for match in re.finditer(pattern, response.text):
-                        href = re.search(r'href="([^"]*)"', match.group(0))
-                        if href:
-                            link = soup.new_tag('a', href=href.group(1))
-                            nav.append(link)
-            
-            return title, str(soup)
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                # For 404 errors, just skip this page but don't stop crawling
-                print(colored(f"Page not found: {url}", "yellow"))
-                return None, None
-            raise
-        except Exception as e:
-            print(colored(f"Error fetching {url}: {str(e)}", "red"))
-            return None, None
+                response.raise_for_status()
+                if self.cache:
+                    CACHE_RESULTS.inc(result="miss")
+                page = await self._parse_page(response.text, url, str(response.url))
+                if self.cache:
+                    await asyncio.to_thread(
+                        self.cache.put,
+                        key,
+                        response.text,
+                        etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified'),
+                        parsed=self._cacheable_page(page),
+                    )
+                return page
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code in (404, 410):
+                    # For missing pages, just skip this page but don't stop crawling
+                    log(f"Page not found: {url}", "yellow", "warning")
+                    return None
+                raise
+            except Exception as e:
+                FETCH_ERRORS.inc()
+                log(f"Error fetching {url}: {str(e)}", "red", "error")
+                return None
     
-    def _extract_links(self, html: str, current_url: str) -> List[str]:
-        """Extract valid documentation links from HTML."""
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
-            links = set()  # Use a set to avoid duplicates
-            
-            # First try to find links in navigation elements
-            nav_elements = soup.find_all(['nav', 'header', 'aside', 'div'], class_=lambda x: x and any(term in x.lower() for term in ['nav', 'menu', 'sidebar', 'toc']))
-            
-            # If no navigation elements found, look in the whole document
-            elements_to_search = nav_elements if nav_elements else [soup]
-            
-            for element in elements_to_search:
-                for a in element.find_all('a', href=True):
-                    href = a['href']
-                    
-                    # Skip empty links and javascript links
-                    if not href or href.startswith(('javascript:', '#', 'mailto:', 'tel:')):
-                        continue
-                    
-                    # Handle relative URLs
-                    if href.startswith('/'):
-                        parsed_base = urlparse(self.base_url)
-                        href = f"{parsed_base.scheme}://{parsed_base.netloc}{href}"
-                    elif not href.startswith(('http://', 'https://')):
-                        href = urljoin(current_url, href)
-                    
-                    clean_url = self._clean_url(href)
-                    if clean_url not in self.visited_urls and self._is_valid_url(clean_url):
-                        links.add(clean_url)
-            
-            # If we're on the first page, also look for documentation-specific links
-            if current_url == self.base_url:
-                doc_paths = [
-                    '/documentation',
-                    '/docs',
-                    '/api',
-                    '/guide',
-                    '/reference',
-                    '/documentation/getting-started',
-                    '/documentation/authentication',
-                    '/documentation/web',
-                    '/documentation/youtube'
-                ]
-                
-                for path in doc_paths:
-                    full_url = urljoin(self.base_url, path)
-                    clean_url = self._clean_url(full_url)
-                    if clean_url not in self.visited_urls and self._is_valid_url(clean_url):
-                        links.add(clean_url)
-            
-            # Sort links to maintain consistent order
-            return sorted(list(links))
-        except Exception as e:
-            print(colored(f"Error extracting links from {current_url}: {str(e)}", "red"))
-            return []
+    def _cacheable_page(self, page: Dict) -> Dict:
+        """Tag a parsed page with the options it depends on so stale parses are not reused."""
+        return {
+            **page,
+            "base_url": self.base_url,
+            "retain_content": self.retain_content,
+            "parse_version": PARSE_VERSION,
+        }
+    
+    async def _reuse_cached_page(self, cached: Dict, url: str) -> Dict:
+        """Return the stored parse of a revalidated page, re-parsing the body only if options changed."""
+        parsed = cached["parsed"]
+        if (
+            parsed
+            and parsed.get("base_url") == self.base_url
+            and parsed.get("parse_version") == PARSE_VERSION
+            and (parsed.get("retain_content") or not self.retain_content)
+        ):
+            await asyncio.to_thread(self.cache.touch, cached["url"])
+            return {key: parsed.get(key) for key in ("title", "links", "content", "final_url", "canonical", "simhash")}
+        
+        page = await self._parse_page(cached["body"], url, (parsed or {}).get("final_url"))
+        await asyncio.to_thread(self.cache.update_parsed, cached["url"], self._cacheable_page(page))
+        return page
+    
+    async def _parse_page(self, html: str, url: str, response_url: Optional[str] = None) -> Dict:
+        """Parse a page in the parse pool so large pages do not block the event loop."""
+        job = functools.partial(
+            parse_page,
+            html,
+            url,
+            response_url,
+            parser=self.parser,
+            retain_content=self.retain_content,
+            is_start_page=url == self.base_url,
+        )
+        with timed("parse", url=url):
+            if self._parse_executor is None:
+                page = job()
+            else:
+                try:
+                    page = await asyncio.get_running_loop().run_in_executor(self._parse_executor, job)
+                except BrokenExecutor as e:
+                    # Parse this page inline and give later pages a fresh pool
+                    log(f"Warning: Parse pool failed ({str(e)}), parsing {url} inline and restarting the pool", "yellow", "warning")
+                    self._parse_executor = replace_parse_executor(self._parse_executor)
+                    page = job()
+        # Timings measured inside the pool, which may be another process
+        for stage, seconds in page.pop("timings", {}).items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+        return page
     
-    def _organize_pages(self, pages: List[Dict]) -> Dict:
+    async def _prepare(self, start_url: str) -> Optional[RobotFileParser]:
+        """Set the crawl's base URL and URL policy, loading robots.txt when needed."""
+        parsed_url = urlparse(start_url)
+        self.base_url = start_url
+        self.base_domain = parsed_url.netloc
+        self.base_origin = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        self.policy = UrlPolicy(start_url, include=self.include, exclude=self.exclude, keywords=self.keywords)
+        robots = await self._load_robots() if self.respect_robots or self.discovery != "crawl" else None
+        if self.respect_robots and robots:
+            self.policy.robots = robots
+            self._apply_crawl_delay(robots)
+        return robots
+    
+    def _organize_pages(self, pages: List[Dict], verbose: bool = False) -> Dict:
         """Organize pages into a hierarchical structure."""
-        try:
-            print(colored(f"\nOrganizing {len(pages)} pages:", "blue"))
-            for page in pages:
-                print(colored(f"  - {page['url']} -> {page['title']}", "blue"))
-            
-            # Find the starting page
-            start_page = next((page for page in pages if page["url"] == self.base_url), pages[0])
-            print(colored(f"\nRoot page: {start_page['url']} -> {start_page['title']}", "green"))
-            
-            # Create root node
-            root = {
-                "url": self.base_url,
-                "title": start_page["title"],
-                "children": []
-            }
+        with timed("organize_pages", pages=len(pages)):
+            tree = build_page_tree(pages, self.base_url, verbose=verbose)
+        log(f"Organized {len(pages)} pages under {tree['url']}", "blue", "info")
+        return tree
 
-            # Group pages by their path depth for better organization
-            url_groups = {}
-            for page in pages:
-                if page["url"] == self.base_url:
-                    continue
-                
-                # Get path relative to base URL
-                base_path = urlparse(self.base_url).path.rstrip('/')
-                page_path = urlparse(page["url"]).path
-                
-                if base_path and page_path.startswith(base_path):
-                    relative_path = page_path[len(base_path):].strip('/')
-                else:
-                    relative_path = page_path.strip('/')
-                
-                if not relative_path:
-                    continue
-                
-                parts = relative_path.split('/')
-                depth = len(parts)
-                
-                if depth not in url_groups:
-                    url_groups[depth] = []
-                url_groups[depth].append(page)
-                print(colored(f"  Grouped {page['url']} at depth {depth}", "blue"))
-
-            # Process pages level by level
-            for depth in sorted(url_groups.keys()):
-                for page in url_groups[depth]:
-                    # Get path relative to base URL
-                    base_path = urlparse(self.base_url).path.rstrip('/')
-                    page_path = urlparse(page["url"]).path
-                    
-                    if base_path and page_path.startswith(base_path):
-                        relative_path = page_path[len(base_path):].strip('/')
-                    else:
-                        relative_path = page_path.strip('/')
-                    
-                    parts = relative_path.split('/')
-                    
-                    # Find parent node
-                    current = root
-                    parent_path = self.base_url
-                    
-                    # Traverse the path to find/create parent nodes
-                    for i in range(depth - 1):
-                        parent_path = urljoin(parent_path, parts[i])
-                        found = False
-                        
-                        for child in current["children"]:
-                            if child["url"].rstrip('/') == parent_path.rstrip('/'):
-                                current = child
-                                found = True
-                                break
-                        
-                        if not found:
-                            # Create intermediate node if it doesn't exist
-                            new_node = {
-                                "url": parent_path,
-                                "title": parts[i].replace("-", " ").title(),
-                                "children": []
-                            }
-                            current["children"].append(new_node)
-                            current = new_node
-                            print(colored(f"  Created intermediate node: {new_node['url']} -> {new_node['title']}", "yellow"))
-                    
-                    # Add the page to its parent
-                    page_node = {
-                        "url": page["url"],
-                        "title": page["title"],
-                        "children": []
-                    }
-                    print(colored(f"  Adding page: {page_node['url']} -> {page_node['title']} to {current['url']}", "green"))
-                    current["children"].append(page_node)
-
-            # Sort children recursively
-            def sort_children(node):
-                if "children" in node:
-                    node["children"].sort(key=lambda x: x.get("title", "").lower())
-                    for child in node["children"]:
-                        sort_children(child)
-            
-            sort_children(root)
-            
-            print(colored("\nFinal tree structure:", "green"))
-            def print_tree(node, level=0):
-                print(colored("  " * level + f"- {node['title']} ({node['url']})", "cyan"))
-                for child in node.get("children", []):
-                    print_tree(child, level + 1)
-            
-            print_tree(root)
-            
-            return root
-            
-        except Exception as e:
-            print(colored(f"Error organizing pages: {str(e)}", "red"))
-            # Return a simple structure if organization fails
-            return {
-                "url": self.base_url,
-                "title": start_page["title"],
-                "children": [
-                    {"url": page["url"], "title": page["title"], "children": []}
-                    for page in pages if page["url"] != self.base_url
-                ]
-            }
-
-    async def crawl(self, start_url: str) -> Dict:
+    async def crawl(
+        self,
+        start_url: str,
+        on_event: Optional[Callable[[Dict], None]] = None,
+        resume_state: Optional[Dict] = None,
+        on_checkpoint: Optional[Callable[[Dict], None]] = None,
+        checkpoint_interval: float = 5.0,
+    ) -> Dict:
         """
         Crawl documentation starting from the given URL and return hierarchical structure.
+        
+        If on_event is given it is called with a progress event for every page as it is discovered.
+        If on_checkpoint is given it is called every checkpoint_interval seconds with the pending
+        frontier, the visited set and the pages completed since the previous checkpoint; passing
+        the accumulated state back as resume_state continues an interrupted crawl.
+        
+        Unless discovery is "crawl", the frontier is seeded from robots.txt sitemaps,
+        sitemap.xml and llms.txt; in "auto" mode links are only followed when no such
+        listing exists.
         """
         if not start_url:
-            print(colored("Error: No URL provided", "red"))
+            log("Error: No URL provided", "red", "error")
             return None
 
+        all_pages = PageStore(self.max_memory_mb * 1024 * 1024 if self.max_memory_mb is not None else None)
+        self.visited_urls = UrlSet(self.visited_bloom_capacity)
         try:
-            print(colored(f"Starting crawl from {start_url}", "green"))
-            self.base_url = start_url
+            log(f"Starting crawl from {start_url}", "green", "info")
             parsed_url = urlparse(start_url)
             if not parsed_url.scheme or not parsed_url.netloc:
-                print(colored("Error: Invalid URL format", "red"))
+                log("Error: Invalid URL format", "red", "error")
                 return None
-                
-            self.base_domain = parsed_url.netloc
+            start_url = self._clean_url(start_url)
+            robots = await self._prepare(start_url)
             
-            # First, verify we can access the starting URL
-            try:
-                response = await self.client.get(start_url)
-                response.raise_for_status()
-                initial_title, initial_html = await self._fetch_page(start_url)
-                if not initial_html:
-                    raise Exception("Could not fetch content from starting URL")
-            except Exception as e:
-                print(colored(f"Error: Failed to access starting URL: {str(e)}", "red"))
-                return None
+            if resume_state:
+                log(f"Resuming crawl with {len(resume_state['pages'])} pages and {len(resume_state['pending'])} pending URLs", "green", "info")
+            else:
+                # First, verify we can access the starting URL
+                try:
+                    initial_page = await self._fetch_page(start_url)
+                    if not initial_page:
+                        raise Exception("Could not fetch content from starting URL")
+                except Exception as e:
+                    log(f"Error: Failed to access starting URL: {str(e)}", "red", "error")
+                    return None
             
             # Collect all pages first
-            all_pages = [{
-                "url": start_url,
-                "title": initial_title
-            }]
+            if resume_state:
+                initial_pages = resume_state["pages"]
+                self.visited_urls.load_state(resume_state["visited"])
+                follow_links = resume_state.get("follow_links", True)
+            else:
+                seeds, follow_links = await self._discover_seeds(robots)
+                initial_pages = [{
+                    "url": start_url,
+                    "title": initial_page["title"],
+                    "content": initial_page["content"],
+                    "simhash": initial_page.get("simhash"),
+                }]
+            self.visited_urls.add(canonicalize(start_url))
+            checkpointed_pages = len(initial_pages) if resume_state else 0
+            # URLs that are queued or being fetched, so a checkpoint never loses in-flight work
+            pending: Dict[str, int] = {}
+            # Discovered URLs the policy turned down, so each URL is only evaluated once
+            rejected = UrlSet()
+            # Canonical URLs of collected pages (including redirect targets) and content
+            # fingerprints, so each page is collected once under one URL. The visited,
+            # rejected and collected sets all hold canonical URLs; pages are fetched as linked.
+            collected = UrlSet()
+            near_duplicates = SimHashIndex(self.max_duplicate_distance)
             error_count = 0
+            
+            def _page_url(url: str, page: Dict) -> str:
+                """The URL a page is collected under: where it was served from after redirects."""
+                final_url = page.get("final_url")
+                if final_url and final_url != url and self.policy.allows(final_url):
+                    return final_url
+                return url
+            
+            def _defers_to_canonical(url: str, page_url: str, page: Dict) -> bool:
+                """Whether a page is skipped so that its rel=canonical URL is collected instead.
+                
+                A canonical URL naming the page itself (e.g. its http:// form) or one already
+                visited, such as a canonical URL that redirected here, is not followed.
+                """
+                canonical = page.get("canonical")
+                if not canonical or canonicalize(canonical) in self.visited_urls:
+                    return False
+                if any(same_page(canonical, alias) for alias in (url, page_url, page.get("final_url")) if alias):
+                    return False
+                return self.policy.allows(canonical)
+            
+            def _register_page(url: str, page: Dict, requested_url: Optional[str] = None) -> Optional[str]:
+                """Record a fetched page, or return the URL of a page it duplicates."""
+                key = canonicalize(url)
+                aliases = {
+                    canonicalize(alias)
+                    for alias in (requested_url, page.get("final_url"), page.get("canonical"))
+                    if alias
+                } - {key}
+                if key in collected:
+                    return url
+                for alias in aliases:
+                    if alias in collected:
+                        return alias
+                fingerprint = page.get("simhash")
+                if fingerprint is not None and self.detect_duplicates:
+                    original = near_duplicates.find(fingerprint)
+                    if original:
+                        return original
+                    near_duplicates.add(fingerprint, url)
+                collected.add(key)
+                collected.update(aliases)
+                self.visited_urls.update(aliases)
+                return None
+            
+            for page in initial_pages:
+                _register_page(page["url"], page)
+                all_pages.append(page["url"], page["title"], page.get("content"), page.get("simhash"))
+            if not resume_state:
+                PAGES_CRAWLED.inc()
+            
+            def _emit(url: str, title: str, depth: int) -> None:
+                if on_event:
+                    on_event({
+                        "type": "page",
+                        "url": url,
+                        "title": title,
+                        "depth": depth,
+                        "pages": len(all_pages),
+                        "queued": frontier.qsize(),
+                    })
             max_errors = 5  # Maximum number of consecutive errors before giving up
+            stop_crawl = asyncio.Event()
             
-            async def _crawl_page(url: str) -> None:
-                nonlocal error_count
-                if url in self.visited_urls:
+            # Breadth-first frontier of (url, depth) pairs drained by a fixed worker pool
+            frontier: asyncio.Queue = asyncio.Queue()
+            
+            def _page_limit_reached() -> bool:
+                return self.max_pages is not None and len(all_pages) >= self.max_pages
+            
+            def _enqueue_links(links: List[str], depth: int) -> None:
+                if self.max_depth is not None and depth > self.max_depth:
                     return
-                
-                try:
-                    self.visited_urls.add(url)
-                    title, html = await self._fetch_page(url)
-                    
-                    if title and html:  # Only add pages that were successfully fetched
-                        all_pages.append({
-                            "url": url,
-                            "title": title,
-                        })
-                        error_count = 0  # Reset error count on success
-                        
-                        links = self._extract_links(html, url)
-                        tasks = [_crawl_page(link) for link in links]
-                        await asyncio.gather(*tasks, return_exceptions=True)
-                except Exception as e:
-                    error_count += 1
-                    print(colored(f"Warning: Error processing {url}: {str(e)}", "yellow"))
-                    if error_count >= max_errors:
-                        print(colored("Too many consecutive errors, stopping crawl", "red"))
-                        return
+                for link in links:
+                    key = canonicalize(link)
+                    if key in self.visited_urls or key in rejected:
+                        continue
+                    if not self.policy.allows(link):
+                        rejected.add(key)
+                        continue
+                    self.visited_urls.add(key)
+                    pending[link] = depth
+                    frontier.put_nowait((link, depth))
             
-            # Start crawling from links found in the starting page
-            initial_links = self._extract_links(initial_html, start_url)
-            tasks = [_crawl_page(link) for link in initial_links]
-            await asyncio.gather(*tasks, return_exceptions=True)
+            def _checkpoint() -> None:
+                nonlocal checkpointed_pages
+                on_checkpoint({
+                    "pending": [[url, depth] for url, depth in pending.items()],
+                    "visited": self.visited_urls.to_state(),
+                    "follow_links": follow_links,
+                    "new_pages": all_pages.dicts(checkpointed_pages),
+                })
+                checkpointed_pages = len(all_pages)
             
-            if len(all_pages) <= 1:  # Only the starting page was found
-                print(colored("Error: No additional pages found", "red"))
-                return None
+            async def _checkpoint_periodically() -> None:
+                while True:
+                    await asyncio.sleep(checkpoint_interval)
+                    try:
+                        _checkpoint()
+                    except Exception as e:
+                        log(f"Warning: Failed to write crawl checkpoint: {str(e)}", "yellow", "warning")
+            
+            async def _worker() -> None:
+                nonlocal error_count
+                while True:
+                    url, depth = await frontier.get()
+                    cancelled = False
+                    try:
+                        if stop_crawl.is_set() or _page_limit_reached() or canonicalize(url) in collected:
+                            continue
+                        
+                        page = await self._fetch_page(url)
+                        
+                        # Only add pages that were successfully fetched
+                        if page and not _page_limit_reached():
+                            page_url = _page_url(url, page)
+                            if _defers_to_canonical(url, page_url, page):
+                                canonical = page["canonical"]
+                                # A variant of another page: collect the canonical page in its own right
+                                log(f"Skipping {url} in favour of canonical {canonical}", "yellow", "debug")
+                                PAGES_SKIPPED.inc(reason="canonical")
+                                _enqueue_links([canonical], depth)
+                                continue
+                            original = _register_page(page_url, page, url)
+                            if original:
+                                log(f"Skipping duplicate: {url} (same as {original})", "yellow", "debug")
+                                PAGES_SKIPPED.inc(reason="duplicate")
+                                continue
+                            all_pages.append(page_url, page["title"], page["content"], page.get("simhash"))
+                            PAGES_CRAWLED.inc()
+                            error_count = 0  # Reset error count on success
+                            if follow_links:
+                                _enqueue_links(page["links"], depth + 1)
+                            _emit(page_url, page["title"], depth)
+                    except asyncio.CancelledError:
+                        # Keep the URL pending so a checkpoint taken now still includes it
+                        cancelled = True
+                        raise
+                    except Exception as e:
+                        error_count += 1
+                        log(f"Warning: Error processing {url}: {str(e)}", "yellow", "warning")
+                        if error_count >= max_errors and not stop_crawl.is_set():
+                            log("Too many consecutive errors, stopping crawl", "red", "error")
+                            stop_crawl.set()
+                    finally:
+                        if not cancelled:
+                            pending.pop(url, None)
+                        frontier.task_done()
+            
+            if resume_state:
+                # Re-queue the saved frontier, skipping anything completed after the last checkpoint
+                for url, depth in resume_state["pending"]:
+                    if canonicalize(url) not in collected:
+                        pending[url] = depth
+                        frontier.put_nowait((url, depth))
+            else:
+                # Start crawling from the sitemap listing and links found in the starting page
+                _enqueue_links(seeds, 1)
+                if follow_links:
+                    _enqueue_links(initial_page["links"], 1)
+                _emit(start_url, all_pages[0].title, 0)
             
-            # Filter out unwanted pages
-            filtered_pages = [
-                page for page in all_pages
-                if not any(skip in page["url"].lower() for skip in [
-                    '/_next/', '/manifest.', '/cdn-cgi/', '.js', '.css', '.png', '.jpg',
-                    '.jpeg', '.gif', '.ico', '.svg', '.woff', '.ttf'
-                ])
-            ]
+            workers = [asyncio.create_task(_worker()) for _ in range(self.max_workers)]
+            if on_checkpoint:
+                workers.append(asyncio.create_task(_checkpoint_periodically()))
+            try:
+                await frontier.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                if on_checkpoint:
+                    # Final checkpoint so an interrupted crawl loses as little work as possible
+                    try:
+                        _checkpoint()
+                    except Exception as e:
+                        log(f"Warning: Failed to write crawl checkpoint: {str(e)}", "yellow", "warning")
             
-            if not filtered_pages:
-                print(colored("Error: No valid documentation pages found after filtering", "red"))
+            if len(all_pages) <= 1:  # Only the starting page was found
+                log("Error: No additional pages found", "red", "error")
                 return None
             
-            # Organize pages into hierarchy
-            result = self._organize_pages(filtered_pages)
+            if self.content_sink:
+                # Hand content over page by page, so spilled content is never all in memory at once
+                refs = await asyncio.to_thread(
+                    self.content_sink, (all_pages.content(record) for record in all_pages)
+                )
+                pages = [
+                    {"url": record.url, "title": record.title, "content_ref": ref, "simhash": record.simhash}
+                    for record, ref in zip(all_pages, refs)
+                ]
+            else:
+                # Spilled content is read back only now
+                pages = all_pages.dicts()
+            result = self._organize_pages(pages)
             if not result:
-                print(colored("Error: Failed to organize pages", "red"))
+                log("Error: Failed to organize pages", "red", "error")
                 return None
             
-            print(colored(f"Crawl completed. Found {len(filtered_pages)} valid pages.", "green"))
+            log(f"Crawl completed. Found {len(all_pages)} valid pages.", "green", "info")
             return result
             
         except Exception as e:
-            print(colored(f"Error during crawl: {str(e)}", "red"))
+            log(f"Error during crawl: {str(e)}", "red", "error")
             return None
         finally:
-            await self.close() 
\ No newline at end of file
+            all_pages.close()
\ No newline at end of file
@@ -0,0 +1,60 @@
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+# Constants
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3  # Words per shingle
+MIN_SHINGLES = 32  # Pages shorter than this are too small to compare reliably
+DEFAULT_MAX_DISTANCE = 3  # Hamming distance at or below which two pages count as duplicates
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of a text's word shingles, or None if the text is too short."""
+    words = WORD_PATTERN.findall(text.lower())
+    shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+
+    # Count set bits column-wise over the binary strings rather than bit by bit in Python
+    bit_strings = [
+        format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+        for shingle in shingles
+    ]
+    fingerprint = 0
+    for position, column in enumerate(zip(*bit_strings)):
+        if column.count('1') * 2 > len(bit_strings):
+            fingerprint |= 1 << (SIMHASH_BITS - 1 - position)
+    return fingerprint
+
+
+class SimHashIndex:
+    """Finds previously seen pages within a small Hamming distance of a fingerprint.
+
+    Fingerprints are split into max_distance + 1 bands; two fingerprints within the
+    distance must agree exactly on at least one band, so only pages sharing a band
+    are compared instead of every page seen so far.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = SIMHASH_BITS // self.bands
+        self._buckets: List[Dict[int, List[tuple]]] = [{} for _ in range(self.bands)]
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (band * self.band_bits)) & mask for band in range(self.bands)]
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """Return the URL of a near-duplicate page, if one has been added."""
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            for other, url in self._buckets[band].get(key, ()):
+                if bin(fingerprint ^ other).count('1') <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, fingerprint: int, url: str) -> None:
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            self._buckets[band].setdefault(key, []).append((fingerprint, url))
@@ -0,0 +1,597 @@
+"""Distributed crawling: several worker processes (or machines) share one crawl frontier.
+
+The coordinator seeds a FrontierBackend with the start URL and sitemap listings
+and starts local worker processes. Workers lease URLs with a visibility timeout,
+fetch and parse them with the regular crawler, and report pages and new links
+back. A lease that is not completed in time (e.g. the worker died) is handed to
+another worker. When the frontier is empty the coordinator removes duplicates
+and builds the same page tree as DocumentationCrawler.crawl.
+
+Workers on other machines can join a crawl with `python -m distributed worker`
+given a frontier they can all reach (for SQLite: a path on a shared disk).
+
+Usage:
+    python -m distributed crawl https://docs.example.com --workers 4 --output tree.json
+    python -m distributed worker --frontier .cache/frontier.sqlite3
+"""
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from console import LOG_LEVELS, log, log_enabled, set_log_level
+from crawler import DocumentationCrawler
+from dedupe import DEFAULT_MAX_DISTANCE, SimHashIndex
+from url_policy import canonicalize, same_page
+
+# Constants
+DEFAULT_FRONTIER_PATH = os.path.join(".cache", "frontier.sqlite3")
+DEFAULT_LEASE_SECONDS = 120.0  # Visibility timeout: a lease not completed by then is handed out again
+MAX_LEASE_ATTEMPTS = 3  # URLs whose lease expired this often are given up (they keep killing workers)
+POLL_INTERVAL = 0.5  # Seconds between frontier checks while other workers hold the remaining URLs
+# DocumentationCrawler options the coordinator shares with every worker
+WORKER_OPTIONS = (
+    "max_workers", "max_concurrency", "per_host_concurrency", "requests_per_second",
+    "max_depth", "max_pages", "parser", "include", "exclude", "keywords", "respect_robots",
+    "discovery", "detect_duplicates", "max_duplicate_distance", "parse_pool", "parse_workers",
+)
+
+
+class FrontierBackend(ABC):
+    """Shared state of a distributed crawl: the frontier, the visited set and the pages.
+
+    Every URL ever added is kept under its canonical form, so adding a known URL (or
+    another spelling of it) is a no-op and the frontier doubles as the visited set.
+    URLs are leased as they were first added. Queued URLs are leased to one worker at a time for
+    `seconds`; a lease that expires without complete() is leased again. Backends
+    are created once per process from a picklable factory.
+    """
+
+    @abstractmethod
+    def get_meta(self) -> Optional[Dict]:
+        """Crawl settings stored by the coordinator, or None for a new frontier."""
+
+    @abstractmethod
+    def set_meta(self, meta: Dict) -> None:
+        """Store the crawl settings that workers read when they start."""
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Drop the settings, URLs and pages of the previous crawl so a new one can be seeded."""
+
+    @abstractmethod
+    def add(self, urls: Iterable[Tuple[str, int]]) -> int:
+        """Queue (url, depth) pairs that were never seen; return how many were new."""
+
+    @abstractmethod
+    def known(self, url: str) -> bool:
+        """Whether the URL, or another spelling of it, was ever added."""
+
+    @abstractmethod
+    def lease(self, owner: str, count: int, seconds: float) -> List[Tuple[str, int]]:
+        """Take up to `count` queued (or expired) URLs, shallowest first."""
+
+    @abstractmethod
+    def renew(self, owner: str, seconds: float) -> None:
+        """Extend every lease held by `owner`."""
+
+    @abstractmethod
+    def complete(self, url: str, page: Optional[Dict] = None, links: Iterable[Tuple[str, int]] = (),
+                 seen: Iterable[str] = ()) -> None:
+        """Finish a leased URL in one step: store its page, queue its links and mark aliases as seen."""
+
+    @abstractmethod
+    def discard_queued(self) -> int:
+        """Drop every URL still queued, e.g. once the page limit is reached."""
+
+    @abstractmethod
+    def pending(self) -> int:
+        """URLs queued or leased; the crawl is finished when this reaches zero."""
+
+    @abstractmethod
+    def page_count(self) -> int:
+        """Number of pages stored so far."""
+
+    @abstractmethod
+    def pages(self) -> Iterator[Dict]:
+        """Stored pages in the order they were completed."""
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteFrontier(FrontierBackend):
+    """FrontierBackend in a SQLite database in WAL mode, shared by processes on one machine.
+
+    Leases are taken inside BEGIN IMMEDIATE transactions, so two workers never
+    lease the same URL; concurrent writers wait up to busy_timeout for the lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_FRONTIER_PATH, busy_timeout: float = 30.0):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS frontier (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                owner TEXT,
+                lease_expires REAL NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS frontier_queue ON frontier (status, depth);
+            CREATE INDEX IF NOT EXISTS frontier_leases ON frontier (status, lease_expires);
+            CREATE TABLE IF NOT EXISTS pages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                content TEXT,
+                simhash TEXT,
+                aliases TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );"""
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def get_meta(self) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'crawl'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_meta(self, meta: Dict) -> None:
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('crawl', ?)", (json.dumps(meta),))
+
+    def reset(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM meta")
+            conn.execute("DELETE FROM frontier")
+            conn.execute("DELETE FROM pages")
+
+    def add(self, urls: Iterable[Tuple[str, int]]) -> int:
+        with self._transaction() as conn:
+            before = conn.total_changes
+            self._queue(conn, urls)
+            return conn.total_changes - before
+
+    def _queue(self, conn: sqlite3.Connection, urls: Iterable[Tuple[str, int]]) -> None:
+        conn.executemany(
+            "INSERT OR IGNORE INTO frontier (key, url, depth) VALUES (?, ?, ?)",
+            ((canonicalize(url), url, depth) for url, depth in urls),
+        )
+
+    def known(self, url: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM frontier WHERE key = ?", (canonicalize(url),)).fetchone()
+        return row is not None
+
+    def lease(self, owner: str, count: int, seconds: float) -> List[Tuple[str, int]]:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE frontier SET status = 'failed', owner = NULL"
+                " WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, MAX_LEASE_ATTEMPTS),
+            )
+            # Expired leases first: their worker is gone and they were due long ago
+            rows = conn.execute(
+                "SELECT key, url, depth FROM frontier WHERE status = 'leased' AND lease_expires < ? LIMIT ?",
+                (now, count),
+            ).fetchall()
+            if len(rows) < count:
+                rows += conn.execute(
+                    "SELECT key, url, depth FROM frontier WHERE status = 'queued' ORDER BY depth LIMIT ?",
+                    (count - len(rows),),
+                ).fetchall()
+            conn.executemany(
+                "UPDATE frontier SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1"
+                " WHERE key = ?",
+                ((owner, now + seconds, key) for key, _, _ in rows),
+            )
+        return [(url, depth) for _, url, depth in rows]
+
+    def renew(self, owner: str, seconds: float) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE frontier SET lease_expires = ? WHERE status = 'leased' AND owner = ?",
+                (time.time() + seconds, owner),
+            )
+
+    def complete(self, url: str, page: Optional[Dict] = None, links: Iterable[Tuple[str, int]] = (),
+                 seen: Iterable[str] = ()) -> None:
+        with self._transaction() as conn:
+            conn.execute("UPDATE frontier SET status = 'done', owner = NULL WHERE key = ?", (canonicalize(url),))
+            if page:
+                conn.execute(
+                    "INSERT OR IGNORE INTO pages (url, title, content, simhash, aliases) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        page["url"],
+                        page["title"],
+                        page.get("content"),
+                        # 64-bit fingerprints do not fit SQLite's signed integers
+                        None if page.get("simhash") is None else str(page["simhash"]),
+                        json.dumps(page.get("aliases", [])),
+                    ),
+                )
+            conn.executemany(
+                "INSERT INTO frontier (key, url, depth, status) VALUES (?, ?, 0, 'done')"
+                " ON CONFLICT (key) DO UPDATE SET status = 'done' WHERE status = 'queued'",
+                ((canonicalize(alias), alias) for alias in seen),
+            )
+            self._queue(conn, links)
+
+    def discard_queued(self) -> int:
+        with self._transaction() as conn:
+            return conn.execute("UPDATE frontier SET status = 'skipped' WHERE status = 'queued'").rowcount
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM frontier WHERE status IN ('queued', 'leased')"
+            ).fetchone()[0]
+
+    def page_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def pages(self) -> Iterator[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, title, content, simhash, aliases FROM pages ORDER BY seq"
+            ).fetchall()
+        for url, title, content, simhash, aliases in rows:
+            yield {
+                "url": url,
+                "title": title,
+                "content": content,
+                "simhash": None if simhash is None else int(simhash),
+                "aliases": json.loads(aliases),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _worker_crawler(meta: Dict) -> DocumentationCrawler:
+    options = dict(meta["options"])
+    # Worker processes are the parallelism; a parse pool in each of them would oversubscribe the CPUs
+    if options.get("parse_pool", "auto") == "auto":
+        options["parse_pool"] = "inline"
+    # Each host's rate, including robots.txt limits, is shared by all workers of the crawl
+    return DocumentationCrawler(**options, rate_share=1 / max(1, meta["worker_count"]))
+
+
+class DistributedWorker:
+    """Leases URLs from a shared frontier and crawls them until the frontier is empty."""
+
+    def __init__(
+        self,
+        backend: FrontierBackend,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        self.backend = backend
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.pages = 0
+
+    async def _process(self, crawler: DocumentationCrawler, url: str, depth: int, follow_links: bool) -> None:
+        page = await crawler._fetch_page(url)
+        if not page:
+            await asyncio.to_thread(self.backend.complete, url)
+            return
+
+        # The start page is collected under the start URL, as in DocumentationCrawler.crawl
+        start_page = url == crawler.base_url
+        page_url = url
+        final_url = page.get("final_url")
+        if final_url and final_url != url and not start_page and crawler.policy.allows(final_url):
+            page_url = final_url
+        canonical = page.get("canonical")
+        if (
+            canonical
+            and not start_page
+            and not any(same_page(canonical, alias) for alias in (url, page_url, final_url) if alias)
+            and crawler.policy.allows(canonical)
+            # A known canonical URL redirected here or is collected in its own right
+            and not await asyncio.to_thread(self.backend.known, canonical)
+        ):
+            # A variant of another page: collect the canonical page in its own right
+            log(f"Skipping {url} in favour of canonical {canonical}", "yellow", "debug")
+            await asyncio.to_thread(self.backend.complete, url, links=[(canonical, depth)])
+            return
+
+        links = []
+        if follow_links and (crawler.max_depth is None or depth + 1 <= crawler.max_depth):
+            links = [(link, depth + 1) for link in page["links"] if crawler.policy.allows(link)]
+        aliases = sorted({url, final_url, canonical} - {None, page_url})
+        await asyncio.to_thread(
+            self.backend.complete,
+            url,
+            page={"url": page_url, "title": page["title"], "content": page["content"],
+                  "simhash": page.get("simhash"), "aliases": aliases},
+            links=links,
+            seen=[page_url, *aliases],
+        )
+        self.pages += 1
+        log(f"Collected {page_url}", "cyan", "debug")
+
+    async def _run_task(self, crawler: DocumentationCrawler, meta: Dict, number: int) -> None:
+        owner = f"{self.worker_id}-{number}"
+        max_pages = meta["options"].get("max_pages")
+        while True:
+            if max_pages is not None and await asyncio.to_thread(self.backend.page_count) >= max_pages:
+                await asyncio.to_thread(self.backend.discard_queued)
+            leased = await asyncio.to_thread(self.backend.lease, owner, 1, self.lease_seconds)
+            if not leased:
+                if not await asyncio.to_thread(self.backend.pending):
+                    return
+                # Other workers hold the remaining URLs and may still add links
+                await asyncio.sleep(self.poll_interval)
+                continue
+            url, depth = leased[0]
+            try:
+                await self._process(crawler, url, depth, meta["follow_links"])
+            except Exception as e:
+                log(f"Warning: Error processing {url}: {str(e)}", "yellow", "warning")
+                await asyncio.to_thread(self.backend.complete, url)
+
+    async def _renew_leases(self, tasks: int) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            for number in range(tasks):
+                await asyncio.to_thread(self.backend.renew, f"{self.worker_id}-{number}", self.lease_seconds)
+
+    async def run(self) -> int:
+        """Crawl until no URL is queued or leased; return the number of pages collected."""
+        meta = await asyncio.to_thread(self.backend.get_meta)
+        if meta is None:
+            raise Exception("The frontier has not been set up by a coordinator")
+        crawler = _worker_crawler(meta)
+        try:
+            await crawler._prepare(meta["start_url"])
+            log(f"Worker {self.worker_id} crawling {meta['start_url']} with {crawler.max_workers} tasks", "blue", "info")
+            renewer = asyncio.create_task(self._renew_leases(crawler.max_workers))
+            try:
+                await asyncio.gather(*(self._run_task(crawler, meta, number) for number in range(crawler.max_workers)))
+            finally:
+                renewer.cancel()
+        finally:
+            await crawler.close()
+        log(f"Worker {self.worker_id} collected {self.pages} pages", "green", "info")
+        return self.pages
+
+
+def run_worker(backend_factory: Callable[[], FrontierBackend], worker_id: Optional[str] = None,
+               lease_seconds: float = DEFAULT_LEASE_SECONDS, log_level: Optional[str] = None) -> int:
+    """Entry point of a worker process."""
+    if log_level:
+        set_log_level(log_level)
+    backend = backend_factory()
+    try:
+        return asyncio.run(DistributedWorker(backend, worker_id, lease_seconds).run())
+    finally:
+        backend.close()
+
+
+class CrawlCoordinator:
+    """Runs a distributed crawl with local worker processes and assembles the page tree.
+
+    `backend_factory` must be picklable (e.g. functools.partial(SqliteFrontier, path)):
+    each worker process builds its own backend from it. Crawling a frontier with an
+    unfinished crawl of the same start URL resumes it unless `fresh` is set; a finished
+    frontier is cleared and seeded again. `expected_workers` is the total number of
+    workers, local and remote, that share the per-host request rate.
+    """
+
+    def __init__(
+        self,
+        backend_factory: Callable[[], FrontierBackend],
+        workers: int = 4,
+        expected_workers: Optional[int] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        poll_interval: float = POLL_INTERVAL,
+        fresh: bool = False,
+        **crawler_options,
+    ):
+        unknown = set(crawler_options) - set(WORKER_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unsupported crawler options for distributed crawls: {', '.join(sorted(unknown))}")
+        self.backend_factory = backend_factory
+        self.workers = max(0, workers)
+        self.expected_workers = expected_workers or max(1, self.workers)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.fresh = fresh
+        self.crawler_options = crawler_options
+
+    async def _seed(self, backend: FrontierBackend, crawler: DocumentationCrawler, start_url: str) -> None:
+        meta = await asyncio.to_thread(backend.get_meta)
+        pending = await asyncio.to_thread(backend.pending) if meta else 0
+        if pending and not self.fresh:
+            if meta["start_url"] != start_url:
+                raise Exception(f"The frontier holds an unfinished crawl of {meta['start_url']}; pass fresh=True (--fresh) to discard it")
+            pages = await asyncio.to_thread(backend.page_count)
+            log(f"Resuming distributed crawl with {pages} pages and {pending} pending URLs", "green", "info")
+            await asyncio.to_thread(backend.set_meta, {**meta, "worker_count": self.expected_workers})
+            return
+        if meta:
+            # A finished crawl (or one discarded with fresh) must not be returned again
+            log(f"Clearing the frontier of the previous crawl of {meta['start_url']}", "yellow", "info")
+            await asyncio.to_thread(backend.reset)
+
+        robots = await crawler._prepare(start_url)
+        seeds, follow_links = await crawler._discover_seeds(robots)
+        await asyncio.to_thread(backend.set_meta, {
+            "start_url": start_url,
+            "options": self.crawler_options,
+            "follow_links": follow_links,
+            "worker_count": self.expected_workers,
+            "created_at": time.time(),
+        })
+        await asyncio.to_thread(backend.add, [(start_url, 0)])
+        await asyncio.to_thread(backend.add, [(seed, 1) for seed in seeds if crawler.policy.allows(seed)])
+
+    def _assemble(self, backend: FrontierBackend, crawler: DocumentationCrawler) -> List[Dict]:
+        """Collected pages without duplicates, in completion order (the start page first)."""
+        collected = set()
+        near_duplicates = SimHashIndex(self.crawler_options.get("max_duplicate_distance", DEFAULT_MAX_DISTANCE))
+        max_pages = self.crawler_options.get("max_pages")
+        pages = []
+        for page in sorted(backend.pages(), key=lambda page: page["url"] != crawler.base_url):
+            urls = {canonicalize(url) for url in (page["url"], *page["aliases"])}
+            if urls & collected:
+                continue
+            if page["simhash"] is not None and crawler.detect_duplicates:
+                if near_duplicates.find(page["simhash"]):
+                    continue
+                near_duplicates.add(page["simhash"], page["url"])
+            collected |= urls
+            pages.append({name: page[name] for name in ("url", "title", "content", "simhash")})
+            if max_pages is not None and len(pages) >= max_pages:
+                break
+        return pages
+
+    async def crawl(self, start_url: str, on_event: Optional[Callable[[Dict], None]] = None) -> Optional[Dict]:
+        """Crawl start_url with the worker processes and return the page tree, like DocumentationCrawler.crawl."""
+        backend = self.backend_factory()
+        crawler = DocumentationCrawler(**{**self.crawler_options, "parse_pool": "inline"})
+        processes = []
+        try:
+            start_url = crawler._clean_url(start_url)
+            await self._seed(backend, crawler, start_url)
+            if not crawler.policy:
+                await crawler._prepare(start_url)
+
+            context = multiprocessing.get_context("spawn")
+            log_level = next((level for level in LOG_LEVELS if log_enabled(level)), "error")
+            for number in range(self.workers):
+                process = context.Process(
+                    target=run_worker,
+                    args=(self.backend_factory, f"{socket.gethostname()}-{os.getpid()}-{number}", self.lease_seconds, log_level),
+                    daemon=True,
+                )
+                process.start()
+                processes.append(process)
+            log(f"Started {self.workers} crawl workers for {start_url}", "green", "info")
+
+            while await asyncio.to_thread(backend.pending):
+                if processes and not any(process.is_alive() for process in processes):
+                    raise Exception("All crawl workers exited with URLs still pending")
+                if on_event:
+                    on_event({
+                        "type": "progress",
+                        "pages": await asyncio.to_thread(backend.page_count),
+                        "queued": await asyncio.to_thread(backend.pending),
+                    })
+                await asyncio.sleep(self.poll_interval)
+            for process in processes:
+                await asyncio.get_running_loop().run_in_executor(None, process.join)
+
+            pages = await asyncio.to_thread(self._assemble, backend, crawler)
+            if not pages or pages[0]["url"] != start_url:
+                log("Error: Failed to access starting URL", "red", "error")
+                return None
+            if len(pages) <= 1:
+                log("Error: No additional pages found", "red", "error")
+                return None
+            log(f"Distributed crawl completed. Found {len(pages)} valid pages.", "green", "info")
+            return crawler._organize_pages(pages)
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            await crawler.close()
+            backend.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m distributed", description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("crawl", "worker"))
+    parser.add_argument("url", nargs="?", help="Start URL (crawl only)")
+    parser.add_argument("--frontier", default=DEFAULT_FRONTIER_PATH, help="SQLite frontier shared by the workers")
+    parser.add_argument("--fresh", action="store_true", help="Discard an unfinished crawl in the frontier instead of resuming it (crawl only)")
+    parser.add_argument("--workers", type=int, default=4, help="Local worker processes (crawl only)")
+    parser.add_argument("--expected-workers", type=int, help="Total workers sharing the per-host rate, including remote ones")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument("--output", help="Write the page tree to this file (crawl only)")
+    parser.add_argument("--tasks", type=int, default=8, help="Concurrent fetches per worker")
+    parser.add_argument("--rps", type=float, default=10.0, help="Requests per second per host, across all workers")
+    parser.add_argument("--max-depth", type=int)
+    parser.add_argument("--max-pages", type=int)
+    parser.add_argument("--include", action="append")
+    parser.add_argument("--exclude", action="append")
+    parser.add_argument("--discovery", default="auto")
+    parser.add_argument("--ignore-robots", action="store_true")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args(argv)
+    set_log_level(args.log_level)
+    backend_factory = functools.partial(SqliteFrontier, args.frontier)
+
+    if args.command == "worker":
+        run_worker(backend_factory, lease_seconds=args.lease_seconds)
+        return 0
+    if not args.url:
+        parser.error("crawl needs a start URL")
+
+    coordinator = CrawlCoordinator(
+        backend_factory,
+        workers=args.workers,
+        expected_workers=args.expected_workers,
+        lease_seconds=args.lease_seconds,
+        fresh=args.fresh,
+        max_workers=args.tasks,
+        requests_per_second=args.rps or None,
+        max_depth=args.max_depth,
+        max_pages=args.max_pages,
+        include=args.include,
+        exclude=args.exclude,
+        discovery=args.discovery,
+        respect_robots=not args.ignore_robots,
+    )
+    tree = asyncio.run(coordinator.crawl(args.url))
+    if tree is None:
+        return 1
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(tree, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
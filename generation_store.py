@@ -0,0 +1,65 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Constants
+DEFAULT_STORE_PATH = os.path.join(".cache", "generations.sqlite3")
+
+
+def generation_key(model: str, system_prompt: str, content: str) -> str:
+    """Hash the normalized page content together with the prompt and model."""
+    normalized = re.sub(r"\s+", " ", content).strip()
+    digest = hashlib.sha256()
+    for part in (model, system_prompt.strip(), normalized):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class GenerationStore:
+    """Persistent store of generated markdown keyed by content hash."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                model TEXT NOT NULL,
+                markdown TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return previously generated markdown for a key, if any."""
+        with self._lock:
+            row = self._conn.execute("SELECT markdown FROM generations WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, markdown: str, model: str, url: Optional[str] = None) -> None:
+        """Store generated markdown under its content hash."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, url, model, markdown, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, url, model, markdown, time.time())
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
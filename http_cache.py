@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Constants
+DEFAULT_CACHE_PATH = os.path.join(".cache", "http_cache.sqlite3")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+EVICTION_BATCH = 64
+
+
+class HttpCache:
+    """Persistent SQLite response cache keyed by cleaned URL with LRU eviction."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                parsed TEXT,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached entry for a URL, or None if it is not cached."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, parsed, fetched_at FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if not row:
+            return None
+        body, etag, last_modified, parsed, fetched_at = row
+        return {
+            "url": url,
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "parsed": json.loads(parsed) if parsed else None,
+            "fetched_at": fetched_at,
+        }
+
+    def put(
+        self,
+        url: str,
+        body: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        parsed: Optional[Dict] = None,
+    ) -> None:
+        """Store a response body with its validators and parsed result."""
+        parsed_json = json.dumps(parsed) if parsed is not None else None
+        size = len(body.encode("utf-8")) + (len(parsed_json) if parsed_json else 0)
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                """INSERT OR REPLACE INTO responses
+                   (url, body, etag, last_modified, parsed, size, fetched_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (url, body, etag, last_modified, parsed_json, size, now, now)
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def update_parsed(self, url: str, parsed: Dict) -> None:
+        """Replace the parsed result stored for a URL without touching its body."""
+        parsed_json = json.dumps(parsed)
+        with self._lock:
+            row = self._conn.execute("SELECT size, parsed FROM responses WHERE url = ?", (url,)).fetchone()
+            if not row:
+                return
+            size = row[0] - (len(row[1]) if row[1] else 0) + len(parsed_json)
+            self._conn.execute(
+                "UPDATE responses SET parsed = ?, size = ?, accessed_at = ? WHERE url = ?",
+                (parsed_json, size, time.time(), url)
+            )
+            self._total_bytes += size - row[0]
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark an entry as recently used (e.g. after a 304 revalidation)."""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT url, size FROM responses ORDER BY accessed_at ASC LIMIT ?",
+                (EVICTION_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for url, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
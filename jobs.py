@@ -0,0 +1,288 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Set
+
+from console import log
+from outputs import DEFAULT_PART_TOKENS, MarkdownWriter, create_writer
+
+# Constants
+DEFAULT_JOB_DIR = ".jobs"
+CHECKPOINT_INTERVAL = 5.0  # Seconds between crawl checkpoints
+MAX_RUNNING_JOBS = 2
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _write_json(path: str, data) -> None:
+    """Write JSON atomically so a crash never leaves a half-written checkpoint."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _read_jsonl(path: str) -> List[Dict]:
+    """Read a JSON-lines file, ignoring a truncated last line from an interrupted write."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+
+class JobManager:
+    """Runs crawl and generate jobs in the background with resumable on-disk checkpoints.
+
+    Each job lives in its own directory: job.json (status and parameters), input.json
+    (the page tree for generate jobs), pages.jsonl / checkpoint.json (crawl progress),
+    results.jsonl (generated pages) and result.json / result.md once finished; generate
+    jobs with an output_format write to output/ instead of result.md.
+    API keys are kept in memory only, so interrupted generate jobs need the key again
+    to resume.
+    """
+
+    def __init__(
+        self,
+        crawler_factory: Callable,
+        processor_factory: Callable,
+        directory: str = DEFAULT_JOB_DIR,
+        max_running: int = MAX_RUNNING_JOBS,
+        checkpoint_interval: float = CHECKPOINT_INTERVAL,
+    ):
+        self.crawler_factory = crawler_factory
+        self.processor_factory = processor_factory
+        self.directory = directory
+        self.max_running = max_running
+        self.checkpoint_interval = checkpoint_interval
+        self.jobs: Dict[str, Dict] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._api_keys: Dict[str, str] = {}
+        # Jobs cancelled through cancel(), as opposed to tasks cancelled by a server shutdown
+        self._cancelled: Set[str] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        os.makedirs(directory, exist_ok=True)
+        for job_id in os.listdir(directory):
+            job = _read_json(self._path(job_id, "job.json"))
+            if job:
+                self.jobs[job_id] = job
+
+    def _path(self, job_id: str, name: str) -> str:
+        return os.path.join(self.directory, job_id, name)
+
+    def _save(self, job: Dict) -> None:
+        job["updated_at"] = time.time()
+        _write_json(self._path(job["id"], "job.json"), job)
+
+    def create(self, kind: str, params: Dict, api_key: Optional[str] = None, pages: Optional[Dict] = None) -> Dict:
+        """Create a crawl or generate job and start it in the background."""
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.directory, job_id), exist_ok=True)
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "params": params,
+            "progress": {},
+            "error": None,
+            "created_at": time.time(),
+        }
+        if pages is not None:
+            _write_json(self._path(job_id, "input.json"), pages)
+        if api_key:
+            self._api_keys[job_id] = api_key
+        self.jobs[job_id] = job
+        self._save(job)
+        self._start(job_id)
+        log(f"Created {kind} job {job_id}", "green", "info")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.jobs.get(job_id)
+
+    def result(self, job_id: str) -> Optional[Dict]:
+        """Return the finished result of a job, or None if it has not completed."""
+        job = self.jobs.get(job_id)
+        if not job or job["status"] != "completed":
+            return None
+        if job["kind"] == "crawl":
+            return _read_json(self._path(job_id, "result.json"))
+        if job.get("output"):
+            return dict(job["output"])
+        with open(self._path(job_id, "result.md"), encoding="utf-8") as f:
+            return {"content": f.read()}
+
+    def artifact_path(self, job_id: str) -> Optional[str]:
+        """Path of the downloadable file of a completed generate job."""
+        job = self.jobs.get(job_id)
+        if not job or job["status"] != "completed" or job["kind"] != "generate":
+            return None
+        if job.get("output"):
+            return self._path(job_id, os.path.join("output", job["output"]["artifact"]))
+        return self._path(job_id, "result.md")
+
+    def resume_interrupted(self) -> None:
+        """Restart jobs that were queued or running when the process stopped."""
+        for job_id, job in self.jobs.items():
+            if job["status"] not in ACTIVE_STATUSES:
+                continue
+            if job["kind"] == "generate" and job_id not in self._api_keys:
+                job["status"] = "interrupted"
+                job["error"] = "Interrupted; resume with the API key to continue"
+                self._save(job)
+                continue
+            log(f"Resuming {job['kind']} job {job_id}", "yellow", "info")
+            self._start(job_id)
+
+    def resume(self, job_id: str, api_key: Optional[str] = None) -> Dict:
+        """Resume an interrupted, failed or cancelled job from its last checkpoint."""
+        job = self.jobs.get(job_id)
+        if not job:
+            raise KeyError(job_id)
+        if job_id in self._tasks:
+            return job
+        if api_key:
+            self._api_keys[job_id] = api_key
+        if job["kind"] == "generate" and job_id not in self._api_keys:
+            raise ValueError("An API key is required to resume a generate job")
+        job["status"] = "queued"
+        job["error"] = None
+        self._save(job)
+        self._start(job_id)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        if not task:
+            return False
+        self._cancelled.add(job_id)
+        task.cancel()
+        return True
+
+    def _start(self, job_id: str) -> None:
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def _run(self, job_id: str) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+        job = self.jobs[job_id]
+        try:
+            async with self._semaphore:
+                job["status"] = "running"
+                self._save(job)
+                if job["kind"] == "crawl":
+                    await self._run_crawl(job)
+                else:
+                    await self._run_generate(job)
+                job["status"] = "completed"
+                log(f"Job {job_id} completed", "green", "info")
+        except asyncio.CancelledError:
+            if job_id in self._cancelled:
+                job["status"] = "cancelled"
+            else:
+                # Shutting down: keep the job active so resume_interrupted() restarts it
+                log(f"Job {job_id} interrupted by shutdown", "yellow", "info")
+            raise
+        except Exception as e:
+            log(f"Job {job_id} failed: {str(e)}", "red", "error")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            self._save(job)
+            self._tasks.pop(job_id, None)
+            self._cancelled.discard(job_id)
+
+    async def _run_crawl(self, job: Dict) -> None:
+        job_id = job["id"]
+        pages_path = self._path(job_id, "pages.jsonl")
+        checkpoint = _read_json(self._path(job_id, "checkpoint.json"))
+        resume_state = None
+        if checkpoint:
+            resume_state = {
+                "pending": checkpoint["pending"],
+                "visited": checkpoint["visited"],
+                "follow_links": checkpoint.get("follow_links", True),
+                "pages": list({page["url"]: page for page in _read_jsonl(pages_path)}.values()),
+            }
+
+        def on_event(event: Dict) -> None:
+            job["progress"] = {"pages": event["pages"], "queued": event["queued"]}
+
+        def on_checkpoint(state: Dict) -> None:
+            # Append new pages before replacing the frontier so no completed page is lost
+            with open(pages_path, "a", encoding="utf-8") as f:
+                for page in state["new_pages"]:
+                    f.write(json.dumps(page) + "\n")
+            _write_json(self._path(job_id, "checkpoint.json"), {
+                "pending": state["pending"],
+                "visited": state["visited"],
+                "follow_links": state["follow_links"],
+            })
+            self._save(job)
+
+        crawler = self.crawler_factory(job["params"])
+        try:
+            result = await crawler.crawl(
+                job["params"]["url"],
+                on_event=on_event,
+                resume_state=resume_state,
+                on_checkpoint=on_checkpoint,
+                checkpoint_interval=self.checkpoint_interval,
+            )
+        finally:
+            await crawler.close()
+
+        if result is None:
+            raise Exception("Failed to crawl documentation. The URL might be invalid or the site might be blocking access.")
+        _write_json(self._path(job_id, "result.json"), {"pages": result})
+
+    async def _run_generate(self, job: Dict) -> None:
+        job_id = job["id"]
+        api_key = self._api_keys.get(job_id)
+        if not api_key:
+            raise Exception("An API key is required to run a generate job")
+
+        results_path = self._path(job_id, "results.jsonl")
+        completed = {record["index"]: record for record in _read_jsonl(results_path)}
+        pages = _read_json(self._path(job_id, "input.json"))
+        output_format = job["params"].get("output_format")
+        if output_format:
+            part_tokens = job["params"].get("part_tokens") or DEFAULT_PART_TOKENS
+            writer = create_writer(output_format, self._path(job_id, "output"), part_tokens)
+        else:
+            writer = MarkdownWriter(os.path.join(self.directory, job_id), "result.md")
+        processor = self.processor_factory(job["params"], api_key)
+
+        try:
+            with open(results_path, "a", encoding="utf-8") as f:
+
+                def on_event(event: Dict) -> None:
+                    if event["type"] == "start":
+                        return
+                    if event["type"] == "page" and not event.get("resumed"):
+                        f.write(json.dumps({
+                            "index": event["index"], "content": event["content"], "markdown": event["markdown"],
+                        }) + "\n")
+                        f.flush()
+                    job["progress"] = {"completed": event["completed"], "total": event["total"]}
+
+                result = await processor.write_output(pages, writer, completed=completed, on_event=on_event)
+        finally:
+            await processor.close()
+
+        if output_format:
+            job["output"] = {"format": output_format, "files": result["files"], "artifact": result["artifact"]}
@@ -1,27 +1,50 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from termcolor import colored
-import httpx
-from bs4 import BeautifulSoup
-import openai
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse, StreamingResponse
+from console import log
 import asyncio
+import functools
+import json
 from typing import List, Dict, Optional
 from pydantic import BaseModel
 
+from clients import ClientPool
 from crawler import DocumentationCrawler
-from processor import DocumentationProcessor
+from crawl_store import CrawlStore, SingleFlight, DEFAULT_CRAWL_STORE_PATH, DEFAULT_CRAWL_TTL, crawl_key, select_pages, strip_content
+from generation_store import GenerationStore, DEFAULT_STORE_PATH
+from http_cache import HttpCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES
+from jobs import JobManager, DEFAULT_JOB_DIR
+from metrics import render_metrics
+from outputs import OutputStore, DEFAULT_OUTPUT_DIR, DEFAULT_OUTPUT_TTL, DEFAULT_PART_TOKENS, OUTPUT_FORMATS
+from parsing import shutdown_parse_executors
+from processor import DocumentationProcessor, DEFAULT_BATCH_TOKENS
 
 # Constants
-CHUNK_SIZE = 16000  # Safe chunk size for 64k context window (leaving room for system prompts)
-MAX_OUTPUT_TOKENS = 7000  # Safe output size (below 8k limit)
-DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+# Alternative LLM endpoint, e.g. a proxy or the mock server in benchmarks/
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+# Crawl request fields that change how fast a crawl runs but not what it finds
+CRAWL_SCHEDULING_FIELDS = {
+    "url", "api_key", "use_groq", "max_workers", "max_concurrency", "per_host_concurrency",
+    "requests_per_second", "parser", "use_cache", "force_refresh", "max_memory_mb",
+    "visited_bloom_capacity", "parse_pool", "parse_workers", "reuse", "include_content",
+}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pick up background jobs that were interrupted by a restart
+    job_manager.resume_interrupted()
+    crawl_store.purge_expired()
+    output_store.purge_expired()
+    yield
+    await clients.close()
+    shutdown_parse_executors()
 
 # Initialize FastAPI app
-app = FastAPI(title="Documentation Compiler")
+app = FastAPI(title="Documentation Compiler", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -36,16 +59,75 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+# Persistent HTTP cache shared by all crawls
+http_cache = HttpCache(
+    os.getenv("CRAWL_CACHE_PATH", DEFAULT_CACHE_PATH),
+    max_bytes=int(os.getenv("CRAWL_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+)
+
+# Generated markdown keyed by content hash, reused across generations
+generation_store = GenerationStore(os.getenv("GENERATION_STORE_PATH", DEFAULT_STORE_PATH))
+
+# Crawl results shared between users until they expire, and the crawls in progress
+crawl_store = CrawlStore(
+    os.getenv("CRAWL_STORE_PATH", DEFAULT_CRAWL_STORE_PATH),
+    ttl=float(os.getenv("CRAWL_TTL", DEFAULT_CRAWL_TTL)),
+)
+crawl_flights = SingleFlight()
+
+# Generated documents written to disk and served as file downloads until they expire
+output_store = OutputStore(
+    os.getenv("OUTPUT_DIR", DEFAULT_OUTPUT_DIR),
+    ttl=float(os.getenv("OUTPUT_TTL", DEFAULT_OUTPUT_TTL)),
+)
+
+# Connection pools shared by all crawls, generations and jobs; closed on shutdown
+clients = ClientPool.from_env()
+
 # Pydantic models
 class CrawlRequest(BaseModel):
     url: str
     api_key: str
     use_groq: bool = False
+    max_workers: int = 8
+    max_concurrency: int = 8
+    per_host_concurrency: int = 4
+    requests_per_second: Optional[float] = 10.0
+    max_depth: Optional[int] = None
+    max_pages: Optional[int] = None
+    parser: str = "auto"
+    use_cache: bool = True
+    force_refresh: bool = False
+    include: Optional[List[str]] = None
+    exclude: Optional[List[str]] = None
+    keywords: Optional[List[str]] = None
+    respect_robots: bool = True
+    discovery: str = "auto"
+    detect_duplicates: bool = True
+    max_memory_mb: Optional[int] = None
+    visited_bloom_capacity: Optional[int] = None
+    parse_pool: str = "auto"
+    parse_workers: Optional[int] = None
+    reuse: bool = True
+    include_content: bool = True
 
 class GenerateRequest(BaseModel):
-    pages: List[Dict]
+    pages: List[Dict] = []
+    crawl_id: Optional[str] = None
+    selected_urls: Optional[List[str]] = None
     api_key: str
     use_groq: bool = False
+    incremental: bool = True
+    max_concurrency: int = 4
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    mode: str = "llm"
+    batch_tokens: int = DEFAULT_BATCH_TOKENS
+    output_format: Optional[str] = None
+    part_tokens: int = DEFAULT_PART_TOKENS
+
+class ResumeRequest(BaseModel):
+    api_key: Optional[str] = None
 
 class PageNode(BaseModel):
     url: str
@@ -53,78 +135,366 @@ class PageNode(BaseModel):
     children: List['PageNode'] = []
     selected: bool = True
 
-@app.get("/", response_class=HTMLResponse)
-async def read_root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+def create_crawler(request: CrawlRequest, content_sink=None) -> DocumentationCrawler:
+    return DocumentationCrawler(
+        max_workers=request.max_workers,
+        max_concurrency=request.max_concurrency,
+        per_host_concurrency=request.per_host_concurrency,
+        requests_per_second=request.requests_per_second,
+        max_depth=request.max_depth,
+        max_pages=request.max_pages,
+        parser=request.parser,
+        cache=http_cache if request.use_cache else None,
+        force_refresh=request.force_refresh,
+        include=request.include,
+        exclude=request.exclude,
+        keywords=request.keywords,
+        respect_robots=request.respect_robots,
+        discovery=request.discovery,
+        detect_duplicates=request.detect_duplicates,
+        max_memory_mb=request.max_memory_mb,
+        visited_bloom_capacity=request.visited_bloom_capacity,
+        parse_pool=request.parse_pool,
+        parse_workers=request.parse_workers,
+        client=clients.crawl_client,
+        content_sink=content_sink,
+    )
 
-@app.post("/api/crawl")
-async def crawl_endpoint(request: CrawlRequest):
-    crawler = None
+def create_processor(request: GenerateRequest) -> DocumentationProcessor:
+    return DocumentationProcessor(
+        request.api_key,
+        use_groq=request.use_groq,
+        store=generation_store,
+        incremental=request.incremental,
+        max_concurrency=request.max_concurrency,
+        requests_per_minute=request.requests_per_minute,
+        tokens_per_minute=request.tokens_per_minute,
+        mode=request.mode,
+        batch_tokens=request.batch_tokens,
+        session=clients.llm_session,
+        groq_client=clients.groq_client(request.api_key, LLM_BASE_URL) if request.use_groq else None,
+        base_url=LLM_BASE_URL,
+        content_loader=crawl_store.content,
+    )
+
+async def run_crawl(request: CrawlRequest, key: str, on_event=None) -> Dict:
+    """Crawl a site and store the result, returning its crawl metadata and page tree.
+    
+    Page content is streamed into the crawl store as the tree is built, so the
+    returned tree carries content_ref hashes instead of content.
+    """
+    crawl_id = crawl_store.reserve()
+    crawler = create_crawler(request, content_sink=functools.partial(crawl_store.put_contents, crawl_id))
+    stored = False
     try:
-        print(colored("Received crawl request", "green"))
-        print(colored(f"Crawling URL: {request.url}", "blue"))
-        crawler = DocumentationCrawler()
-        result = await crawler.crawl(request.url)
+        result = await crawler.crawl(request.url, on_event=on_event)
         
         if result is None:
-            print(colored("Failed to crawl documentation", "red"))
+            log("Failed to crawl documentation", "red", "error")
             raise HTTPException(
                 status_code=400,
                 detail="Failed to crawl documentation. The URL might be invalid or the site might be blocking access."
             )
-            
         # Ensure we have at least some valid pages
         if not result.get("children"):
-            print(colored("No documentation pages found", "red"))
-            raise HTTPException(
-                status_code=400,
-                detail="No documentation pages found at the provided URL."
-            )
-            
-        print(colored("Successfully crawled documentation", "green"))
-        print(colored(f"Found {len(result.get('children', []))} pages", "blue"))
-        return {"pages": result}
+            log("No documentation pages found", "red", "error")
+            raise HTTPException(status_code=400, detail="No documentation pages found at the provided URL.")
+        
+        info = await asyncio.to_thread(crawl_store.put, key, request.url, result, crawl_id=crawl_id)
+        stored = True
+    finally:
+        await crawler.close()
+        if not stored:
+            await asyncio.to_thread(crawl_store.discard, crawl_id)
+    await asyncio.to_thread(crawl_store.purge_expired)
+    return {**info, "pages": result, "cached": False}
+
+async def shared_crawl(request: CrawlRequest, on_event=None) -> Dict:
+    """Return a stored result of the same crawl if one has not expired, otherwise crawl.
+    
+    Identical crawls requested while one is already running wait for it instead of
+    crawling the site again; only the first caller receives progress events.
+    """
+    key = crawl_key(request.url, request.model_dump(exclude=CRAWL_SCHEDULING_FIELDS))
+    if request.reuse and not request.force_refresh:
+        info = await asyncio.to_thread(crawl_store.latest, key)
+        pages = await asyncio.to_thread(crawl_store.get, info["crawl_id"], include_content=request.include_content) if info else None
+        if pages:
+            log(f"Reusing crawl {info['crawl_id']} of {info['url']}", "cyan", "info")
+            return {**info, "pages": pages, "cached": True}
+    result = await crawl_flights.run(key, lambda: run_crawl(request, key, on_event))
+    if request.include_content:
+        # Content is only read back for clients that ask for it
+        return {**result, "pages": await asyncio.to_thread(crawl_store.get, result["crawl_id"])}
+    return {**result, "pages": strip_content(result["pages"])}
+
+def resolve_pages(request: GenerateRequest, references: bool = True) -> Dict:
+    """The page tree to generate from: posted in full, or loaded from a stored crawl.
+    
+    Stored crawls keep content_ref hashes unless references is False, so each page's
+    content is only loaded when the page is generated. Reads the crawl store, so async
+    callers run it in a thread.
+    """
+    if request.crawl_id:
+        pages = crawl_store.get(request.crawl_id, references=references)
+        if pages is None:
+            raise HTTPException(status_code=404, detail="Crawl not found or expired")
+        if request.selected_urls is not None:
+            select_pages(pages, request.selected_urls)
+        return pages
+    # Take the first page as it contains the full tree
+    root_page = request.pages[0] if request.pages else None
+    if not root_page:
+        log("No pages provided in request", "red", "error")
+        raise HTTPException(status_code=400, detail="No pages provided")
+    return root_page
+
+# Background crawl/generate jobs with checkpoints on local disk
+job_manager = JobManager(
+    crawler_factory=lambda params: create_crawler(CrawlRequest(api_key="", **params)),
+    processor_factory=lambda params, api_key: create_processor(GenerateRequest(pages=[], api_key=api_key, **params)),
+    directory=os.getenv("JOB_DIR", DEFAULT_JOB_DIR),
+)
+
+def create_output(request: GenerateRequest):
+    """Allocate an output for the requested format, rejecting unknown formats."""
+    try:
+        return output_store.create(request.output_format, request.part_tokens)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def output_info(manifest: Dict) -> Dict:
+    return {**manifest, "download_url": f"/api/outputs/{manifest['output_id']}/download"}
+
+def ndjson(event: Dict) -> str:
+    return json.dumps(event) + "\n"
+
+@app.get("/", response_class=HTMLResponse)
+async def read_root(request: Request):
+    return templates.TemplateResponse("index.html", {"request": request})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Crawl and generation metrics in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/api/crawl")
+async def crawl_endpoint(request: CrawlRequest):
+    try:
+        log("Received crawl request", "green", "info")
+        log(f"Crawling URL: {request.url}", "blue", "info")
+        result = await shared_crawl(request)
+        
+        log("Successfully crawled documentation", "green", "info")
+        log(f"Found {len(result['pages'].get('children', []))} pages", "blue", "info")
+        return result
         
     except HTTPException:
         raise
     except Exception as e:
-        print(colored(f"Error in crawl endpoint: {str(e)}", "red"))
+        log(f"Error in crawl endpoint: {str(e)}", "red", "error")
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while crawling: {str(e)}"
         )
-    finally:
-        if crawler:
-            await crawler.close()
+
+@app.get("/api/crawls/{crawl_id}")
+async def get_crawl(crawl_id: str, include_content: bool = False):
+    """A stored crawl result, by default without page content."""
+    info = await asyncio.to_thread(crawl_store.info, crawl_id)
+    pages = await asyncio.to_thread(crawl_store.get, crawl_id, include_content=include_content) if info else None
+    if pages is None:
+        raise HTTPException(status_code=404, detail="Crawl not found or expired")
+    return {**info, "pages": pages}
 
 @app.post("/api/generate")
-async def generate_endpoint(request: GenerateRequest):
+async def generate_endpoint(request: GenerateRequest, dry_run: bool = False):
+    """Generate markdown, or with ?dry_run=1 only estimate tokens, requests, time and cost."""
     processor = None
     try:
-        print(colored("Received generate request", "green"))
-        print(colored(f"Using {'Groq' if request.use_groq else 'DeepSeek'} API", "blue"))
-        processor = DocumentationProcessor(request.api_key, use_groq=request.use_groq)
+        log("Received generate request", "green", "info")
+        log(f"Using {'Groq' if request.use_groq else 'DeepSeek'} API", "blue", "info")
+        root_page = await asyncio.to_thread(resolve_pages, request)
+        processor = create_processor(request)
+        
+        if dry_run:
+            # Planning loads every page's content from the crawl store
+            return await asyncio.to_thread(processor.plan, root_page)
+        
+        if request.output_format:
+            output_id, writer = create_output(request)
+            result = await processor.write_output(root_page, writer)
+            return output_info(output_store.save(output_id, request.output_format, result, result["pages"]))
         
-        # Take the first page as it contains the full tree
-        root_page = request.pages[0] if request.pages else None
-        if not root_page:
-            print(colored("No pages provided in request", "red"))
-            raise HTTPException(status_code=400, detail="No pages provided")
-            
         markdown_content = await processor.process_pages(root_page)
-        print(colored("Successfully generated markdown", "green"))
-        print(colored(f"Generated content length: {len(markdown_content)} characters", "blue"))
+        log("Successfully generated markdown", "green", "info")
+        log(f"Generated content length: {len(markdown_content)} characters", "blue", "info")
         return {"content": markdown_content}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(colored(f"Error in generate endpoint: {str(e)}", "red"))
+        log(f"Error in generate endpoint: {str(e)}", "red", "error")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if processor:
             await processor.close()
 
+@app.post("/api/crawl/stream")
+async def crawl_stream_endpoint(request: CrawlRequest):
+    """Stream discovered pages as NDJSON events, ending with the organized tree."""
+    log("Received streaming crawl request", "green", "info")
+    log(f"Crawling URL: {request.url}", "blue", "info")
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def stream_crawl():
+        try:
+            result = await shared_crawl(request, on_event=events.put_nowait)
+            events.put_nowait({"type": "result", **result})
+        except HTTPException as e:
+            events.put_nowait({"type": "error", "message": e.detail})
+        except Exception as e:
+            log(f"Error in crawl stream: {str(e)}", "red", "error")
+            events.put_nowait({"type": "error", "message": f"An error occurred while crawling: {str(e)}"})
+        finally:
+            events.put_nowait(None)
+    
+    async def stream():
+        task = asyncio.create_task(stream_crawl())
+        try:
+            while (event := await events.get()) is not None:
+                yield ndjson(event)
+        finally:
+            # Stop crawling if the client disconnects
+            task.cancel()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/api/generate/stream")
+async def generate_stream_endpoint(request: GenerateRequest):
+    """Stream generated pages as NDJSON events as soon as each one is ready."""
+    log("Received streaming generate request", "green", "info")
+    log(f"Using {'Groq' if request.use_groq else 'DeepSeek'} API", "blue", "info")
+    root_page = await asyncio.to_thread(resolve_pages, request)
+    output_id, writer = create_output(request) if request.output_format else (None, None)
+    processor = create_processor(request)
+    
+    async def stream():
+        succeeded = 0
+        try:
+            async for event in processor.stream_pages(root_page):
+                if writer and event["type"] == "start":
+                    writer.start(event["header"], event["total"])
+                if event["type"] == "page":
+                    succeeded += 1
+                    if writer:
+                        writer.write_page(event["index"], event)
+                        # The page is on disk; the client downloads the output instead
+                        event = {name: value for name, value in event.items() if name not in ("content", "markdown")}
+                yield ndjson(event)
+            if succeeded and writer:
+                manifest = output_store.save(output_id, request.output_format, writer.finish(), succeeded)
+                yield ndjson({"type": "done", "pages": succeeded, "output": output_info(manifest)})
+            elif succeeded:
+                yield ndjson({"type": "done", "pages": succeeded})
+            else:
+                yield ndjson({"type": "error", "message": "No pages were successfully processed"})
+        except Exception as e:
+            log(f"Error in generate stream: {str(e)}", "red", "error")
+            yield ndjson({"type": "error", "message": str(e)})
+        finally:
+            await processor.close()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/api/jobs/crawl")
+async def create_crawl_job(request: CrawlRequest):
+    job = job_manager.create("crawl", request.model_dump(exclude={"api_key"}))
+    return {"job_id": job["id"], "status": job["status"]}
+
+@app.post("/api/jobs/generate")
+async def create_generate_job(request: GenerateRequest):
+    if request.output_format and request.output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown output format '{request.output_format}', expected one of {', '.join(OUTPUT_FORMATS)}")
+    # Jobs keep their input on disk and may outlive the stored crawl
+    root_page = await asyncio.to_thread(resolve_pages, request, references=False)
+    job = job_manager.create(
+        "generate",
+        request.model_dump(exclude={"api_key", "pages", "crawl_id", "selected_urls"}),
+        api_key=request.api_key,
+        pages=root_page,
+    )
+    return {"job_id": job["id"], "status": job["status"]}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    result = job_manager.result(job_id)
+    if result is None:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return result
+
+@app.get("/api/jobs/{job_id}/download")
+async def download_job_result(job_id: str):
+    """The generated document of a finished generate job as a file download."""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    path = job_manager.artifact_path(job_id)
+    if path is None:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return FileResponse(path, filename=os.path.basename(path))
+
+@app.get("/api/outputs/{output_id}")
+async def get_output(output_id: str):
+    manifest = output_store.get(output_id)
+    if not manifest:
+        raise HTTPException(status_code=404, detail="Output not found or expired")
+    return output_info(manifest)
+
+@app.get("/api/outputs/{output_id}/download")
+async def download_output(output_id: str):
+    """The output as one file: the document itself, or a zip for multi-file formats."""
+    manifest = output_store.get(output_id)
+    if not manifest:
+        raise HTTPException(status_code=404, detail="Output not found or expired")
+    return FileResponse(output_store.file_path(output_id, manifest["artifact"]), filename=manifest["artifact"])
+
+@app.get("/api/outputs/{output_id}/files/{name:path}")
+async def download_output_file(output_id: str, name: str):
+    """A single file of an output, e.g. one llms-full part or one page."""
+    path = output_store.file_path(output_id, name)
+    if not path:
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(path, filename=os.path.basename(name))
+
+@app.post("/api/jobs/{job_id}/resume")
+async def resume_job(job_id: str, request: ResumeRequest):
+    try:
+        job = job_manager.resume(job_id, api_key=request.api_key)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job["id"], "status": job["status"]}
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if not job_manager.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"cancelled": job_manager.cancel(job_id)}
+
 if __name__ == "__main__":
     import uvicorn
-    print(colored("Starting Documentation Compiler server...", "green"))
+    log("Starting Documentation Compiler server...", "green", "info")
     uvicorn.run(
         "main:app",
         host="127.0.0.1",
@@ -0,0 +1,292 @@
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+from bs4 import Comment, Declaration, Doctype, NavigableString, ProcessingInstruction, Tag
+
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'button', 'input', 'select', 'textarea', 'link', 'meta', 'head'}
+SKIP_STRINGS = (Comment, Declaration, Doctype, ProcessingInstruction)
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'body', 'center', 'dd', 'details', 'dialog', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'html', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'ul',
+}
+ADMONITION_KINDS = ['note', 'warning', 'tip', 'hint', 'important', 'caution', 'danger', 'info', 'success', 'error']
+ADMONITION_PATTERN = re.compile(
+    r'\b(admonition|callout|alert|notice|' + '|'.join(ADMONITION_KINDS) + r')\b',
+    re.IGNORECASE
+)
+LANGUAGE_PATTERN = re.compile(r'^(?:language|lang|highlight|brush|sourceCode)-?([\w+#.-]+)$', re.IGNORECASE)
+MARKDOWN_LINK_PATTERN = re.compile(r'(!?)\[([^\]]*)\]\(([^)\s]+)\)')
+
+
+def normalize_link(url: str) -> str:
+    """Normalize a URL for link matching: no fragment, query or trailing slash."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}{parsed.path.rstrip('/')}"
+
+
+def rewrite_links(markdown: str, anchors: Dict[str, str]) -> str:
+    """Point links to pages that are part of the document at their in-document anchors."""
+    if not anchors:
+        return markdown
+
+    def replace(match: re.Match) -> str:
+        bang, text, url = match.groups()
+        if bang or not url.startswith(('http://', 'https://')):
+            return match.group(0)
+        anchor = anchors.get(normalize_link(url))
+        return f"[{text}](#{anchor})" if anchor else match.group(0)
+
+    return MARKDOWN_LINK_PATTERN.sub(replace, markdown)
+
+
+def looks_well_structured(markdown: str) -> bool:
+    """Heuristic check that locally converted markdown is good enough to skip the LLM."""
+    if len(markdown.strip()) < 40:
+        return False
+    if len(re.findall(r'</?[a-zA-Z][^>]*>', markdown)) > 5:
+        return False  # HTML the converter could not translate
+
+    prose = re.sub(r'```.*?```', '', markdown, flags=re.DOTALL)
+    paragraphs = [p for p in prose.split('\n\n') if p.strip()]
+    if any(len(p) > 2000 and not p.lstrip().startswith('|') for p in paragraphs):
+        return False  # Wall of text: the page structure was lost
+    if len(prose) > 1500 and not re.search(r'^#{1,6}\s', prose, re.MULTILINE):
+        return False
+
+    link_text = sum(len(m.group(0)) for m in MARKDOWN_LINK_PATTERN.finditer(prose))
+    return link_text <= 0.6 * max(1, len(prose.strip()))
+
+
+class MarkdownConverter:
+    """Deterministic HTML to Markdown conversion for documentation pages."""
+
+    def __init__(self, base_url: str = ""):
+        self.base_url = base_url
+
+    def convert(self, element: Tag) -> str:
+        markdown = "\n\n".join(self._blocks(element))
+        markdown = re.sub(r'\n{3,}', '\n\n', markdown)
+        return markdown.strip()
+
+    # Block level
+
+    def _blocks(self, node: Tag, skip: Optional[Tag] = None) -> List[str]:
+        """Convert children into a list of markdown blocks, grouping inline runs."""
+        blocks: List[str] = []
+        inline: List[str] = []
+
+        def flush() -> None:
+            text = ''.join(inline).strip()
+            if text:
+                blocks.append(re.sub(r' *\n *', '\n', text))
+            inline.clear()
+
+        for child in node.children:
+            if child is skip:
+                continue
+            if isinstance(child, NavigableString):
+                if not isinstance(child, SKIP_STRINGS):
+                    inline.append(re.sub(r'\s+', ' ', str(child)))
+                continue
+            if not isinstance(child, Tag) or child.name in SKIP_TAGS:
+                continue
+            if child.name in BLOCK_TAGS:
+                flush()
+                block = self._block(child)
+                if block.strip():
+                    blocks.append(block)
+            else:
+                inline.append(self._inline_tag(child))
+        flush()
+        return blocks
+
+    def _block(self, tag: Tag) -> str:
+        name = tag.name
+        if name in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            text = self._inline(tag).strip().replace('\n', ' ')
+            return f"{'#' * int(name[1])} {text}" if text else ''
+        if name == 'p':
+            return self._inline(tag).strip()
+        if name == 'pre':
+            return self._code_block(tag)
+        if name in ('ul', 'ol'):
+            return self._list(tag, ordered=name == 'ol')
+        if name == 'table':
+            return self._table(tag)
+        if name == 'hr':
+            return '---'
+        if name == 'dl':
+            return self._definition_list(tag)
+        if name == 'details':
+            summary = tag.find('summary')
+            title = f"**{self._inline(summary).strip()}**" if summary else ''
+            body = "\n\n".join(self._blocks(tag, skip=summary))
+            return f"{title}\n\n{body}".strip()
+        if name == 'blockquote':
+            return self._quote("\n\n".join(self._blocks(tag)))
+        if name in ('div', 'aside', 'section') and self._is_admonition(tag):
+            return self._admonition(tag)
+        if name == 'figcaption':
+            text = self._inline(tag).strip()
+            return f"*{text}*" if text else ''
+        return "\n\n".join(self._blocks(tag))
+
+    def _code_block(self, tag: Tag) -> str:
+        code = tag.get_text().strip('\n')
+        fence = '```'
+        while fence in code:
+            fence += '`'
+        return f"{fence}{self._code_language(tag)}\n{code}\n{fence}"
+
+    def _code_language(self, tag: Tag) -> str:
+        candidates = [tag, tag.find('code'), tag.parent, tag.parent.parent if tag.parent else None]
+        for candidate in candidates:
+            if not isinstance(candidate, Tag):
+                continue
+            if candidate.get('data-lang'):
+                return candidate['data-lang'].strip()
+            for cls in candidate.get('class', []):
+                match = LANGUAGE_PATTERN.match(cls)
+                if match and match.group(1).lower() not in ('default', 'plaintext', 'none'):
+                    return match.group(1)
+        return ''
+
+    def _list(self, tag: Tag, ordered: bool) -> str:
+        items = tag.find_all('li', recursive=False)
+        if not items:
+            return "\n\n".join(self._blocks(tag))
+        try:
+            number = int(tag.get('start', 1))
+        except ValueError:
+            number = 1
+
+        lines: List[str] = []
+        for item in items:
+            marker = f"{number}." if ordered else '-'
+            number += 1
+            separator = "\n\n" if item.find('p', recursive=False) else "\n"
+            body = separator.join(self._blocks(item)) or ''
+            indent = ' ' * (len(marker) + 1)
+            body_lines = body.split('\n')
+            lines.append(f"{marker} {body_lines[0]}".rstrip())
+            lines.extend(f"{indent}{line}" if line else '' for line in body_lines[1:])
+        return "\n".join(lines)
+
+    def _table(self, tag: Tag) -> str:
+        rows = [row for row in tag.find_all('tr') if row.find_parent('table') is tag]
+        cells = [
+            [self._table_cell(cell) for cell in row.find_all(['th', 'td'], recursive=False)]
+            for row in rows
+        ]
+        cells = [row for row in cells if row]
+        if not cells:
+            return ''
+        width = max(len(row) for row in cells)
+        cells = [row + [''] * (width - len(row)) for row in cells]
+        lines = [
+            f"| {' | '.join(cells[0])} |",
+            f"| {' | '.join(['---'] * width)} |",
+        ]
+        lines.extend(f"| {' | '.join(row)} |" for row in cells[1:])
+        caption = tag.find('caption')
+        if caption:
+            lines.insert(0, f"*{self._inline(caption).strip()}*\n")
+        return "\n".join(lines)
+
+    def _table_cell(self, cell: Tag) -> str:
+        text = self._inline(cell).strip()
+        return re.sub(r'\s*\n\s*', ' ', text).replace('|', '\\|')
+
+    def _definition_list(self, tag: Tag) -> str:
+        lines: List[str] = []
+        for child in tag.find_all(['dt', 'dd'], recursive=False):
+            text = "\n\n".join(self._blocks(child))
+            if child.name == 'dt':
+                lines.append(f"\n**{text}**")
+            else:
+                lines.append(f": {text}")
+        return "\n".join(lines).strip()
+
+    def _is_admonition(self, tag: Tag) -> bool:
+        classes = ' '.join(tag.get('class', []))
+        return bool(ADMONITION_PATTERN.search(classes)) or tag.get('role') == 'note'
+
+    def _admonition(self, tag: Tag) -> str:
+        classes = ' '.join(tag.get('class', [])).lower()
+        kind = next((k for k in ADMONITION_KINDS if k in classes), 'note')
+        title_tag = tag.find(class_=re.compile(r'(admonition|callout|alert)-?(title|heading)', re.IGNORECASE))
+        title = self._inline(title_tag).strip() if title_tag else kind.title()
+        body = "\n\n".join(self._blocks(tag, skip=title_tag if title_tag in tag.children else None))
+        if title_tag and title_tag not in tag.children:
+            body = body.replace(title, '', 1).strip()
+        return self._quote(f"**{title}**\n\n{body}".strip())
+
+    def _quote(self, text: str) -> str:
+        return "\n".join(f"> {line}" if line else '>' for line in text.split('\n'))
+
+    # Inline level
+
+    def _inline(self, node: Tag) -> str:
+        parts: List[str] = []
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                if not isinstance(child, SKIP_STRINGS):
+                    parts.append(re.sub(r'\s+', ' ', str(child)))
+            elif isinstance(child, Tag):
+                parts.append(self._inline_tag(child))
+        return ''.join(parts)
+
+    def _inline_tag(self, tag: Tag) -> str:
+        name = tag.name
+        if name in SKIP_TAGS:
+            return ''
+        if name == 'br':
+            return '\n'
+        if name == 'code' or name == 'kbd' or name == 'samp':
+            text = tag.get_text()
+            if not text.strip():
+                return text
+            fence = '`'
+            while fence in text:
+                fence += '`'
+            padding = ' ' if text.startswith('`') or text.endswith('`') else ''
+            return f"{fence}{padding}{text}{padding}{fence}"
+        if name in ('strong', 'b'):
+            return self._wrap(self._inline(tag), '**')
+        if name in ('em', 'i'):
+            return self._wrap(self._inline(tag), '*')
+        if name in ('del', 's', 'strike'):
+            return self._wrap(self._inline(tag), '~~')
+        if name == 'a':
+            return self._link(tag)
+        if name == 'img':
+            alt = tag.get('alt', '').strip()
+            src = tag.get('src', '')
+            return f"![{alt}]({self._url(src)})" if src else alt
+        if name in BLOCK_TAGS:
+            # Block element nested inside inline content: keep its text on its own line
+            return f"\n{' '.join(self._blocks(tag))}\n"
+        return self._inline(tag)
+
+    def _wrap(self, text: str, marker: str) -> str:
+        stripped = text.strip()
+        if not stripped:
+            return text
+        leading = ' ' if text[:1].isspace() else ''
+        trailing = ' ' if text[-1:].isspace() else ''
+        return f"{leading}{marker}{stripped}{marker}{trailing}"
+
+    def _link(self, tag: Tag) -> str:
+        text = self._inline(tag).strip()
+        href = (tag.get('href') or '').strip()
+        if not text:
+            return ''
+        if not href or href.startswith(('#', 'javascript:')):
+            return text
+        return f"[{text}]({self._url(href)})"
+
+    def _url(self, href: str) -> str:
+        """Resolve a link against the page URL and escape characters that break markdown links."""
+        return urljoin(self.base_url, href).replace(' ', '%20').replace('(', '%28').replace(')', '%29')
@@ -0,0 +1,162 @@
+import bisect
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Optional OpenTelemetry tracing: spans are only recorded when the API is installed
+# (and exported only when an SDK is configured, e.g. with opentelemetry-instrument)
+try:
+    from opentelemetry import trace as _otel_trace
+    _tracer = _otel_trace.get_tracer("documentation-crawler")
+except ImportError:
+    _tracer = None
+
+# Constants
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# httpcore trace events delimiting each phase of a request, for HTTP/1.1 and HTTP/2
+HTTP_PHASES = {
+    "connect": (("connection.connect_tcp.started",), ("connection.start_tls.complete", "connection.connect_tcp.complete")),
+    "ttfb": (("http11.send_request_headers.started", "http2.send_request_headers.started"),
+             ("http11.receive_response_headers.complete", "http2.receive_response_headers.complete")),
+    "download": (("http11.receive_response_body.started", "http2.receive_response_body.started"),
+                 ("http11.receive_response_body.complete", "http2.receive_response_body.complete")),
+}
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        values = self.values or ({(): 0.0} if not self.labels else {})
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels."""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (last is +Inf), sum]
+        self.values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"' if bound == "+Inf" else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "doc_compiler_stage_seconds",
+    "Time spent in each crawl and generation stage",
+    labels=("stage",),
+)
+PAGES_CRAWLED = Counter("doc_compiler_pages_crawled_total", "Pages collected by crawls")
+PAGES_SKIPPED = Counter("doc_compiler_pages_skipped_total", "Fetched pages left out of crawl results", labels=("reason",))
+FETCH_ERRORS = Counter("doc_compiler_fetch_errors_total", "Page fetches that failed")
+FETCH_RETRIES = Counter("doc_compiler_fetch_retries_total", "Page requests retried after a transient failure")
+CACHE_RESULTS = Counter("doc_compiler_http_cache_total", "HTTP cache lookups by outcome", labels=("result",))
+LLM_REQUESTS = Counter("doc_compiler_llm_requests_total", "LLM requests by provider and outcome", labels=("provider", "outcome"))
+LLM_TOKENS = Counter("doc_compiler_llm_tokens_total", "Tokens reported by LLM providers", labels=("provider", "direction"))
+PAGES_GENERATED = Counter("doc_compiler_pages_generated_total", "Pages converted to markdown by source", labels=("source",))
+
+REGISTRY = (
+    STAGE_SECONDS,
+    PAGES_CRAWLED,
+    PAGES_SKIPPED,
+    FETCH_ERRORS,
+    FETCH_RETRIES,
+    CACHE_RESULTS,
+    LLM_REQUESTS,
+    LLM_TOKENS,
+    PAGES_GENERATED,
+)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def span(name: str, **attributes):
+    """An OpenTelemetry span when tracing is available, otherwise a no-op context."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+@contextmanager
+def timed(stage: str, **attributes) -> Iterator[None]:
+    """Record the duration of a block as a stage timing, inside a span of the same name."""
+    start = time.perf_counter()
+    try:
+        with span(stage, **attributes):
+            yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+class HttpTrace:
+    """httpx trace hook splitting a request into connect, time-to-first-byte and download.
+
+    Pass as extensions={"trace": trace} and call observe() once the response is read.
+    Connect covers DNS resolution, TCP and TLS, and is absent for reused connections.
+    """
+
+    def __init__(self):
+        self.events: Dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: Dict) -> None:
+        self.events[event_name] = time.perf_counter()
+
+    def _first(self, names: Sequence[str]) -> Optional[float]:
+        for name in names:
+            if name in self.events:
+                return self.events[name]
+        return None
+
+    def observe(self) -> None:
+        for stage, (starts, ends) in HTTP_PHASES.items():
+            start, end = self._first(starts), self._first(ends)
+            if start is not None and end is not None:
+                STAGE_SECONDS.observe(end - start, stage=stage)
@@ -0,0 +1,298 @@
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+import zipfile
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from content import chunk_text, estimate_tokens
+
+# Constants
+OUTPUT_FORMATS = ("markdown", "pages", "jsonl", "zip", "llms-full")
+DEFAULT_OUTPUT_DIR = ".outputs"
+DEFAULT_OUTPUT_TTL = 24 * 60 * 60  # Seconds generated outputs are kept for download
+DEFAULT_PART_TOKENS = 100_000  # Token budget of each llms-full part
+MANIFEST = "manifest.json"
+UNSAFE_PATH_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def page_path(url: str) -> str:
+    """Relative .md path mirroring a page's URL path, e.g. docs/guide/intro.md."""
+    segments = [UNSAFE_PATH_CHARS.sub('-', segment) for segment in urlparse(url).path.split('/')]
+    segments = [segment for segment in segments if segment.strip('.')]
+    return '/'.join(segments or ['index']) + '.md'
+
+
+def _page_document(page: Dict) -> str:
+    return f"# {page['title']}\n\nSource: {page['url']}\n\n{page.get('markdown') or page['content']}\n"
+
+
+class OutputWriter(ABC):
+    """Writes generated pages to files as they finish, in any order.
+
+    Pages arrive through write_page() in completion order, tagged with their index
+    in document order. Writers never hold more than one page's text in memory:
+    formats that need document order spool pages to disk and assemble them in
+    finish(), which returns the written files and the one to offer for download.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.header = ""
+        self.total = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def start(self, header: str, total: int) -> None:
+        self.header = header
+        self.total = total
+
+    @abstractmethod
+    def write_page(self, index: int, page: Dict) -> None:
+        """Write one finished page; `index` is its position in document order."""
+
+    @abstractmethod
+    def finish(self) -> Dict:
+        """Complete the output and return its files and the artifact to download."""
+
+
+class _SpooledWriter(OutputWriter):
+    """Spools formatted pages to a scratch file and replays them in document order."""
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self._spool = open(self._path(".spool"), "w+b")
+        self._offsets: Dict[int, Tuple[int, int]] = {}
+
+    def write_page(self, index: int, page: Dict) -> None:
+        data = page["content"].encode("utf-8")
+        self._spool.seek(0, 2)
+        self._offsets[index] = (self._spool.tell(), len(data))
+        self._spool.write(data)
+
+    def _ordered_pages(self):
+        for index in sorted(self._offsets):
+            offset, length = self._offsets[index]
+            self._spool.seek(offset)
+            yield self._spool.read(length).decode("utf-8")
+
+    def _close_spool(self) -> None:
+        self._spool.close()
+        os.remove(self._path(".spool"))
+
+
+class MarkdownWriter(_SpooledWriter):
+    """One markdown document: the header and table of contents, then every page in tree order."""
+
+    def __init__(self, directory: str, filename: str = "document.md"):
+        super().__init__(directory)
+        self.filename = filename
+
+    def finish(self) -> Dict:
+        with open(self._path(self.filename), "w", encoding="utf-8") as f:
+            f.write(self.header)
+            for position, content in enumerate(self._ordered_pages()):
+                f.write(f"\n{content}" if position else content)
+        self._close_spool()
+        return {"files": [self.filename], "artifact": self.filename}
+
+
+class LlmsFullWriter(_SpooledWriter):
+    """llms-full.txt-style bundle, split into parts that each fit a token budget.
+
+    Pages are kept whole where possible; a page larger than the budget is split at
+    heading boundaries. A single part is named llms-full.txt, several parts
+    llms-full-001.txt, llms-full-002.txt, ... and are also zipped for download.
+    """
+
+    def __init__(self, directory: str, part_tokens: int = DEFAULT_PART_TOKENS):
+        super().__init__(directory)
+        self.part_tokens = part_tokens
+
+    def finish(self) -> Dict:
+        files: List[str] = []
+        part, part_size = None, 0
+
+        def next_part():
+            nonlocal part, part_size
+            if part:
+                part.close()
+            files.append(f"llms-full-{len(files) + 1:03d}.txt")
+            part, part_size = open(self._path(files[-1]), "w", encoding="utf-8"), 0
+
+        next_part()
+        for text in [self.header, *self._ordered_pages()]:
+            if not text:
+                continue
+            for chunk in chunk_text(text, self.part_tokens):
+                tokens = estimate_tokens(chunk)
+                if part_size and part_size + tokens > self.part_tokens:
+                    next_part()
+                part.write(chunk if chunk.endswith("\n") else chunk + "\n")
+                part_size += tokens
+        part.close()
+        self._close_spool()
+
+        if len(files) == 1:
+            os.replace(self._path(files[0]), self._path("llms-full.txt"))
+            return {"files": ["llms-full.txt"], "artifact": "llms-full.txt"}
+        with zipfile.ZipFile(self._path("llms-full.zip"), "w", zipfile.ZIP_DEFLATED) as archive:
+            for name in files:
+                archive.write(self._path(name), name)
+        return {"files": files, "artifact": "llms-full.zip"}
+
+
+class PagesWriter(OutputWriter):
+    """One markdown file per page under pages/, mirroring the crawl tree, plus a SUMMARY.md index.
+
+    Pages are written as soon as they finish; the directory is zipped for download.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self._index: Dict[int, Tuple[str, str]] = {}
+
+    def _store(self, name: str, document: str) -> None:
+        path = self._path(os.path.join("pages", name))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(document)
+
+    def write_page(self, index: int, page: Dict) -> None:
+        name = page_path(page["url"])
+        self._index[index] = (page["title"], name)
+        self._store(name, _page_document(page))
+
+    def _summary(self) -> str:
+        lines = ["# Summary", ""]
+        lines.extend(f"- [{title}]({name})" for _, (title, name) in sorted(self._index.items()))
+        return "\n".join(lines) + "\n"
+
+    def finish(self) -> Dict:
+        self._store("SUMMARY.md", self._summary())
+        files = []
+        with zipfile.ZipFile(self._path("pages.zip"), "w", zipfile.ZIP_DEFLATED) as archive:
+            for root, _, names in os.walk(self._path("pages")):
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    relative = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                    archive.write(path, relative)
+                    files.append(relative)
+        return {"files": files, "artifact": "pages.zip"}
+
+
+class ZipWriter(PagesWriter):
+    """Per-page markdown files written straight into a zip archive, without a directory on disk."""
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self._archive = zipfile.ZipFile(self._path("pages.zip"), "w", zipfile.ZIP_DEFLATED)
+
+    def _store(self, name: str, document: str) -> None:
+        self._archive.writestr(f"pages/{name}", document)
+
+    def finish(self) -> Dict:
+        self._store("SUMMARY.md", self._summary())
+        self._archive.close()
+        return {"files": ["pages.zip"], "artifact": "pages.zip"}
+
+
+class JsonlWriter(OutputWriter):
+    """A JSON-lines corpus with one record per page, written as pages finish (for RAG ingestion)."""
+
+    def __init__(self, directory: str, filename: str = "corpus.jsonl"):
+        super().__init__(directory)
+        self.filename = filename
+        self._file = open(self._path(filename), "w", encoding="utf-8")
+
+    def write_page(self, index: int, page: Dict) -> None:
+        markdown = page.get("markdown") or page["content"]
+        self._file.write(json.dumps({
+            "index": index,
+            "url": page["url"],
+            "title": page["title"],
+            "markdown": markdown,
+            "tokens": estimate_tokens(markdown),
+        }) + "\n")
+
+    def finish(self) -> Dict:
+        self._file.close()
+        return {"files": [self.filename], "artifact": self.filename}
+
+
+def create_writer(output_format: str, directory: str, part_tokens: int = DEFAULT_PART_TOKENS) -> OutputWriter:
+    if output_format == "markdown":
+        return MarkdownWriter(directory)
+    if output_format == "pages":
+        return PagesWriter(directory)
+    if output_format == "jsonl":
+        return JsonlWriter(directory)
+    if output_format == "zip":
+        return ZipWriter(directory)
+    if output_format == "llms-full":
+        return LlmsFullWriter(directory, part_tokens)
+    raise ValueError(f"Unknown output format '{output_format}', expected one of {', '.join(OUTPUT_FORMATS)}")
+
+
+class OutputStore:
+    """Generated outputs on local disk, one directory per output with a manifest."""
+
+    def __init__(self, directory: str = DEFAULT_OUTPUT_DIR, ttl: float = DEFAULT_OUTPUT_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def create(self, output_format: str, part_tokens: int = DEFAULT_PART_TOKENS) -> Tuple[str, OutputWriter]:
+        """Allocate an output and return its id and writer (validating the format first)."""
+        output_id = uuid.uuid4().hex
+        directory = os.path.join(self.directory, output_id)
+        try:
+            return output_id, create_writer(output_format, directory, part_tokens)
+        except ValueError:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+
+    def save(self, output_id: str, output_format: str, result: Dict, pages: int) -> Dict:
+        manifest = {
+            "output_id": output_id,
+            "format": output_format,
+            "files": result["files"],
+            "artifact": result["artifact"],
+            "pages": pages,
+            "created_at": time.time(),
+        }
+        with open(os.path.join(self.directory, output_id, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        # A long-running server only drops expired outputs as new ones are saved
+        self.purge_expired()
+        return manifest
+
+    def get(self, output_id: str) -> Optional[Dict]:
+        if not re.fullmatch(r'[0-9a-f]{32}', output_id):
+            return None
+        path = os.path.join(self.directory, output_id, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def file_path(self, output_id: str, name: str) -> Optional[str]:
+        """Path of one file of an output, if the output lists it."""
+        manifest = self.get(output_id)
+        if not manifest or (name not in manifest["files"] and name != manifest["artifact"]):
+            return None
+        return os.path.join(self.directory, output_id, name)
+
+    def purge_expired(self) -> None:
+        """Delete outputs older than the TTL."""
+        cutoff = time.time() - self.ttl
+        for output_id in os.listdir(self.directory):
+            path = os.path.join(self.directory, output_id)
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+from console import log
+
+from content import reduce_html
+from dedupe import simhash
+from url_policy import clean_url
+
+# "process" parses in worker processes (uses all cores), "thread" in worker threads
+# (keeps the event loop responsive), "inline" on the event loop itself, and "auto"
+# picks processes on multi-core machines and threads otherwise
+PARSE_POOLS = ("auto", "process", "thread", "inline")
+NAV_TERMS = ('nav', 'menu', 'sidebar', 'toc')
+START_PAGE_PATHS = ('/documentation', '/docs', '/api', '/guide', '/reference')
+
+_executors: Dict[Tuple[str, int], Executor] = {}
+# Pool type and size of every executor handed out, including replaced ones
+_executor_keys: Dict[Executor, Tuple[str, int]] = {}
+
+
+def resolve_parser(parser: str) -> str:
+    """Pick the BeautifulSoup tree builder, preferring lxml when it is installed."""
+    if parser != "auto":
+        return parser
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+def get_parse_executor(pool: str = "auto", workers: Optional[int] = None) -> Optional[Executor]:
+    """Return the shared executor for a pool type, or None to parse inline."""
+    if pool not in PARSE_POOLS:
+        raise ValueError(f"Unknown parse pool '{pool}', expected one of {', '.join(PARSE_POOLS)}")
+    cpus = os.cpu_count() or 1
+    if pool == "auto":
+        pool = "process" if cpus > 1 else "thread"
+    if pool == "inline":
+        return None
+    workers = workers or cpus
+    key = (pool, workers)
+    if key not in _executors:
+        if pool == "process":
+            # spawn avoids forking a process that is running an event loop and threads
+            _executors[key] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            _executors[key] = ThreadPoolExecutor(workers, thread_name_prefix="parse")
+        _executor_keys[_executors[key]] = key
+    return _executors[key]
+
+
+def replace_parse_executor(broken: Executor) -> Optional[Executor]:
+    """Return a working executor in place of a broken one (e.g. after a pool process died).
+
+    The broken executor is dropped from the shared cache and a new one of the same
+    type and size is created; callers that hit the same breakage later get that one.
+    """
+    key = _executor_keys.get(broken)
+    if key is None:
+        return None
+    if _executors.get(key) is broken:
+        del _executors[key]
+        broken.shutdown(wait=False, cancel_futures=True)
+    return get_parse_executor(*key)
+
+
+def shutdown_parse_executors() -> None:
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
+    _executor_keys.clear()
+
+
+def extract_links(soup: BeautifulSoup, current_url: str, is_start_page: bool = False) -> List[str]:
+    """Extract absolute, cleaned links from a parsed page.
+
+    Links are filtered by the URL policy when they are first discovered, so cached
+    parses stay valid when the filtering rules change.
+    """
+    try:
+        links = set()  # Use a set to avoid duplicates
+        parsed_current = urlparse(current_url)
+        origin = f"{parsed_current.scheme}://{parsed_current.netloc}"
+
+        # First try to find links in navigation elements. The starting page is
+        # searched in full so that links outside the navigation are discovered too.
+        nav_elements = [] if is_start_page else soup.find_all(
+            ['nav', 'header', 'aside', 'div'],
+            class_=lambda x: x and any(term in x.lower() for term in NAV_TERMS)
+        )
+
+        # If no navigation elements found, look in the whole document
+        elements_to_search = nav_elements if nav_elements else [soup]
+
+        for element in elements_to_search:
+            for a in element.find_all('a', href=True):
+                href = a['href']
+
+                # Skip empty links and javascript links
+                if not href or href.startswith(('javascript:', '#', 'mailto:', 'tel:')):
+                    continue
+
+                # Handle relative URLs
+                if href.startswith('//'):
+                    href = urljoin(current_url, href)
+                elif href.startswith('/'):
+                    href = f"{origin}{href}"
+                elif not href.startswith(('http://', 'https://')):
+                    href = urljoin(current_url, href)
+
+                if href.startswith(('http://', 'https://')):
+                    links.add(clean_url(href))
+
+        # If we're on the first page, also look for documentation-specific links
+        if is_start_page:
+            for path in START_PAGE_PATHS:
+                links.add(clean_url(f"{origin}{path}"))
+
+        # Sort links to maintain consistent order
+        return sorted(links)
+    except Exception as e:
+        log(f"Error extracting links from {current_url}: {str(e)}", "red", "error")
+        return []
+
+
+def parse_page(
+    html: str,
+    url: str,
+    response_url: Optional[str] = None,
+    parser: str = "html.parser",
+    retain_content: bool = True,
+    is_start_page: bool = False,
+) -> Dict:
+    """Parse HTML exactly once and extract title, links and optionally reduced main content.
+
+    Relative links are resolved against response_url, the address the page was
+    actually served from after redirects. Stage timings are returned under "timings"
+    so they can be recorded by the caller even when parsing runs in another process.
+    """
+    response_url = response_url or url
+    started = time.perf_counter()
+    soup = BeautifulSoup(html, parser)
+
+    # Get title from meta tags or title tag
+    title_tag = (
+        soup.find('meta', property='og:title')
+        or soup.find('meta', {'name': 'title'})
+        or soup.title
+    )
+    if title_tag is None:
+        title = ''
+    elif title_tag.name == 'meta':
+        title = title_tag.get('content', '')
+    else:
+        title = title_tag.get_text()
+    title = title.strip() or url.split('/')[-1]
+
+    # The page's own canonical URL, honoured only on the same host
+    canonical = None
+    canonical_tag = soup.find('link', rel='canonical', href=True)
+    if canonical_tag:
+        canonical = clean_url(urljoin(response_url, canonical_tag['href']))
+        if urlparse(canonical).netloc != urlparse(response_url).netloc.lower():
+            canonical = None
+
+    # Links must be extracted before content reduction strips the navigation
+    parsed = time.perf_counter()
+    links = extract_links(soup, response_url, is_start_page=is_start_page)
+    extracted = time.perf_counter()
+    content = reduce_html(soup, response_url) if retain_content else None
+
+    return {
+        "title": title,
+        "links": links,
+        "content": content,
+        "final_url": clean_url(response_url),
+        "canonical": canonical,
+        "simhash": simhash(content) if content else None,
+        "timings": {
+            "parse_html": parsed - started,
+            "extract_links": extracted - parsed,
+            "reduce_content": time.perf_counter() - extracted,
+        },
+    }
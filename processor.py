@@ -1,23 +1,53 @@
-from bs4 import BeautifulSoup
-import httpx
-from termcolor import colored
-from typing import List, Dict, Optional
-import openai
-from groq import Groq
+from console import log
+from typing import TYPE_CHECKING, AsyncIterator, Callable, List, Dict, Optional, Tuple
 import asyncio
-from markdown import markdown
+import time
 import re
-import os
-import json
-import aiohttp
-from groq import AsyncGroq
+
+from content import chunk_text, count_tokens, estimate_tokens, tokenizer_name
+from generation_store import GenerationStore, generation_key
+from markdown_converter import looks_well_structured, normalize_link, rewrite_links
+from rate_limit import RetryableError, backoff_delay, get_rate_limiter, parse_retry_after
+from metrics import LLM_REQUESTS, LLM_TOKENS, PAGES_GENERATED, STAGE_SECONDS, timed
+from outputs import OutputWriter
+
+if TYPE_CHECKING:
+    # Provider SDKs are imported when a processor first needs them
+    import aiohttp
+    from groq import AsyncGroq
 
 # Constants
-CHUNK_SIZE = 16000  # Safe chunk size for 64k context window
 MAX_OUTPUT_TOKENS = 7000  # Safe output size
+CHUNK_SIZE = 6000  # Content tokens per request, so the markdown reply fits in MAX_OUTPUT_TOKENS
+# Chunk and batch limits are checked with estimate_tokens (about four characters per
+# token), which undercounts code and non-English text; only this share of them is filled
+TOKEN_ESTIMATE_MARGIN = 0.8
 HTTP_TIMEOUT = 30.0  # Timeout in seconds
 MAX_RETRIES = 3
 RETRY_DELAY = 1  # Delay between retries in seconds
+DEEPSEEK_MODEL = "deepseek-chat"
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+GROQ_MODEL = "mixtral-8x7b-32768"
+DEFAULT_CONCURRENCY = 4  # Pages processed in parallel
+# "llm" sends every page to the model, "local" only uses the built-in converter,
+# "auto" converts locally and escalates pages whose structure looks poor
+PROCESSING_MODES = ("llm", "local", "auto")
+# Small pages are packed into one request of up to this many content tokens (0 disables batching);
+# kept below MAX_OUTPUT_TOKENS since the reply is about as long as the pages
+DEFAULT_BATCH_TOKENS = 4000
+BATCH_PAGE_OVERHEAD = 40  # Tokens of delimiters and page header per packed page
+BATCH_START = "<<<PAGE {number}>>>"
+BATCH_END = "<<<END PAGE {number}>>>"
+BATCH_SECTION = re.compile(r'<<<PAGE (\d+)>>>(.*?)<<<END PAGE \1>>>', re.DOTALL)
+# Dry-run estimates: list prices in USD per million tokens (input, cached input, output)
+# and typical response speed. Cached input is the shared prompt prefix served from
+# the provider's context cache; Groq has none, so it is billed as regular input.
+PROVIDER_PRICES = {
+    "deepseek": (0.27, 0.07, 1.10),
+    "groq": (0.24, 0.24, 0.24),
+}
+ESTIMATED_FIRST_TOKEN_SECONDS = 1.0
+ESTIMATED_OUTPUT_TOKENS_PER_SECOND = 50.0
 
 SYSTEM_PROMPT = """You are a documentation processor. Your task is to:
 1. Extract the main content from HTML documentation pages
@@ -28,76 +58,205 @@ SYSTEM_PROMPT = """You are a documentation processor. Your task is to:
 
 Focus only on the actual documentation content and ignore any UI elements."""
 
+PAGE_SYSTEM_PROMPT = """You are a technical documentation expert. Your task is to convert the provided documentation page into clean, well-formatted markdown. Please:
+1. Preserve all technical information accurately
+2. Ensure code examples and technical terms are properly formatted
+3. Use clear and consistent markdown formatting
+4. Maintain the original structure and hierarchy
+5. Remove any navigation elements or non-documentation content
+6. Reply with the markdown only, focusing on the documentation content"""
+
+# Appended after the site context, so packed and single-page requests share one prompt prefix
+BATCH_INSTRUCTIONS = f"""You will receive several pages, each between a {BATCH_START.format(number="N")} line and a {BATCH_END.format(number="N")} line.
+Convert every page separately and return each one between the same two lines with the same number,
+in the same order. Do not merge, skip or add pages and write nothing outside the delimiters."""
+
 class DocumentationProcessor:
-    def __init__(self, api_key: str, use_groq: bool = False):
+    def __init__(
+        self,
+        api_key: str,
+        use_groq: bool = False,
+        store: Optional[GenerationStore] = None,
+        incremental: bool = True,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        mode: str = "llm",
+        batch_tokens: int = DEFAULT_BATCH_TOKENS,
+        session: Optional["aiohttp.ClientSession"] = None,
+        groq_client: Optional["AsyncGroq"] = None,
+        base_url: Optional[str] = None,
+        content_loader: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        if mode not in PROCESSING_MODES:
+            raise ValueError(f"Unknown processing mode '{mode}', expected one of {', '.join(PROCESSING_MODES)}")
         self.api_key = api_key
+        self.mode = mode
         self.use_groq = use_groq
-        self.session = None
-        self.groq_client = None
+        self.model = GROQ_MODEL if use_groq else DEEPSEEK_MODEL
+        self.provider = "groq" if use_groq else "deepseek"
+        # Alternative API endpoint, e.g. a proxy or the offline benchmark's mock server
+        self.base_url = (base_url or DEEPSEEK_BASE_URL).rstrip("/")
+        # Shared, pooled clients may be passed in; the processor only closes what it created
+        self.session = session
+        self.groq_client = groq_client
+        self._owns_session = session is None
+        # Content-hash keyed store used to skip unchanged pages
+        self.store = store
+        self.incremental = incremental
+        # Loads the content of pages that carry a content_ref (e.g. CrawlStore.content)
+        self.content_loader = content_loader
+        self.reused_pages = 0
+        self.generated_pages = 0
+        self.local_pages = 0
+        self.batched_pages = 0
+        # Content token budget of one packed request of small pages
+        self.batch_tokens = max(0, batch_tokens)
+        # Static instructions plus site-level context; see _set_site
+        self.system_prompt = PAGE_SYSTEM_PROMPT
+        # In-document anchor for every selected page, keyed by normalized URL
+        self.anchors: Dict[str, str] = {}
+        # Concurrency and per-provider request/token budgets
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = get_rate_limiter(
+            self.provider,
+            api_key,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+        )
         
-        if use_groq:
-            self.groq_client = AsyncGroq(api_key=api_key)
+        if use_groq and groq_client is None:
+            from groq import AsyncGroq
+            
+            # Retries are handled by _process_content so they respect the shared budget
+            self.groq_client = AsyncGroq(api_key=api_key, max_retries=0, base_url=base_url)
         
     async def _init_session(self):
         if not self.session:
+            import aiohttp
+            
             self.session = aiohttp.ClientSession()
             
     async def close(self):
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
             
-    async def _process_with_deepseek(self, content: str, system_prompt: str) -> str:
+    async def _process_with_deepseek(self, content: str, system_prompt: str) -> Tuple[str, Optional[int]]:
+        import aiohttp
+        
         await self._init_session()
         
         try:
             async with self.session.post(
-                "https://api.deepseek.com/v1/chat/completions",
+                f"{self.base_url}/v1/chat/completions",
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
                     "Content-Type": "application/json"
                 },
                 json={
-                    "model": "deepseek-chat",
+                    "model": self.model,
                     "messages": [
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": content}
-                    ]
+                    ],
+                    "max_tokens": MAX_OUTPUT_TOKENS,
                 }
             ) as response:
+                if response.status == 429 or response.status >= 500:
+                    error_text = await response.text()
+                    raise RetryableError(
+                        f"DeepSeek API returned {response.status}: {error_text}",
+                        retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                    )
                 if response.status != 200:
                     error_text = await response.text()
-                    print(colored(f"DeepSeek API error: {error_text}", "red"))
+                    log(f"DeepSeek API error: {error_text}", "red", "error")
                     raise Exception(f"Failed to process with DeepSeek API: {error_text}")
                     
                 result = await response.json()
-                return result["choices"][0]["message"]["content"]
+                usage = result.get("usage") or {}
+                self._record_tokens(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+                usage = usage.get("total_tokens")
+                return result["choices"][0]["message"]["content"], usage
                 
+        except RetryableError:
+            raise
+        except aiohttp.ClientConnectionError as e:
+            raise RetryableError(f"DeepSeek connection error: {str(e)}")
         except Exception as e:
-            print(colored(f"Error processing with DeepSeek: {str(e)}", "red"))
+            log(f"Error processing with DeepSeek: {str(e)}", "red", "error")
             raise
             
-    async def _process_with_groq(self, content: str, system_prompt: str) -> str:
+    async def _process_with_groq(self, content: str, system_prompt: str) -> Tuple[str, Optional[int]]:
+        import groq
+        
         try:
             chat_completion = await self.groq_client.chat.completions.create(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": content}
                 ],
-                model="mixtral-8x7b-32768",
+                model=self.model,
                 temperature=0.5,
-                max_tokens=32768
+                max_tokens=MAX_OUTPUT_TOKENS
             )
-            return chat_completion.choices[0].message.content
+            usage = chat_completion.usage
+            if usage:
+                self._record_tokens(usage.prompt_tokens, usage.completion_tokens)
+            usage = usage.total_tokens if usage else None
+            return chat_completion.choices[0].message.content, usage
             
+        except (groq.RateLimitError, groq.InternalServerError) as e:
+            raise RetryableError(
+                f"Groq API returned {e.status_code}: {str(e)}",
+                retry_after=parse_retry_after(e.response.headers.get("retry-after")),
+            )
+        except (groq.APIConnectionError, groq.APITimeoutError) as e:
+            raise RetryableError(f"Groq connection error: {str(e)}")
         except Exception as e:
-            print(colored(f"Error processing with Groq: {str(e)}", "red"))
+            log(f"Error processing with Groq: {str(e)}", "red", "error")
             raise
             
+    def _record_tokens(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        if prompt_tokens:
+            LLM_TOKENS.inc(prompt_tokens, provider=self.provider, direction="in")
+        if completion_tokens:
+            LLM_TOKENS.inc(completion_tokens, provider=self.provider, direction="out")
+    
+    async def _call_provider(self, content: str, system_prompt: str) -> Tuple[str, Optional[int]]:
+        """Return the completion text and the total tokens the provider reported."""
+        with timed("llm_request", provider=self.provider):
+            if self.use_groq:
+                return await self._process_with_groq(content, system_prompt)
+            else:
+                return await self._process_with_deepseek(content, system_prompt)
+    
     async def _process_content(self, content: str, system_prompt: str) -> str:
-        if self.use_groq:
-            return await self._process_with_groq(content, system_prompt)
-        else:
-            return await self._process_with_deepseek(content, system_prompt)
+        """Call the provider within its rate budget, retrying transient failures."""
+        # Budget for the prompt plus a completion of similar size
+        estimated = 2 * (estimate_tokens(system_prompt) + estimate_tokens(content))
+        
+        for attempt in range(MAX_RETRIES + 1):
+            with timed("llm_queue_wait"):
+                await self.rate_limiter.acquire(estimated)
+            try:
+                result, usage = await self._call_provider(content, system_prompt)
+                self.rate_limiter.record_usage(estimated, usage)
+                LLM_REQUESTS.inc(provider=self.provider, outcome="ok")
+                return result
+            except RetryableError as e:
+                LLM_REQUESTS.inc(provider=self.provider, outcome="retryable_error")
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt, RETRY_DELAY, e.retry_after)
+                if e.retry_after is not None:
+                    # The provider told us when to come back: hold every request until then
+                    self.rate_limiter.pause(delay)
+                log(f"{str(e)} - retrying in {delay:.1f}s ({attempt + 1}/{MAX_RETRIES})", "yellow", "warning")
+                await asyncio.sleep(delay)
+            except Exception:
+                LLM_REQUESTS.inc(provider=self.provider, outcome="error")
+                raise
             
     def _generate_toc(self, pages: Dict) -> str:
         toc = []
@@ -111,7 +270,8 @@ class DocumentationProcessor:
             url = page.get("url", "").strip()
             
             if title and url:
-                toc.append(f"{indent}- {title}")
+                anchor = self.anchors.get(normalize_link(url))
+                toc.append(f"{indent}- [{title}](#{anchor})" if anchor else f"{indent}- {title}")
                 
             for child in page.get("children", []):
                 process_page(child, level + 1)
@@ -127,94 +287,479 @@ class DocumentationProcessor:
                 title = page.get("title", "").strip()
                 url = page.get("url", "").strip()
                 if title and url:
-                    selected.append({
-                        "title": title,
-                        "url": url
-                    })
+                    entry = {"title": title, "url": url}
+                    if page.get("content_ref") and not page.get("content"):
+                        # Loaded only when the page is processed; see _page_content
+                        entry["content_ref"] = page["content_ref"]
+                    else:
+                        entry["content"] = page.get("content") or ""
+                    selected.append(entry)
             
             for child in page.get("children", []):
                 collect_pages(child)
                 
         collect_pages(pages)
         return selected
+    
+    def _assign_anchors(self, pages: List[Dict]) -> None:
+        """Give every page a unique anchor so links between pages resolve inside the document."""
+        self.anchors = {}
+        used = set()
+        for page in pages:
+            key = normalize_link(page["url"])
+            if key in self.anchors:
+                continue
+            slug = re.sub(r'[^a-z0-9]+', '-', page["title"].lower()).strip('-') or "page"
+            anchor, suffix = slug, 2
+            while anchor in used:
+                anchor = f"{slug}-{suffix}"
+                suffix += 1
+            used.add(anchor)
+            self.anchors[key] = anchor
         
-    async def _process_single_page(self, page: Dict) -> str:
-        """Process a single page and return its markdown content."""
-        try:
-            print(colored(f"Processing page: {page['title']}", "blue"))
-            
-            system_prompt = """You are a technical documentation expert. Your task is to convert the provided documentation page into clean, well-formatted markdown. Please:
-1. Preserve all technical information accurately
-2. Ensure code examples and technical terms are properly formatted
-3. Use clear and consistent markdown formatting
-4. Maintain the original structure and hierarchy
-5. Remove any navigation elements or non-documentation content"""
+    async def _generate(self, content: str, system_prompt: str, url: str) -> str:
+        """Return markdown for one prompt, reusing stored output when the prompt is unchanged."""
+        key = generation_key(self.model, system_prompt, content) if self.store else None
+        markdown_content = self.store.get(key) if key and self.incremental else None
+        
+        if markdown_content is not None:
+            log(f"Reusing unchanged content for {url}", "cyan", "debug")
+            self.reused_pages += 1
+            PAGES_GENERATED.inc(source="reused")
+            return markdown_content
+        
+        markdown_content = await self._process_content(content, system_prompt)
+        self.generated_pages += 1
+        PAGES_GENERATED.inc(source="llm")
+        if key:
+            self.store.put(key, markdown_content, self.model, url=url)
+        return markdown_content
+    
+    def _uses_llm(self, page_content: str) -> bool:
+        """Whether a page goes to the model rather than the local converter."""
+        return not (self.mode == "local" or (self.mode == "auto" and looks_well_structured(page_content)))
+    
+    def _set_site(self, pages: Dict) -> None:
+        """Add site-level context to the system prompt of this run.
+        
+        The system prompt is identical for every request of a run and comes before
+        anything page-specific, so it forms a shared prefix that providers with
+        context caching (e.g. DeepSeek) bill at the cached rate after the first request.
+        """
+        self.system_prompt = f"""{PAGE_SYSTEM_PROMPT}
 
-            content = f"""Please convert this documentation page into markdown format:
+Documentation site: {pages.get('title', '').strip()}
+Base URL: {pages.get('url', '').strip()}"""
+    
+    def _batch_system_prompt(self) -> str:
+        return f"{self.system_prompt}\n\n{BATCH_INSTRUCTIONS}"
+    
+    def _page_prompt(self, page: Dict, chunk: str, part: str = "") -> str:
+        return f"""Convert this documentation page{part} into markdown:
 
 Title: {page['title']}
 URL: {page['url']}
 
-Please focus only on the content and ensure it's well-formatted markdown."""
+Content:
+{chunk}"""
+    
+    def _page_content(self, page: Dict) -> str:
+        """A page's content, loaded on demand when the page only carries a content_ref."""
+        if "content_ref" not in page:
+            return page.get("content", "")
+        content = self.content_loader(page["content_ref"]) if self.content_loader else None
+        if content is None:
+            raise Exception(f"Content of {page['url']} is no longer available")
+        return content
+    
+    def _chunk_prompts(self, page: Dict, page_content: str) -> List[Tuple[str, str]]:
+        """The (prompt, chunk) of each request for a page; oversized pages are split at heading boundaries."""
+        chunks = chunk_text(page_content, int(CHUNK_SIZE * TOKEN_ESTIMATE_MARGIN))
+        return [
+            (self._page_prompt(page, chunk, f" (part {index + 1} of {len(chunks)})" if len(chunks) > 1 else ""), chunk)
+            for index, chunk in enumerate(chunks)
+        ]
+    
+    def _stored(self, prompt: str) -> bool:
+        return bool(self.store and self.incremental and self.store.get(
+            generation_key(self.model, self.system_prompt, prompt)
+        ) is not None)
+    
+    def _batch_prompt(self, pages: List[Dict], contents: List[str]) -> str:
+        sections = []
+        for number, (page, page_content) in enumerate(zip(pages, contents), 1):
+            sections.append(f"""{BATCH_START.format(number=number)}
+Title: {page['title']}
+URL: {page['url']}
 
-            markdown_content = await self._process_content(content, system_prompt)
+Content:
+{page_content}
+{BATCH_END.format(number=number)}""")
+        return f"Convert these {len(pages)} documentation pages into markdown:\n\n" + "\n\n".join(sections)
+    
+    async def _process_single_page(self, page: Dict, page_content: Optional[str] = None) -> str:
+        """Process a single page and return its markdown content (before formatting)."""
+        try:
+            log(f"Processing page: {page['title']}", "blue", "debug")
+            if page_content is None:
+                page_content = await asyncio.to_thread(self._page_content, page)
+            
+            if not self._uses_llm(page_content):
+                # Already clean markdown from the local converter: no LLM round-trip needed
+                self.local_pages += 1
+                PAGES_GENERATED.inc(source="local")
+                return page_content
+            
+            # Oversized pages are processed part by part and reassembled in order
+            markdown_parts = []
+            for content, _ in self._chunk_prompts(page, page_content):
+                markdown_parts.append((await self._generate(content, self.system_prompt, page['url'])).strip())
+            
+            return "\n\n".join(markdown_parts)
             
-            # Format the page with our delimiter template
-            formatted_content = f"""Page: {page['title']}
+        except Exception as e:
+            log(f"Error processing page {page['title']}: {str(e)}", "red", "error")
+            raise
+    
+    def _plan_batches(self, pages: List[Dict], skip: Dict[int, Dict]) -> Tuple[List[List[int]], Dict[int, str]]:
+        """Group small pages that need the model into packed requests of at most batch_tokens.
+        
+        Pages are packed first-fit in decreasing size order. Large pages, pages converted
+        locally, pages in `skip`, pages with stored output and pages whose content cannot
+        be loaded are processed on their own. Returns the batches and the loaded content
+        of every batched page.
+        """
+        if not self.batch_tokens:
+            return [], {}
+        
+        budget = int(self.batch_tokens * TOKEN_ESTIMATE_MARGIN)
+        sizes: Dict[int, int] = {}
+        contents: Dict[int, str] = {}
+        for index, page in enumerate(pages):
+            if index in skip:
+                continue
+            try:
+                page_content = self._page_content(page)
+            except Exception:
+                # Left to the single-page path, which reports the error for this page
+                continue
+            tokens = estimate_tokens(page_content) + BATCH_PAGE_OVERHEAD
+            if tokens > budget // 2 or not self._uses_llm(page_content):
+                continue
+            if self._stored(self._page_prompt(page, page_content)):
+                continue
+            sizes[index] = tokens
+            contents[index] = page_content
+        
+        bins: List[List[int]] = []
+        loads: List[int] = []
+        for index in sorted(sizes, key=lambda index: -sizes[index]):
+            for position, load in enumerate(loads):
+                if load + sizes[index] <= budget:
+                    bins[position].append(index)
+                    loads[position] += sizes[index]
+                    break
+            else:
+                bins.append([index])
+                loads.append(sizes[index])
+        batches = [sorted(indices) for indices in bins if len(indices) > 1]
+        batched = {index for batch in batches for index in batch}
+        return batches, {index: page_content for index, page_content in contents.items() if index in batched}
+    
+    async def _process_batch(self, pages: List[Dict], contents: List[str]) -> List[Optional[str]]:
+        """Convert several small pages with one request and split the reply per page.
+        
+        Returns each page's markdown in order, or None for a page whose section of the
+        reply is missing, repeated or empty, so it can be retried on its own.
+        """
+        reply = await self._process_content(self._batch_prompt(pages, contents), self._batch_system_prompt())
+        self.generated_pages += 1
+        
+        found: Dict[int, List[str]] = {}
+        for match in BATCH_SECTION.finditer(reply):
+            found.setdefault(int(match.group(1)), []).append(match.group(2).strip())
+        results = [
+            found[number][0] if len(found.get(number, [])) == 1 and found[number][0] else None
+            for number in range(1, len(pages) + 1)
+        ]
+        
+        for page, page_content, markdown_content in zip(pages, contents, results):
+            if markdown_content is None:
+                continue
+            self.batched_pages += 1
+            PAGES_GENERATED.inc(source="batch")
+            if self.store:
+                # Stored under the single-page prompt, so later runs reuse it either way
+                key = generation_key(self.model, self.system_prompt, self._page_prompt(page, page_content))
+                self.store.put(key, markdown_content, self.model, url=page["url"])
+        return results
+    
+    def _format_page(self, page: Dict, markdown_content: str) -> str:
+        """Format a page with our delimiter template, pointing internal links at anchors."""
+        markdown_content = rewrite_links(markdown_content.strip(), self.anchors)
+        anchor = self.anchors.get(normalize_link(page['url']))
+        anchor_line = f'<a id="{anchor}"></a>\n' if anchor else ""
+        
+        return f"""{anchor_line}Page: {page['title']}
 URL: {page['url']}
 ^^ Begin Content ^^
 
-{markdown_content.strip()}
+{markdown_content}
 
 ---"""
             
-            return formatted_content
+    def _document_header(self, toc: str) -> str:
+        return f"""# Documentation
+
+{toc}
+
+---
+
+"""
+    
+    async def stream_pages(self, pages: Dict, completed: Optional[Dict[int, Dict]] = None) -> AsyncIterator[Dict]:
+        """Process selected pages concurrently, yielding each result as soon as it is ready.
+        
+        Yields a "start" event with the document header, then one "page" or "error" event
+        per page (in completion order, tagged with the page's index in document order).
+        Page events carry the formatted "content" and the page's bare "markdown".
+        Pages whose index is in `completed` (records from a checkpoint) are not processed again.
+        """
+        completed = completed or {}
+        log("Collecting selected pages...", "blue", "info")
+        selected_pages = self._get_selected_pages(pages)
+        
+        if not selected_pages:
+            raise Exception("No pages selected for processing")
             
-        except Exception as e:
-            print(colored(f"Error processing page {page['title']}: {str(e)}", "red"))
-            raise
+        log(f"Found {len(selected_pages)} selected pages", "blue", "info")
+        self._assign_anchors(selected_pages)
+        self._set_site(pages)
+        
+        log("Generating table of contents...", "blue", "info")
+        toc = self._generate_toc(pages)
+        yield {"type": "start", "total": len(selected_pages), "header": self._document_header(toc)}
+        
+        log(f"Processing pages with up to {self.max_concurrency} concurrent requests...", "blue", "info")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Loading content and looking up stored output touch the disk
+        batches, contents = await asyncio.to_thread(self._plan_batches, selected_pages, completed)
+        if batches:
+            log(f"Packing {sum(len(batch) for batch in batches)} small pages into {len(batches)} requests", "blue", "info")
+        
+        def _page_event(index: int, page: Dict, markdown_content: str) -> Dict:
+            return {"type": "page", "index": index, "title": page["title"], "url": page["url"],
+                    "content": self._format_page(page, markdown_content), "markdown": markdown_content}
+        
+        async def _process(index: int, page: Dict, page_content: Optional[str] = None) -> Dict:
+            if index in completed:
+                record = completed[index]
+                return {"type": "page", "index": index, "title": page["title"], "url": page["url"],
+                        "content": record["content"], "markdown": record.get("markdown", record["content"]), "resumed": True}
+            queued = time.perf_counter()
+            async with semaphore:
+                STAGE_SECONDS.observe(time.perf_counter() - queued, stage="page_queue_wait")
+                try:
+                    with timed("process_page", url=page["url"]):
+                        markdown_content = (await self._process_single_page(page, page_content)).strip()
+                    return _page_event(index, page, markdown_content)
+                except Exception as e:
+                    log(f"Failed to process page {page['title']}: {str(e)}", "red", "error")
+                    # Continue with other pages even if one fails
+                    return {"type": "error", "index": index, "title": page["title"], "url": page["url"], "message": str(e)}
+        
+        async def _process_group(indices: List[int]) -> List[Dict]:
+            if len(indices) == 1:
+                return [await _process(indices[0], selected_pages[indices[0]])]
+            group = [selected_pages[index] for index in indices]
+            failed = False
+            queued = time.perf_counter()
+            async with semaphore:
+                STAGE_SECONDS.observe(time.perf_counter() - queued, stage="page_queue_wait")
+                try:
+                    with timed("process_batch", pages=len(indices)):
+                        results = await self._process_batch(group, [contents[index] for index in indices])
+                except Exception as e:
+                    log(f"Packed request for {len(indices)} pages failed, processing them one by one: {str(e)}", "yellow", "warning")
+                    results = [None] * len(indices)
+                    failed = True
             
+            events = [_page_event(index, page, markdown_content)
+                      for index, page, markdown_content in zip(indices, group, results) if markdown_content is not None]
+            retry = [index for index, markdown_content in zip(indices, results) if markdown_content is None]
+            if retry and not failed:
+                log(f"Could not split {len(retry)} of {len(indices)} packed pages from the reply, retrying them one by one", "yellow", "warning")
+            events.extend(await asyncio.gather(*(_process(index, selected_pages[index], contents[index]) for index in retry)))
+            return events
+        
+        batched = {index for batch in batches for index in batch}
+        groups = batches + [[index] for index in range(len(selected_pages)) if index not in batched]
+        # Start work in document order
+        groups.sort(key=lambda indices: indices[0])
+        tasks = [asyncio.create_task(_process_group(indices)) for indices in groups]
+        finished = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                for event in await next_result:
+                    finished += 1
+                    event["completed"] = finished
+                    event["total"] = len(selected_pages)
+                    yield event
+        finally:
+            # Stop outstanding work if the consumer goes away (e.g. client disconnect)
+            for task in tasks:
+                task.cancel()
+        
+        if self.mode != "llm":
+            log(f"Converted {self.local_pages} pages locally", "blue", "info")
+        if self.batched_pages:
+            log(f"Generated {self.batched_pages} small pages in packed requests", "blue", "info")
+        if self.store:
+            log(f"Sent {self.generated_pages} requests to the LLM, reused {self.reused_pages} unchanged results", "blue", "info")
+    
+    def plan(self, pages: Dict) -> Dict:
+        """Estimate the tokens, requests, wall time and cost of generating the selected pages.
+        
+        Nothing is sent to the provider: prompts are built and tokenized locally exactly
+        as a real run would build them, including chunking, packing and stored results.
+        """
+        selected_pages = self._get_selected_pages(pages)
+        if not selected_pages:
+            raise Exception("No pages selected for processing")
+        self._set_site(pages)
+        
+        system_tokens = count_tokens(self.system_prompt)
+        requests: List[Tuple[int, int]] = []  # Input and output tokens of every request
+        estimates = []
+        counts = {"llm": 0, "batch": 0, "local": 0, "reused": 0, "unavailable": 0}
+        
+        batches, contents = self._plan_batches(selected_pages, {})
+        batch_numbers = {index: number for number, batch in enumerate(batches) for index in batch}
+        for batch in batches:
+            group = [selected_pages[index] for index in batch]
+            group_contents = [contents[index] for index in batch]
+            output_tokens = sum(count_tokens(page_content) for page_content in group_contents)
+            requests.append((
+                count_tokens(self._batch_system_prompt()) + count_tokens(self._batch_prompt(group, group_contents)),
+                min(output_tokens, MAX_OUTPUT_TOKENS),
+            ))
+        
+        for index, page in enumerate(selected_pages):
+            estimate = {"index": index, "url": page["url"], "title": page["title"],
+                        "content_tokens": 0, "requests": 0, "input_tokens": 0, "output_tokens": 0}
+            try:
+                page_content = contents[index] if index in contents else self._page_content(page)
+            except Exception as e:
+                # A real run would report this page as an error
+                estimate.update(source="unavailable", error=str(e))
+                counts["unavailable"] += 1
+                estimates.append(estimate)
+                continue
+            estimate["content_tokens"] = count_tokens(page_content)
+            if not self._uses_llm(page_content):
+                estimate["source"] = "local"
+            elif index in batch_numbers:
+                estimate.update(source="batch", batch=batch_numbers[index],
+                                input_tokens=estimate["content_tokens"] + BATCH_PAGE_OVERHEAD,
+                                output_tokens=estimate["content_tokens"])
+            else:
+                estimate["source"] = "reused"
+                for prompt, chunk in self._chunk_prompts(page, page_content):
+                    if self._stored(prompt):
+                        continue
+                    estimate["source"] = "llm"
+                    input_tokens = system_tokens + count_tokens(prompt)
+                    output_tokens = min(count_tokens(chunk), MAX_OUTPUT_TOKENS)
+                    requests.append((input_tokens, output_tokens))
+                    estimate["requests"] += 1
+                    estimate["input_tokens"] += input_tokens
+                    estimate["output_tokens"] += output_tokens
+            counts[estimate["source"]] += 1
+            estimates.append(estimate)
+        
+        input_tokens = sum(tokens for tokens, _ in requests)
+        output_tokens = sum(tokens for _, tokens in requests)
+        # Every request after the first starts with the same system prompt
+        cached_tokens = system_tokens * max(0, len(requests) - 1)
+        input_price, cached_price, output_price = PROVIDER_PRICES[self.provider]
+        cost = ((input_tokens - cached_tokens) * input_price + cached_tokens * cached_price + output_tokens * output_price) / 1_000_000
+        
+        # Wall time is bound by the rate budgets (which start full, so a first minute's
+        # worth goes out at once) and by how many requests run concurrently
+        requests_per_minute = self.rate_limiter.requests.rate * 60
+        tokens_per_minute = self.rate_limiter.tokens.rate * 60
+        rate_seconds = 60 * max(
+            max(0.0, len(requests) - requests_per_minute) / requests_per_minute,
+            max(0.0, input_tokens + output_tokens - tokens_per_minute) / tokens_per_minute,
+        )
+        latencies = [ESTIMATED_FIRST_TOKEN_SECONDS + tokens / ESTIMATED_OUTPUT_TOKENS_PER_SECOND for _, tokens in requests]
+        concurrency_seconds = max(sum(latencies) / self.max_concurrency, max(latencies, default=0.0))
+        
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "tokenizer": tokenizer_name(),
+            "pages": len(selected_pages),
+            "llm_pages": counts["llm"],
+            "batched_pages": counts["batch"],
+            "local_pages": counts["local"],
+            "reused_pages": counts["reused"],
+            "unavailable_pages": counts["unavailable"],
+            "requests": len(requests),
+            "input_tokens": input_tokens,
+            "cached_input_tokens": cached_tokens,
+            "output_tokens": output_tokens,
+            "estimated_cost_usd": round(cost, 4),
+            "estimated_seconds": round(max(rate_seconds, concurrency_seconds), 1),
+            "rate_limits": {"requests_per_minute": requests_per_minute, "tokens_per_minute": tokens_per_minute},
+            "max_concurrency": self.max_concurrency,
+            "page_estimates": estimates,
+        }
+    
+    async def write_output(self, pages: Dict, writer: OutputWriter, completed: Optional[Dict[int, Dict]] = None,
+                           on_event: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Stream processed pages into an output writer as they finish and return the written files."""
+        written = 0
+        async for event in self.stream_pages(pages, completed=completed):
+            if event["type"] == "start":
+                writer.start(event["header"], event["total"])
+            elif event["type"] == "page":
+                writer.write_page(event["index"], event)
+                written += 1
+            if on_event:
+                on_event(event)
+        
+        if not written:
+            raise Exception("No pages were successfully processed")
+        
+        result = writer.finish()
+        log(f"Wrote {written} pages to {', '.join(result['files'][:3])}{'...' if len(result['files']) > 3 else ''}", "green", "info")
+        return {**result, "pages": written}
+    
     async def process_pages(self, pages: Dict) -> str:
         try:
-            print(colored("Collecting selected pages...", "blue"))
-            selected_pages = self._get_selected_pages(pages)
-            
-            if not selected_pages:
-                raise Exception("No pages selected for processing")
-                
-            print(colored(f"Found {len(selected_pages)} selected pages", "blue"))
-            
-            print(colored("Generating table of contents...", "blue"))
-            toc = self._generate_toc(pages)
+            header = ""
+            results: List[Optional[str]] = []
             
-            print(colored("Processing pages individually...", "blue"))
-            processed_pages = []
+            async for event in self.stream_pages(pages):
+                if event["type"] == "start":
+                    header = event["header"]
+                    results = [None] * event["total"]
+                elif event["type"] == "page":
+                    results[event["index"]] = event["content"]
             
-            # Process each page individually
-            for page in selected_pages:
-                try:
-                    content = await self._process_single_page(page)
-                    processed_pages.append(content)
-                except Exception as e:
-                    print(colored(f"Failed to process page {page['title']}: {str(e)}", "red"))
-                    # Continue with other pages even if one fails
-                    continue
+            # Results are stored by index, so the document keeps tree order
+            processed_pages = [content for content in results if content]
             
             if not processed_pages:
                 raise Exception("No pages were successfully processed")
             
             # Combine everything into the final markdown document
-            final_markdown = f"""# Documentation
-
-{toc}
-
----
-
-{chr(10).join(processed_pages)}"""
+            final_markdown = header + "\n".join(processed_pages)
             
-            print(colored("Successfully generated complete markdown document!", "green"))
+            log("Successfully generated complete markdown document!", "green", "info")
             return final_markdown
             
         except Exception as e:
-            print(colored(f"Error processing pages: {str(e)}", "red"))
-            raise Exception(f"Failed to generate markdown: {str(e)}") 
\ No newline at end of file
+            log(f"Error processing pages: {str(e)}", "red", "error")
+            raise Exception(f"Failed to generate markdown: {str(e)}")
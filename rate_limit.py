@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import random
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+# Default per-provider budgets; override per processor when an account has higher limits
+PROVIDER_LIMITS = {
+    "deepseek": {"requests_per_minute": 300, "tokens_per_minute": 1_000_000},
+    "groq": {"requests_per_minute": 30, "tokens_per_minute": 5_000},
+}
+MAX_BACKOFF = 60.0  # Upper bound for a single backoff sleep in seconds
+OVERLOAD_STATUSES = (429, 503)  # Server signals to slow down
+LATENCY_SPIKE_FACTOR = 3.0  # Response this many times slower than average counts as overload
+MIN_LATENCY_SPIKE = 1.0  # ...but only once it takes at least this many seconds
+
+
+class RetryableError(Exception):
+    """A transient failure (429, 5xx, connection error) that may succeed on retry."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base_delay: float, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with jitter, never shorter than a server-provided Retry-After."""
+    if retry_after is not None:
+        return min(MAX_BACKOFF, retry_after + random.uniform(0, base_delay))
+    return min(MAX_BACKOFF, random.uniform(0.5, 1.5) * base_delay * (2 ** attempt))
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `rate` tokens per second.
+
+    Buckets in the limiter registry outlive event loops (e.g. successive asyncio.run
+    calls of the CLI, or test clients), so each loop gets its own lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until `amount` tokens are available and take them."""
+        amount = min(amount, self.capacity)
+        async with self._lock():
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta: float) -> None:
+        """Charge (positive) or refund (negative) tokens after the real cost is known."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    def pause(self, seconds: float) -> None:
+        """Block all acquirers for `seconds`, e.g. after a Retry-After response."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class ProviderRateLimiter:
+    """Request-per-minute and token-per-minute budgets for one provider account."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+
+    async def acquire(self, tokens: int) -> None:
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+
+    def record_usage(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the token budget once the provider reports real usage."""
+        if actual is not None:
+            self.tokens.adjust(actual - estimated)
+
+    def pause(self, seconds: float) -> None:
+        self.requests.pause(seconds)
+        self.tokens.pause(seconds)
+
+
+class HostThrottle:
+    """Polite request pacing for one crawled host.
+
+    Requests are spaced by a token bucket (lowered to honour robots.txt Crawl-delay)
+    and the number in flight follows AIMD: it grows by one per window of fast
+    responses and halves on 429/503 responses, connection failures or latency spikes.
+    """
+
+    def __init__(self, requests_per_second: Optional[float], max_concurrency: int, min_concurrency: int = 1):
+        self.bucket = TokenBucket(requests_per_second, max(1.0, requests_per_second)) if requests_per_second else None
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.min_concurrency = min_concurrency
+        # Start halfway and let fast responses ramp concurrency up
+        self.limit = max(float(min_concurrency), self.max_concurrency / 2)
+        self.latency: Optional[float] = None  # Moving average of response times
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    def set_rate(self, requests_per_second: float) -> None:
+        """Lower the request rate, e.g. to honour a robots.txt Crawl-delay."""
+        if self.bucket is None or requests_per_second < self.bucket.rate:
+            self.bucket = TokenBucket(requests_per_second, 1.0)
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        if self.bucket:
+            try:
+                await self.bucket.acquire()
+            except BaseException:
+                # Cancelled while waiting for the rate: the request never ran
+                await self.discard()
+                raise
+
+    async def release(self, latency: Optional[float], status: Optional[int]) -> None:
+        """Return a slot and adapt concurrency to how the server handled the request."""
+        spike = (
+            latency is not None and self.latency is not None
+            and latency > max(LATENCY_SPIKE_FACTOR * self.latency, MIN_LATENCY_SPIKE)
+        )
+        if status is None or status in OVERLOAD_STATUSES or spike:
+            self.limit = max(float(self.min_concurrency), self.limit / 2)
+        else:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        if latency is not None:
+            # Keep tracking slow responses so a lasting slowdown becomes the new baseline
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        await self.discard()
+
+    async def discard(self) -> None:
+        """Return a slot without adapting concurrency, e.g. for a redirect loop or a cancelled request."""
+        # Count the slot free before waiting for the lock, so a cancellation here cannot leak it
+        self.in_flight -= 1
+        async with self._condition:
+            self._condition.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request to this host, e.g. after a Retry-After response."""
+        if self.bucket is None:
+            self.bucket = TokenBucket(float(self.max_concurrency), float(self.max_concurrency))
+        self.bucket.pause(seconds)
+
+
+_limiters: Dict[Tuple[str, str, int, int], ProviderRateLimiter] = {}
+
+
+def get_rate_limiter(
+    provider: str,
+    api_key: str,
+    requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None,
+) -> ProviderRateLimiter:
+    """Return the limiter shared by every processor using the same provider account."""
+    defaults = PROVIDER_LIMITS[provider]
+    rpm = requests_per_minute or defaults["requests_per_minute"]
+    tpm = tokens_per_minute or defaults["tokens_per_minute"]
+    account = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    key = (provider, account, rpm, tpm)
+    if key not in _limiters:
+        _limiters[key] = ProviderRateLimiter(rpm, tpm)
+    return _limiters[key]
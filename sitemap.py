@@ -0,0 +1,127 @@
+import re
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from xml.etree import ElementTree
+
+import httpx
+from console import log
+
+# Constants
+MAX_SITEMAPS = 50  # Upper bound on sitemap files fetched per crawl, including nested indexes
+GZIP_MAGIC = b'\x1f\x8b'
+LLMS_LINK_PATTERN = re.compile(r'\[[^\]]*\]\(([^)\s]+)\)')
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """Convert a sitemap <lastmod> (W3C datetime) to a UNIX timestamp."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+async def iter_sitemap(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+) -> AsyncIterator[Tuple[str, str, Optional[str]]]:
+    """Stream a sitemap or sitemap index, yielding (kind, loc, lastmod) per entry.
+
+    kind is "url" for pages and "sitemap" for nested sitemaps. The body is parsed
+    incrementally as it downloads, and gzipped files are decompressed on the fly,
+    so large sitemaps are never held in memory whole.
+    """
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code != 200:
+            return
+        parser = ElementTree.XMLPullParser(events=("end",))
+        decompressor = None
+        first_chunk = True
+        async for chunk in response.aiter_bytes():
+            if first_chunk:
+                first_chunk = False
+                if chunk.startswith(GZIP_MAGIC):
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+            for _, element in parser.read_events():
+                kind = _local_name(element.tag)
+                if kind not in ("url", "sitemap"):
+                    continue
+                loc = lastmod = None
+                for child in element:
+                    name = _local_name(child.tag)
+                    if name == "loc" and child.text:
+                        loc = child.text.strip()
+                    elif name == "lastmod" and child.text:
+                        lastmod = child.text.strip()
+                element.clear()
+                if loc:
+                    yield kind, loc, lastmod
+
+
+async def _read_sitemaps(
+    client: httpx.AsyncClient,
+    sitemap_urls: List[str],
+    headers: Optional[Dict[str, str]] = None,
+) -> Dict[str, Optional[str]]:
+    """Walk sitemaps and nested sitemap indexes, returning page URL -> lastmod."""
+    pages: Dict[str, Optional[str]] = {}
+    queue = list(sitemap_urls)
+    seen = set()
+    while queue and len(seen) < MAX_SITEMAPS:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+        try:
+            async for kind, loc, lastmod in iter_sitemap(client, sitemap_url, headers):
+                if kind == "sitemap":
+                    queue.append(loc)
+                else:
+                    pages[loc] = lastmod
+        except (httpx.HTTPError, ElementTree.ParseError, zlib.error) as e:
+            log(f"Warning: Could not read sitemap {sitemap_url}: {str(e)}", "yellow", "warning")
+    return pages
+
+
+async def _read_llms_txt(client: httpx.AsyncClient, url: str, headers: Optional[Dict[str, str]] = None) -> List[str]:
+    """Return the links listed in an llms.txt file."""
+    try:
+        response = await client.get(url, headers=headers)
+    except httpx.HTTPError:
+        return []
+    if response.status_code != 200 or 'html' in response.headers.get('Content-Type', ''):
+        return []
+    return [urljoin(url, match) for match in LLMS_LINK_PATTERN.findall(response.text)]
+
+
+async def discover_urls(
+    client: httpx.AsyncClient,
+    base_url: str,
+    robots_sitemaps: Optional[List[str]] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Tuple[Dict[str, Optional[str]], List[str]]:
+    """List a site's pages from its sitemaps and llms.txt.
+
+    Sitemaps declared in robots.txt are used when present, otherwise the conventional
+    /sitemap.xml and /sitemap_index.xml locations are tried. Returns the sitemap pages
+    as URL -> lastmod (None when the sitemap does not say) and the llms.txt links,
+    which are a hand-picked selection rather than a full listing.
+    """
+    parsed = urlparse(base_url)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    sitemap_urls = robots_sitemaps or [f"{origin}/sitemap.xml", f"{origin}/sitemap_index.xml"]
+
+    pages = await _read_sitemaps(client, sitemap_urls, headers)
+    return pages, await _read_llms_txt(client, f"{origin}/llms.txt", headers)
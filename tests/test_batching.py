@@ -0,0 +1,116 @@
+import asyncio
+
+from processor import BATCH_END, BATCH_START, DocumentationProcessor
+
+SMALL = "A short paragraph about configuring the client."
+
+
+class ScriptedProcessor(DocumentationProcessor):
+    """Processor whose provider replies are produced by a function instead of an API."""
+
+    def __init__(self, reply, **kwargs):
+        super().__init__("test-key", mode="llm", **kwargs)
+        self.reply = reply
+        self.prompts = []
+
+    async def _process_content(self, content, system_prompt):
+        self.prompts.append(content)
+        return self.reply(content)
+
+
+def section(number, text):
+    return f"{BATCH_START.format(number=number)}\n{text}\n{BATCH_END.format(number=number)}"
+
+
+def page(number, **fields):
+    return {"url": f"https://docs.example.com/docs/{number}", "title": f"Page {number}", **fields}
+
+
+def test_plan_batches_packs_small_pages_and_returns_their_content():
+    processor = ScriptedProcessor(None, batch_tokens=1000)
+    pages = [page(i, content=f"{SMALL} {i}") for i in range(4)]
+
+    batches, contents = processor._plan_batches(pages, {})
+
+    assert batches == [[0, 1, 2, 3]]
+    assert contents == {i: f"{SMALL} {i}" for i in range(4)}
+
+
+def test_plan_batches_leaves_skipped_large_and_unloadable_pages_alone():
+    loads = []
+
+    def loader(ref):
+        loads.append(ref)
+        return None if ref == "expired" else f"{SMALL} {ref}"
+
+    processor = ScriptedProcessor(None, batch_tokens=1000, content_loader=loader)
+    pages = [
+        page(0, content_ref="a"),
+        page(1, content_ref="b"),
+        page(2, content_ref="skipped"),
+        page(3, content_ref="expired"),
+        page(4, content="word " * 2000),
+        page(5, content_ref="c"),
+    ]
+
+    batches, contents = processor._plan_batches(pages, {2: {"content": "done"}})
+
+    assert batches == [[0, 1, 5]]
+    assert set(contents) == {0, 1, 5}
+    # Completed pages are never loaded
+    assert "skipped" not in loads
+
+
+def test_plan_batches_is_disabled_without_a_budget():
+    processor = ScriptedProcessor(None, batch_tokens=0)
+    assert processor._plan_batches([page(0, content=SMALL), page(1, content=SMALL)], {}) == ([], {})
+
+
+def test_process_batch_splits_the_reply_by_delimiters():
+    processor = ScriptedProcessor(lambda prompt: "\n".join([section(2, "# Two"), "chatter", section(1, "# One")]))
+    pages = [page(1), page(2)]
+
+    results = asyncio.run(processor._process_batch(pages, ["one", "two"]))
+
+    assert results == ["# One", "# Two"]
+    assert "one" in processor.prompts[0] and "two" in processor.prompts[0]
+
+
+def test_process_batch_returns_none_for_missing_repeated_or_empty_sections():
+    reply = "\n".join([section(1, "# One"), section(2, "# Two"), section(2, "# Two again"), section(3, "  ")])
+    processor = ScriptedProcessor(lambda prompt: reply)
+
+    results = asyncio.run(processor._process_batch([page(i) for i in range(1, 5)], ["1", "2", "3", "4"]))
+
+    assert results == ["# One", None, None, None]
+    assert processor.batched_pages == 1
+
+
+def test_stream_pages_reports_an_expired_page_and_generates_the_rest():
+    def reply(prompt):
+        count = prompt.count("Content:")
+        if count == 1:
+            return "# Single"
+        return "\n".join(section(number, f"# Packed {number}") for number in range(1, count + 1))
+
+    contents = {"root": SMALL, "a": SMALL + " a", "b": SMALL + " b"}
+    processor = ScriptedProcessor(reply, content_loader=contents.get)
+    tree = {
+        **page(0, content_ref="root"),
+        "children": [
+            {**page(1, content_ref="a"), "children": []},
+            {**page(2, content_ref="b"), "children": []},
+            {**page(3, content_ref="expired"), "children": []},
+        ],
+    }
+
+    async def collect():
+        return [event async for event in processor.stream_pages(tree)]
+
+    events = asyncio.run(collect())
+
+    results = {event["index"]: event for event in events if event["type"] in ("page", "error")}
+    assert len(results) == 4
+    assert [index for index, event in results.items() if event["type"] == "error"] == [3]
+    assert "no longer available" in results[3]["message"]
+    assert all(results[index]["markdown"].startswith("# Packed") for index in (0, 1, 2))
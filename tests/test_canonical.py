@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+import pytest
+
+from crawler import DocumentationCrawler
+from url_policy import canonicalize, clean_url, same_page
+
+ORIGIN = "https://docs.example.com"
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Docs.Example.com:443/docs/intro/", "https://docs.example.com/docs/intro"),
+    ("https://docs.example.com/docs/intro/index.html?tab=1#usage", "https://docs.example.com/docs/intro"),
+    ("http://docs.example.com:80/", "http://docs.example.com/"),
+    ("https://docs.example.com", "https://docs.example.com/"),
+    ("https://docs.example.com:8443/docs", "https://docs.example.com:8443/docs"),
+])
+def test_canonicalize(url, expected):
+    assert canonicalize(url) == expected
+
+
+def test_clean_url_keeps_the_path_as_linked():
+    assert clean_url("https://Docs.Example.com/docs/intro/?tab=1#usage") == "https://docs.example.com/docs/intro/"
+    assert clean_url("https://docs.example.com/docs/intro/index.html") == "https://docs.example.com/docs/intro/index.html"
+    assert canonicalize(clean_url("https://docs.example.com/docs/intro/")) == canonicalize("https://docs.example.com/docs/intro")
+
+
+def test_same_page_ignores_spelling_and_scheme():
+    assert same_page("http://docs.example.com/docs/a/", "https://docs.example.com/docs/a")
+    assert same_page("https://docs.example.com/docs/a/index.html", "https://docs.example.com/docs/a")
+    assert not same_page("https://docs.example.com/docs/a", "https://docs.example.com/docs/b")
+
+
+def html(title, canonical=None, links=()):
+    head = f'<link rel="canonical" href="{canonical}">' if canonical else ""
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return (f"<html><head><title>{title}</title>{head}</head><body>{anchors}"
+            f"<main><h1>{title}</h1><p>{('Text of ' + title + '. ') * 40}</p></main></body></html>")
+
+
+SITE = {
+    "/docs/": html("Home", links=["/docs/self/", "/docs/http/", "/docs/loop/", "/docs/variant/", "/docs/main/"]),
+    # Names itself, with a trailing slash the crawler must keep when fetching
+    "/docs/self/": html("Self", canonical=f"{ORIGIN}/docs/self/"),
+    # Names its http:// form
+    "/docs/http/": html("Http", canonical="http://docs.example.com/docs/http/"),
+    # Names a URL that redirects back to the page
+    "/docs/loop/": html("Loop", canonical="/docs/loop-canonical/"),
+    # A variant of another page
+    "/docs/variant/": html("Variant", canonical="/docs/main/"),
+    "/docs/main/": html("Main"),
+}
+REDIRECTS = {"/docs/loop-canonical/": "/docs/loop/"}
+
+
+def crawl_site():
+    requests = []
+
+    def handler(request):
+        path = request.url.path
+        requests.append(path)
+        if path in REDIRECTS:
+            return httpx.Response(301, headers={"Location": f"{ORIGIN}{REDIRECTS[path]}"})
+        if path in SITE:
+            return httpx.Response(200, text=SITE[path], headers={"Content-Type": "text/html"})
+        # Like MkDocs without directory redirects: only the slash form exists
+        return httpx.Response(404)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True) as client:
+            crawler = DocumentationCrawler(
+                client=client, parse_pool="inline", discovery="crawl", respect_robots=False,
+                requests_per_second=None, detect_duplicates=False,
+            )
+            try:
+                return await crawler.crawl(f"{ORIGIN}/docs/")
+            finally:
+                await crawler.close()
+
+    tree = asyncio.run(run())
+    urls = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        urls.add(node["url"])
+        stack.extend(node["children"])
+    return urls, requests
+
+
+def test_pages_naming_themselves_as_canonical_are_collected():
+    urls, _ = crawl_site()
+
+    assert f"{ORIGIN}/docs/self/" in urls
+    assert f"{ORIGIN}/docs/http/" in urls
+    assert f"{ORIGIN}/docs/loop/" in urls
+
+
+def test_variants_defer_to_their_canonical_page():
+    urls, _ = crawl_site()
+
+    assert f"{ORIGIN}/docs/main/" in urls
+    assert f"{ORIGIN}/docs/variant/" not in urls
+
+
+def test_urls_are_fetched_as_linked():
+    _, requests = crawl_site()
+
+    pages = [path for path in requests if path.startswith("/docs")]
+    assert all(path.endswith("/") for path in pages)
+    # Only the page behind the redirecting canonical URL is requested twice
+    assert len(pages) == len(set(pages)) + 1
+    assert pages.count("/docs/loop/") == 2
@@ -0,0 +1,119 @@
+import asyncio
+import functools
+import time
+
+import pytest
+
+from distributed import MAX_LEASE_ATTEMPTS, CrawlCoordinator, FrontierBackend, SqliteFrontier
+
+URL = "https://docs.example.com/docs/intro"
+
+
+class StubCrawler:
+    """Stands in for the coordinator's crawler: seeding only asks it for robots.txt and sitemaps."""
+    policy = None
+
+    async def _prepare(self, start_url):
+        return None
+
+    async def _discover_seeds(self, robots):
+        return [], True
+
+
+@pytest.fixture
+def frontier(tmp_path):
+    backend = SqliteFrontier(str(tmp_path / "frontier.sqlite3"))
+    yield backend
+    backend.close()
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        FrontierBackend()
+
+
+def test_lease_is_exclusive_until_completed(frontier):
+    frontier.add([(URL, 1)])
+
+    assert frontier.lease("a", 5, 60) == [(URL, 1)]
+    assert frontier.lease("b", 5, 60) == []
+    assert frontier.pending() == 1
+
+    frontier.complete(URL, page={"url": URL, "title": "Intro", "content": "text"})
+    assert frontier.pending() == 0
+    assert frontier.lease("b", 5, 60) == []
+    assert [page["url"] for page in frontier.pages()] == [URL]
+
+
+def test_expired_lease_is_claimed_by_another_worker(frontier):
+    frontier.add([(URL, 1)])
+    assert frontier.lease("a", 1, 0.05) == [(URL, 1)]
+    time.sleep(0.1)
+
+    assert frontier.lease("b", 1, 60) == [(URL, 1)]
+    # Completion by the worker holding the new lease finishes the URL
+    frontier.complete(URL)
+    assert frontier.pending() == 0
+
+
+def test_renewed_lease_does_not_expire(frontier):
+    frontier.add([(URL, 1)])
+    frontier.lease("a", 1, 0.2)
+    time.sleep(0.1)
+    frontier.renew("a", 60)
+    time.sleep(0.15)
+
+    assert frontier.lease("b", 1, 60) == []
+
+
+def test_url_whose_lease_keeps_expiring_is_given_up(frontier):
+    frontier.add([(URL, 1)])
+    for attempt in range(MAX_LEASE_ATTEMPTS):
+        assert frontier.lease(f"worker-{attempt}", 1, 0.01) == [(URL, 1)]
+        time.sleep(0.02)
+
+    assert frontier.lease("last", 1, 60) == []
+    assert frontier.pending() == 0
+
+
+def test_spellings_of_a_url_are_queued_once_and_leased_as_added(frontier):
+    assert frontier.add([(URL + "/", 1), (URL, 1), (URL + "/index.html", 2)]) == 1
+    assert frontier.known("HTTPS://docs.example.com/docs/intro#usage")
+    assert frontier.lease("a", 5, 60) == [(URL + "/", 1)]
+
+
+def test_shallow_urls_are_leased_first(frontier):
+    frontier.add([(URL + "/deep", 3), (URL, 1), (URL + "/mid", 2)])
+    assert [depth for _, depth in frontier.lease("a", 3, 60)] == [1, 2, 3]
+
+
+def test_finished_frontier_is_seeded_again(tmp_path):
+    path = str(tmp_path / "frontier.sqlite3")
+    backend = SqliteFrontier(path)
+    backend.set_meta({"start_url": URL, "options": {}, "follow_links": True, "worker_count": 1})
+    backend.add([(URL, 0)])
+    backend.lease("a", 1, 60)
+    backend.complete(URL, page={"url": URL, "title": "Old", "content": "old"})
+
+    coordinator = CrawlCoordinator(functools.partial(SqliteFrontier, path), workers=0)
+    asyncio.run(coordinator._seed(backend, StubCrawler(), URL))
+
+    assert backend.page_count() == 0
+    assert backend.lease("a", 5, 60) == [(URL, 0)]
+    backend.close()
+
+
+def test_unfinished_frontier_of_another_site_is_kept_unless_fresh(tmp_path):
+    path = str(tmp_path / "frontier.sqlite3")
+    backend = SqliteFrontier(path)
+    backend.set_meta({"start_url": URL, "options": {}, "follow_links": True, "worker_count": 1})
+    backend.add([(URL, 0)])
+    other = "https://other.example.com/docs"
+
+    with pytest.raises(Exception, match="unfinished crawl"):
+        asyncio.run(CrawlCoordinator(functools.partial(SqliteFrontier, path))._seed(backend, StubCrawler(), other))
+
+    asyncio.run(CrawlCoordinator(functools.partial(SqliteFrontier, path), fresh=True)._seed(backend, StubCrawler(), other))
+    assert backend.get_meta()["start_url"] == other
+    assert backend.lease("a", 5, 60) == [(other, 0)]
+    backend.close()
@@ -0,0 +1,129 @@
+import fnmatch
+import re
+from typing import Iterable, Optional, Pattern
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+# Resources that are never documentation pages
+SKIP_EXTENSIONS = frozenset({
+    '.pdf', '.zip', '.gz', '.tar', '.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.webp',
+    '.woff', '.woff2', '.ttf', '.eot', '.js', '.mjs', '.css', '.map', '.json', '.webmanifest',
+    '.mp4', '.webm', '.mp3',
+})
+# Path keywords that mark a page outside the start path as documentation
+DEFAULT_KEYWORDS = (
+    'documentation', 'docs', 'api', 'guide', 'reference', 'getting-started', 'authentication',
+)
+# Framework and CDN internals that link checks would otherwise pick up
+DEFAULT_EXCLUDE = ('*/_next/*', '*/cdn-cgi/*')
+ROBOTS_USER_AGENT = 'DocumentationCrawler'
+INDEX_PAGES = ('index.html', 'index.htm', 'index.php')
+DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
+
+
+def clean_url(url: str) -> str:
+    """Drop the query and fragment of a URL, keeping its path exactly as linked.
+
+    This is the URL that gets fetched: trailing slashes and index pages are kept
+    because many hosts redirect or 404 without them.
+    """
+    parsed = urlsplit(url)
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    default_port = DEFAULT_PORTS.get(scheme)
+    if default_port and netloc.endswith(default_port):
+        netloc = netloc[:-len(default_port)]
+    return f"{scheme}://{netloc}{parsed.path or '/'}"
+
+
+def canonicalize(url: str) -> str:
+    """Normalize a URL so trivially different spellings of a page compare equal.
+
+    Lowercases the scheme and host, drops default ports, the query and fragment,
+    trailing index pages (index.html) and trailing slashes. The result is only a
+    dedupe key; pages are fetched at their clean_url.
+    """
+    parsed = urlsplit(clean_url(url))
+    path = parsed.path
+    last_segment = path[path.rfind('/') + 1:]
+    if last_segment.lower() in INDEX_PAGES:
+        path = path[:-len(last_segment)]
+    path = path.rstrip('/') or '/'
+    return f"{parsed.scheme}://{parsed.netloc}{path}"
+
+
+def same_page(url: str, other: str) -> bool:
+    """Whether two URLs name the same page, counting http:// and https:// as one."""
+    return canonicalize(url).partition('://')[2] == canonicalize(other).partition('://')[2]
+
+
+def compile_rules(patterns: Iterable[str]) -> Optional[Pattern]:
+    """Compile glob patterns (and regexes prefixed with 're:') into one regex.
+
+    Globs must match the whole URL; regexes may match anywhere in it.
+    """
+    parts = []
+    for pattern in patterns:
+        if pattern.startswith('re:'):
+            parts.append(f'(?:.*?(?:{pattern[3:]}))')
+        else:
+            parts.append(f'(?:{fnmatch.translate(pattern)})')
+    return re.compile('|'.join(parts)) if parts else None
+
+
+def parse_robots(text: str) -> RobotFileParser:
+    """Parse a robots.txt body."""
+    robots = RobotFileParser()
+    robots.parse(text.splitlines())
+    return robots
+
+
+class UrlPolicy:
+    """Decides which discovered URLs belong to the crawl, with all rules compiled up front.
+
+    A URL is accepted when it is on the start URL's host, does not point at a static
+    resource, is not excluded, is allowed by robots.txt, and either matches an include
+    rule or (when no include rules are given) lives under the start path or contains a
+    documentation keyword.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        include: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        keywords: Optional[Iterable[str]] = None,
+        robots: Optional[RobotFileParser] = None,
+    ):
+        parsed = urlsplit(base_url)
+        self.base_url = base_url
+        self.host = parsed.netloc
+        self.base_path = parsed.path
+        self.include = compile_rules(include or ())
+        self.exclude = compile_rules([*DEFAULT_EXCLUDE, *(exclude or ())])
+        keywords = DEFAULT_KEYWORDS if keywords is None else tuple(keywords)
+        self.keywords = re.compile('|'.join(re.escape(k.lower()) for k in keywords)) if keywords else None
+        self.robots = robots
+
+    def allows(self, url: str) -> bool:
+        if url == self.base_url:
+            return True
+        parsed = urlsplit(url)
+        if parsed.netloc != self.host or parsed.scheme not in ('http', 'https'):
+            return False
+
+        path = parsed.path
+        last_segment = path[path.rfind('/') + 1:]
+        dot = last_segment.rfind('.')
+        if dot != -1 and last_segment[dot:].lower() in SKIP_EXTENSIONS:
+            return False
+        if self.exclude and self.exclude.match(url):
+            return False
+
+        if self.include:
+            if not self.include.match(url):
+                return False
+        elif not path.startswith(self.base_path) and not (self.keywords and self.keywords.search(path.lower())):
+            return False
+
+        return self.robots is None or self.robots.can_fetch(ROBOTS_USER_AGENT, url)